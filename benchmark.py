@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+benchmark.py - load test the COHA app's hot paths against a local bucket
+
+For each dataset size this script:
+- generates synthetic observations using the real FILE_FIELD_NAMES schema,
+  valid quadrat/station/condition values and coordinates near each station,
+  spread over many survey years
+- writes them as individual observation files into a LocalStorage directory
+  (see storage_backend.py), so no GCS bucket or credentials are needed
+- times a full regenerate_data_summaries() run
+- drives /save/, /map/data, /data/ and /admin/ through the Flask test client
+  with N concurrent clients
+- has N threads append rows to the same yearly summary CSV at once
+  ("summary_update"), the way compaction and admin deletes update summaries,
+  and reports how many attempts, writes, conflicts and give-ups that took
+
+Per endpoint it reports p50/p99/mean latency, throughput, errors, storage
+operations, generation-match conflicts (PreconditionFailed) and bytes read and
+written.  It also measures (with tracemalloc) how much memory the all-years
+summary takes as plain dicts and as Observation records.  Everything is
+written to a JSON file so results can be compared release over release.
+
+Example:
+    python benchmark.py --sizes 1000 10000 --clients 8 --requests 50 --output bench.json
+"""
+
+import argparse
+import base64
+import csv
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+import storage_backend
+
+ADMIN_PASSWORD = "benchmark"
+ENDPOINTS = ["save", "map_data", "data", "admin", "summary_update"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the COHA app against a local bucket")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="observation counts to generate (default: 1000 10000 100000)")
+    parser.add_argument("--years", type=int, default=10,
+                        help="number of survey years to spread observations over (default: 10)")
+    parser.add_argument("--clients", type=int, default=8,
+                        help="concurrent clients per endpoint (default: 8)")
+    parser.add_argument("--requests", type=int, default=25,
+                        help="requests per client per endpoint (default: 25)")
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS,
+                        help="endpoints to drive (default: all)")
+    parser.add_argument("--cache-ttl", type=float, default=None,
+                        help="override COHA_SUMMARY_CACHE_TTL; 0 measures uncached summary reads")
+    parser.add_argument("--no-group-commit", action="store_true",
+                        help="set COHA_SUMMARY_GROUP_COMMIT=0 to measure summary updates without group commit")
+    parser.add_argument("--skip-regen", action="store_true",
+                        help="skip timing a full regeneration (summaries are still built once)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+    parser.add_argument("--output", default="benchmark-results.json",
+                        help="where to write the JSON results (default: benchmark-results.json)")
+    return parser.parse_args()
+
+
+# ---------------------------------------------------------------------------
+# Storage accounting
+# ---------------------------------------------------------------------------
+
+class CountingStorage:
+    """
+    Wrap a storage backend and count operations, bytes and generation-match
+    conflicts, attributed to whichever endpoint the calling thread is running.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.bucket_name = inner.bucket_name
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._default_label = "other"   # for worker threads the app starts itself
+        self.counts = defaultdict(lambda: defaultdict(int))
+
+    def set_label(self, label):
+        self._local.label = label
+        self._default_label = label
+
+    def _count(self, key, amount=1):
+        label = getattr(self._local, "label", self._default_label)
+        with self._lock:
+            self.counts[label][key] += amount
+
+    def list(self, prefix=None, delimiter=None):
+        self._count("list")
+        for obj in self.inner.list(prefix, delimiter=delimiter):
+            self._count("listed")
+            yield obj
+
+    def list_prefixes(self, prefix=None, delimiter="/"):
+        self._count("list")
+        return self.inner.list_prefixes(prefix, delimiter=delimiter)
+
+    def stat(self, name):
+        self._count("stat")
+        return self.inner.stat(name)
+
+    def read(self, name):
+        self._count("read")
+        data, obj = self.inner.read(name)
+        self._count("bytes_read", len(data))
+        return data, obj
+
+    def open(self, name):
+        self._count("read")
+        return self.inner.open(name)
+
+    def write(self, name, data, **kwargs):
+        self._count("write")
+        if hasattr(self._local, "label"):
+            self._count("request_write")    # made while a request waits, not by a worker thread
+        self._count("bytes_written", len(data.encode("utf-8") if isinstance(data, str) else data))
+        try:
+            return self.inner.write(name, data, **kwargs)
+        except storage_backend.PreconditionFailed:
+            self._count("conflicts")
+            raise
+
+    def delete(self, name, **kwargs):
+        self._count("delete")
+        try:
+            return self.inner.delete(name, **kwargs)
+        except storage_backend.PreconditionFailed:
+            self._count("conflicts")
+            raise
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+def generate_observations(coha, count, years, rng):
+    """Return count observation rows with unique quadrat/station/timestamp keys."""
+    coords = coha.load_station_coords()
+    quadrats = [q for q in coha.quadrats if q != coha.unselected]
+    stations = [s for s in coha.stations if s != coha.unselected]
+    last_year = datetime.date.today().year - 1
+    survey_years = list(range(last_year - years + 1, last_year + 1))
+
+    rows, seen = [], set()
+    while len(rows) < count:
+        quadrat, station = rng.choice(quadrats), rng.choice(stations)
+        when = datetime.datetime(rng.choice(survey_years), rng.randint(3, 5), rng.randint(1, 28),
+                                 rng.randint(6, 18), rng.randint(0, 59), rng.randint(0, 59))
+        timestamp = when.strftime("%Y-%m-%d.%H-%M-%S")
+        if (quadrat, station, timestamp) in seen:
+            continue
+        seen.add((quadrat, station, timestamp))
+
+        nominal = coords.get(quadrat, {}).get(station, {"latitude": "49.2366", "longitude": "-123.0478"})
+        detected = rng.random() < 0.1
+        rows.append({
+            "quadrat": quadrat,
+            "station": station,
+            "cloud": rng.choice(coha.cloudValues),
+            "wind": rng.choice(coha.windValues),
+            "noise": rng.choice(coha.noiseValues),
+            "latitude": str(round(float(nominal["latitude"]) + rng.uniform(-0.001, 0.001), 6)),
+            "longitude": str(round(float(nominal["longitude"]) + rng.uniform(-0.001, 0.001), 6)),
+            "detection": "yes" if detected else "no",
+            "direction": str(rng.choice(range(0, 360, 45))) if detected else "",
+            "distance": str(rng.choice([25, 50, 100, 200])) if detected else "",
+            "detection_type": rng.choice(["A", "V"]) if detected else "",
+            "age_class": rng.choice(["unknown", "juvenile", "adult"]) if detected else "",
+            "observers": "Benchmark Observer",
+            "notes": "",
+            "timestamp": timestamp,
+        })
+    return rows
+
+
+def seed_storage(coha, storage, rows):
+    """Write each row as an individual observation file."""
+    for row in rows:
+        filename = "{}.{:02d}.{}.csv".format(row["quadrat"], int(row["station"]), row["timestamp"])
+        storage.write(coha.observation_blob_name(filename),
+                      coha._csv_to_string([coha.Observation.from_csv_row(row)]))
+
+
+def save_form(coha, rng):
+    quadrat = rng.choice([q for q in coha.quadrats if q != coha.unselected])
+    station = rng.choice([s for s in coha.stations if s != coha.unselected])
+    nominal = coha.load_station_coords()[quadrat][station]
+    return {
+        "quadrat": quadrat, "station": station,
+        "cloud": "1", "wind": "1", "noise": "1",
+        "latitude": nominal["latitude"], "longitude": nominal["longitude"],
+        "detection": "no", "direction": "", "distance": "",
+        "detection_type": "", "age_class": "",
+        "observers": "Benchmark Observer", "notes": "",
+    }
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def summarise(label, latencies, errors, wall, storage, extra=None):
+    counts = storage.counts.get(label, {})
+    latencies_ms = [t * 1000 for t in latencies]
+    return dict(extra or {}, **{
+        "endpoint": label,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies_ms, 50), 3) if latencies_ms else None,
+        "p99_ms": round(percentile(latencies_ms, 99), 3) if latencies_ms else None,
+        "mean_ms": round(statistics.fmean(latencies_ms), 3) if latencies_ms else None,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "conflicts": counts.get("conflicts", 0),
+        "bytes_read": counts.get("bytes_read", 0),
+        "bytes_written": counts.get("bytes_written", 0),
+        "storage_ops": {k: counts.get(k, 0) for k in ("list", "listed", "stat", "read", "write", "delete")},
+        "request_writes_per_call": round(counts.get("request_write", 0) / len(latencies), 2) if latencies else None,
+    })
+
+
+def summary_row(coha, rng, client, n):
+    """A new row for this year's summary, unique per client and request."""
+    row = dict(save_form(coha, rng))
+    row["timestamp"] = f"{datetime.date.today().year}-06-15.{client:02d}-{n // 60:02d}-{n % 60:02d}"
+    return coha.Observation.from_csv_row(row)
+
+
+def drive_endpoint(coha, storage, label, clients, requests, rng_seed):
+    """Run clients threads, each issuing requests calls to one endpoint."""
+    auth = {"Authorization": "Basic " + base64.b64encode(f"benchmark:{ADMIN_PASSWORD}".encode()).decode()}
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients)
+    summary_file = coha._yearly_summary_name(str(datetime.date.today().year))
+    commits_before = coha.summary_commit_stats()
+    updates_before = coha.conditional_update_stats().get(summary_file, {})
+
+    def client(n):
+        rng = random.Random(rng_seed * 1000 + n)
+        app_client = coha.app.test_client()
+        storage.set_label(label)
+        mine, failed = [], 0
+        start_barrier.wait()
+        for i in range(requests):
+            t0 = time.perf_counter()
+            if label == "summary_update":
+                ok, _ = coha.append_to_summary_file(summary_file, [summary_row(coha, rng, n, i)])
+                mine.append(time.perf_counter() - t0)
+                failed += not ok
+                continue
+            if label == "save":
+                response = app_client.post("/save/", data=save_form(coha, rng))
+            elif label == "map_data":
+                response = app_client.get("/map/data", headers={"Accept-Encoding": "gzip"})
+            elif label == "data":
+                response = app_client.get("/data/")
+            else:
+                response = app_client.get("/admin/", headers=auth)
+            mine.append(time.perf_counter() - t0)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    extra = None
+    if label == "summary_update":
+        after = dict(coha.summary_commit_stats(), **coha.conditional_update_stats().get(summary_file, {}))
+        before = dict(commits_before, **updates_before)
+        extra = {"summary_commits": {k: round(v - before.get(k, 0), 1) for k, v in after.items()}}
+    return summarise(label, latencies, sum(errors), wall, storage, extra)
+
+
+def measure_memory(coha, storage):
+    """
+    Bytes held by the all-years summary parsed as plain dicts of strings
+    (the pre-Observation representation) and as Observation records.
+    """
+    text = storage.inner.read(coha.SUMMARY_FILE_NAME)[0].decode("utf-8")
+    result = {}
+    for label, parse in (
+        ("dict_rows", lambda: [dict(r) for r in csv.DictReader(io.StringIO(text))]),
+        ("observations", lambda: coha.observations_from_csv(text)),
+    ):
+        tracemalloc.start()
+        rows = parse()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result[label] = {"bytes": current, "bytes_per_row": round(current / max(len(rows), 1), 1)}
+        del rows
+    return result
+
+
+def run_size(coha, size, args):
+    rng = random.Random(args.seed + size)
+    root = tempfile.mkdtemp(prefix=f"coha-bench-{size}-")
+    try:
+        storage = CountingStorage(storage_backend.LocalStorage(root))
+        # Count beneath the app's own timing wrapper, as get_storage() sets up
+        # in production, so the storage-timing code is part of what is measured
+        coha._storage = coha._TimedStorage(storage)
+        coha.invalidate_summary_cache()
+
+        print(f"[{size}] generating and writing observations to {root}")
+        storage.set_label("seed")
+        seed_storage(coha, storage, generate_observations(coha, size, args.years, rng))
+
+        results = []
+        storage.set_label("regenerate")
+        t0 = time.perf_counter()
+        coha.regenerate_data_summaries(full=True)
+        regen_time = time.perf_counter() - t0
+        if not args.skip_regen:
+            print(f"[{size}] full regeneration: {regen_time:.2f}s")
+            results.append(summarise("regenerate", [regen_time], 0, regen_time, storage))
+
+        memory = measure_memory(coha, storage)
+        print(f"[{size}] summary in memory: {memory['dict_rows']['bytes_per_row']} B/row as dicts, "
+              f"{memory['observations']['bytes_per_row']} B/row as Observations")
+
+        for label in args.endpoints:
+            print(f"[{size}] {label}: {args.clients} clients x {args.requests} requests")
+            results.append(drive_endpoint(coha, storage, label, args.clients, args.requests, args.seed))
+        return {"rows": size, "memory": memory, "results": results}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], universal_newlines=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main():
+    args = parse_args()
+
+    # Per-request timing lines would swamp the output and cost time in every
+    # measured request; TIMING_LOG is read when main is imported
+    os.environ["COHA_TIMING_LOG"] = "0"
+    # Import after parsing so --help works without the app's dependencies
+    import main as coha
+    coha.ADMIN_PASSWORD = ADMIN_PASSWORD
+    if args.cache_ttl is not None:
+        coha.SUMMARY_CACHE_TTL = args.cache_ttl
+    if args.no_group_commit:
+        coha.SUMMARY_GROUP_COMMIT = False
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "clients": args.clients,
+            "requests_per_client": args.requests,
+            "years": args.years,
+            "summary_cache_ttl": coha.SUMMARY_CACHE_TTL,
+            "summary_group_commit": coha.SUMMARY_GROUP_COMMIT,
+        },
+        "datasets": [run_size(coha, size, args) for size in args.sizes],
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for dataset in report["datasets"]:
+        for r in dataset["results"]:
+            print(f"{dataset['rows']:>7} rows  {r['endpoint']:<10} p50 {r['p50_ms']:>9} ms  "
+                  f"p99 {r['p99_ms']:>9} ms  {r['throughput_rps']:>8} req/s  "
+                  f"conflicts {r['conflicts']:>4}  read {r['bytes_read']:>11} B  "
+                  f"written {r['bytes_written']:>10} B  "
+                  f"{r['request_writes_per_call']} writes/call in the request")
+            if "summary_commits" in r:
+                c = r["summary_commits"]
+                print(f"{'':>7}       {'':<10} {c['changes']} changes in {c['commits']} commits, "
+                      f"{c['attempts']} attempts, {c['writes']} writes, {c['conflicts']} conflicts, "
+                      f"{c['gave_up']} gave up, {c['backoff_ms']} ms backing off")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+build_assets.py - fingerprint, minify and precompress the files in static/
+
+Writes static/dist/, which the app serves with
+"Cache-Control: public, max-age=31536000, immutable":
+
+- every script, stylesheet, image and audio file as <name>.<hash>.<ext>, the
+  hash taken from the content actually served, so a changed file always gets
+  a new URL
+- scripts and stylesheets minified when rjsmin / rcssmin are installed
+- url('/...') references in stylesheets pointed at the fingerprinted files
+- <file>.gz and, with the brotli package, <file>.br beside each script and
+  stylesheet, kept only where they are smaller
+- manifest.json mapping each original name to its fingerprinted file and the
+  encodings available for it
+
+Templates refer to these files through asset_url() in main.py, which falls
+back to the plain /<name> URL when no manifest has been built, e.g. when
+running locally.  The Dockerfile runs this script when the image is built.
+
+Example:
+    python build_assets.py --verbose
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:     # optional: only .gz variants are written
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:     # optional: scripts are copied unminified
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:     # optional: stylesheets are copied unminified
+    rcssmin = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_NAME = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Built in this order, so stylesheets can refer to the fingerprinted images
+ASSET_EXTENSIONS = (".ico", ".jpg", ".mp3", ".js", ".css")
+COMPRESSED_EXTENSIONS = (".js", ".css")
+# Smaller files are not worth a compressed variant
+MIN_COMPRESS_SIZE = 512
+_CSS_URL_RE = re.compile(r"""url\((['"]?)/([^'")]+)\1\)""")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed copies of the COHA static files")
+    parser.add_argument("--static-dir", default=STATIC_DIR,
+                        help=f"directory holding the static files (default: {STATIC_DIR})")
+    parser.add_argument("--verbose", action="store_true",
+                        help="list each file as it is built")
+    return parser.parse_args()
+
+
+def rewrite_css_urls(text, manifest):
+    """Point url('/name') references at the fingerprinted copies already built."""
+    def replace(match):
+        entry = manifest.get(match.group(2))
+        if entry is None:
+            return match.group(0)
+        return f"url({match.group(1)}/{DIST_NAME}/{entry['file']}{match.group(1)})"
+    return _CSS_URL_RE.sub(replace, text)
+
+
+def minify(name, data):
+    if name.endswith(".js") and rjsmin is not None and not name.endswith(".min.js"):
+        return rjsmin.jsmin(data.decode("utf-8")).encode("utf-8")
+    if name.endswith(".css") and rcssmin is not None:
+        return rcssmin.cssmin(data.decode("utf-8")).encode("utf-8")
+    return data
+
+
+def fingerprint(name, data):
+    root, ext = os.path.splitext(name)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def write_compressed(path, data):
+    """Write .br/.gz variants of data beside path where they are smaller; return their encodings."""
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    variants = [("gzip", ".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.insert(0, ("br", ".br", brotli.compress(data)))
+    encodings = []
+    for coding, suffix, body in variants:
+        if len(body) < len(data):
+            with open(path + suffix, "wb") as f:
+                f.write(body)
+            encodings.append(coding)
+    return encodings
+
+
+def build(static_dir, verbose=False):
+    """Rebuild static_dir/dist/ and its manifest.  Returns the manifest."""
+    dist_dir = os.path.join(static_dir, DIST_NAME)
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    names = [name for name in os.listdir(static_dir)
+             if os.path.isfile(os.path.join(static_dir, name)) and name.endswith(ASSET_EXTENSIONS)]
+    names.sort(key=lambda name: (ASSET_EXTENSIONS.index(os.path.splitext(name)[1]), name))
+
+    manifest = {}
+    for name in names:
+        with open(os.path.join(static_dir, name), "rb") as f:
+            original = f.read()
+        data = original
+        if name.endswith(".css"):
+            data = rewrite_css_urls(data.decode("utf-8"), manifest).encode("utf-8")
+        data = minify(name, data)
+        hashed = fingerprint(name, data)
+        path = os.path.join(dist_dir, hashed)
+        with open(path, "wb") as f:
+            f.write(data)
+        encodings = write_compressed(path, data) if name.endswith(COMPRESSED_EXTENSIONS) else []
+        manifest[name] = {"file": hashed, "encodings": encodings}
+        if verbose:
+            print(f"{name} -> {DIST_NAME}/{hashed}  {len(original)} -> {len(data)} bytes"
+                  + (f"  ({', '.join(encodings)})" if encodings else ""))
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main():
+    args = parse_args()
+    for module, package, effect in ((rjsmin, "rjsmin", "scripts are not minified"),
+                                    (rcssmin, "rcssmin", "stylesheets are not minified"),
+                                    (brotli, "Brotli", "no .br variants are written")):
+        if module is None:
+            print(f"{package} is not installed: {effect}")
+    manifest = build(args.static_dir, verbose=args.verbose)
+    print(f"Built {len(manifest)} asset(s) in {os.path.join(args.static_dir, DIST_NAME)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,136 @@
 import string
 import re
+import atexit
 import datetime
 import pytz
 import csv
+import gzip
+import hashlib
+import heapq
 import html
 import io
+import json
+import mimetypes
 import os
+import queue
+import random
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import wraps
-from google.cloud import storage
-from google.api_core.exceptions import PreconditionFailed
-
-from flask import Flask, jsonify, render_template, request, redirect, Response
+from types import MappingProxyType
+import storage_backend
+import summary_columns
+from summary_index import SummaryIndex, is_detection, station_key
+from observation import FILE_FIELD_NAMES, FORM_FIELD_NAMES, Observation, observations_from_csv
+from storage_backend import NotFound, PreconditionFailed
+
+from flask import (Flask, Response, abort, before_render_template, g, has_request_context, jsonify,
+                   redirect, render_template, request, send_from_directory, stream_with_context,
+                   template_rendered)
 import markdown
 
+try:
+    import brotli
+except ImportError:     # optional: responses fall back to gzip
+    brotli = None
+
 MAPS_API_KEY = os.environ.get("COHA_MAPS_API_KEY")
 MAP_ID = os.environ.get("COHA_GOOGLE_MAP_ID")
 ADMIN_PASSWORD = os.environ.get("COHA_ADMIN_PASSWORD", "")
 
 STORAGE_BUCKET_NAME = os.environ.get("COHA_BUCKET_NAME", "coha-data")
 STORAGE_BUCKET_PUBLIC_URL = "https://storage.googleapis.com/" + STORAGE_BUCKET_NAME
-FORM_FIELD_NAMES = [
-    "quadrat", "station",
-    "cloud", "wind", "noise", "latitude", "longitude",
-    "detection", "direction", "distance", "detection_type", "age_class",
-    "observers", "notes"
-]
-FILE_FIELD_NAMES = FORM_FIELD_NAMES.copy()
-FILE_FIELD_NAMES.append("timestamp")
 OPTIONAL_FIELDS = ["direction", "distance", "detection_type", "age_class"]
 
 SUMMARY_FILE_NAME = "COHA-data-all-years.csv"
 SUMMARY_FILE_PUBLIC_URL = STORAGE_BUCKET_PUBLIC_URL + "/" + SUMMARY_FILE_NAME
+# Observation file -> generation, md5 and rows, as of the last regeneration
+SUMMARY_MANIFEST_NAME = "summary-manifest.json"
+_YEARLY_SUMMARY_RE = re.compile(r"^COHA-data-(\d{4})\.csv$")
+
+# Append-only summary log.  Each save writes a small segment under
+# SUMMARY_LOG_PREFIX/<year>/ instead of rewriting the summary CSVs; readers merge
+# the canonical CSV with its segments, and compact_summary_log() folds the
+# segments back into the canonical CSVs once enough have accumulated.
+SUMMARY_LOG_PREFIX = "summary-log/"
+SUMMARY_LOG_COMPACT_THRESHOLD = int(os.environ.get("COHA_SUMMARY_COMPACT_THRESHOLD", "50"))
+# The summary queue also compacts once the oldest segment is this many seconds
+# old, so the public CSVs catch up when few saves arrive (0 = by count only)
+SUMMARY_LOG_COMPACT_AGE = float(os.environ.get("COHA_SUMMARY_COMPACT_AGE", "900"))
+# Seconds between the queue's checks of the log's size and age
+SUMMARY_LOG_CHECK_INTERVAL = 60
+
+# Background summary maintenance (see _SummaryQueue).  COHA_SUMMARY_QUEUE=0
+# logs each save inline instead.
+SUMMARY_QUEUE = os.environ.get("COHA_SUMMARY_QUEUE", "1") not in ("", "0", "false", "no")
+SUMMARY_QUEUE_DEPTH = int(os.environ.get("COHA_SUMMARY_QUEUE_DEPTH", "1000"))
+# Seconds the worker waits for a burst of saves before writing
+SUMMARY_QUEUE_DELAY = float(os.environ.get("COHA_SUMMARY_QUEUE_DELAY", "0.5"))
+# Seconds a save waits for room in a full queue before logging its row itself
+SUMMARY_QUEUE_BLOCK = float(os.environ.get("COHA_SUMMARY_QUEUE_BLOCK", "2"))
+SUMMARY_PENDING_PREFIX = "summary-pending/"
+# Pending markers untouched for this many seconds belong to a stopped instance
+SUMMARY_PENDING_STALE = float(os.environ.get("COHA_SUMMARY_PENDING_STALE", "300"))
+
+# Only one full regeneration runs per bucket; its lock object's lease lasts
+# REGEN_LOCK_LEASE seconds and is renewed while the rebuild runs
+REGEN_LOCK_NAME = "summary-regen.lock"
+REGEN_LOCK_LEASE = float(os.environ.get("COHA_REGEN_LOCK_LEASE", "120"))
+
+# Years, counts and last-modified times of the summary (see get_summary_metadata)
+SUMMARY_METADATA_NAME = "summary-index.json"
+
+# Summary reconciliation (see reconcile_summaries).  The summary queue runs it
+# after an update gives up, at most every RECONCILE_MIN_INTERVAL seconds, and
+# every RECONCILE_INTERVAL seconds if that is set (0 = only on demand).
+SUMMARY_RECONCILE_NAME = "summary-reconcile.json"
+RECONCILE_MIN_INTERVAL = float(os.environ.get("COHA_RECONCILE_MIN_INTERVAL", "300"))
+RECONCILE_INTERVAL = float(os.environ.get("COHA_RECONCILE_INTERVAL", "0"))
+
+# Generation-match retries (see conditional_update): at most UPDATE_ATTEMPTS
+# tries within UPDATE_DEADLINE seconds, sleeping a random time of up to
+# UPDATE_BACKOFF_BASE * 2**attempt (capped at UPDATE_BACKOFF_MAX) between them
+UPDATE_ATTEMPTS = int(os.environ.get("COHA_UPDATE_ATTEMPTS", "8"))
+UPDATE_DEADLINE = float(os.environ.get("COHA_UPDATE_DEADLINE", "20"))
+UPDATE_BACKOFF_BASE = float(os.environ.get("COHA_UPDATE_BACKOFF_BASE", "0.05"))
+UPDATE_BACKOFF_MAX = float(os.environ.get("COHA_UPDATE_BACKOFF_MAX", "2"))
+
+# Concurrent updates to one summary CSV within an instance share a single
+# read-modify-write (see _commit_summary_change).  Set to 0 to disable.
+SUMMARY_GROUP_COMMIT = os.environ.get("COHA_SUMMARY_GROUP_COMMIT", "1") not in ("", "0", "false", "no")
+
+# Seconds a cached summary is trusted before its GCS generation is rechecked
+SUMMARY_CACHE_TTL = float(os.environ.get("COHA_SUMMARY_CACHE_TTL", "30"))
+
+# Full regeneration: parallel observation downloads and per-blob retries
+REGEN_CONCURRENCY = int(os.environ.get("COHA_REGEN_CONCURRENCY", "8"))
+REGEN_DOWNLOAD_ATTEMPTS = int(os.environ.get("COHA_REGEN_DOWNLOAD_ATTEMPTS", "4"))
+
+# Seconds browsers and caches may reuse the survey form page before revalidating it
+FORM_CACHE_MAX_AGE = int(os.environ.get("COHA_FORM_CACHE_MAX_AGE", "600"))
+
+# Seconds browsers may reuse a file from static/ before revalidating it.  Pages
+# refer to the fingerprinted copies built by build_assets.py instead where they
+# exist; those are cached for a year (see asset_url).
+STATIC_CACHE_MAX_AGE = int(os.environ.get("COHA_STATIC_MAX_AGE", "3600"))
+
+# Emit one structured JSON log line per request with its phase timings
+TIMING_LOG = os.environ.get("COHA_TIMING_LOG", "1") not in ("", "0", "false", "no")
 
 # Pre-compiled once; used in every blob-listing call
 DATA_FILE_NAME_PATTERN = r"[A-X]\.([0-9]){2}\.([0-9]{4})-[0-1][0-9]-[0-3][0-9]\.[0-6][0-9]-[0-6][0-9]-[0-6][0-9]\.csv"
 _DATA_FILE_RE = re.compile(DATA_FILE_NAME_PATTERN)
+# Observation files are stored as OBSERVATION_PREFIX/YYYY/<file name>, so one
+# year, or just the list of years, can be listed without the rest of the
+# bucket.  Files saved before this layout sit at the top of the bucket; they
+# are still read until migrate_observation_layout.py moves them.
+OBSERVATION_PREFIX = "obs/"
+_OBSERVATION_BLOB_RE = re.compile(r"^(?:obs/\d{4}/)?" + DATA_FILE_NAME_PATTERN + "$")
+_YEAR_RE = re.compile(r"^\d{4}$")
 
 SURVEY_BOUNDS = {
     "west": -123.157770,
@@ -52,6 +148,7 @@ MARKDOWN_EXTENSIONS = [
 ]
 
 app = Flask(__name__, template_folder="templates", static_folder='static', static_url_path='')
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = STATIC_CACHE_MAX_AGE
 
 unselected: str = "not selected"
 quadrats = list(string.ascii_uppercase)[:24]    # 24 quadrats named A-X
@@ -62,225 +159,2092 @@ noiseValues = [str(i) for i in range(0, 4)]
 quadrats.insert(0, unselected)
 stations.insert(0, unselected)
 
-GCP_PROJECT_ID = os.environ.get("COHA_GCP_PROJECT_ID")
+# Module-level storage backend — created once per instance to avoid repeated auth overhead.
+# GCS by default; COHA_STORAGE_BACKEND=local runs against a local directory.
+_storage = None
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = _TimedStorage(storage_backend.get_storage())
+    return _storage
+
+
+# ---------------------------------------------------------------------------
+# Request timing
+# ---------------------------------------------------------------------------
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+TIMING_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class _Histogram:
+    """Latency distribution for one endpoint/phase pair."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(TIMING_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        i = 0
+        while i < len(TIMING_BUCKETS_MS) and ms > TIMING_BUCKETS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct'th percentile (max for the open bucket)."""
+        target = self.count * pct / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return TIMING_BUCKETS_MS[i] if i < len(TIMING_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": list(self.buckets),     # counts per TIMING_BUCKETS_MS bound, then overflow
+        }
+
+
+# (endpoint, phase) -> _Histogram since instance start.  Work done outside a
+# request (e.g. regeneration pool threads) is filed under the "background" endpoint.
+_timing_histograms = {}
+_timing_lock = threading.Lock()
+_timing_started = datetime.datetime.now(datetime.timezone.utc)
+
+
+def _observe(endpoint, phase, ms):
+    with _timing_lock:
+        hist = _timing_histograms.get((endpoint, phase))
+        if hist is None:
+            hist = _timing_histograms[(endpoint, phase)] = _Histogram()
+        hist.add(ms)
+
+
+def record_timing(phase, seconds, detail=None):
+    """
+    Record one timed operation.  Inside a request it is attributed to that
+    request (and reported when it finishes); otherwise it goes straight into
+    the background histograms.
+    """
+    if has_request_context() and "coha_timings" in g:
+        g.coha_timings.append((phase, detail, seconds))
+    else:
+        _observe("background", phase, seconds * 1000)
+
+
+@contextmanager
+def timed(phase, detail=None):
+    """Time the enclosed block as phase (e.g. "csv-parse"), optionally naming the blob."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(phase, time.perf_counter() - t0, detail)
+
+
+class _TimedStorage:
+    """Storage backend wrapper that times each call as gcs-<operation>."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.bucket_name = inner.bucket_name
+
+    def list(self, prefix=None, delimiter=None):
+        # Only time spent fetching listing pages counts, not the caller's loop body
+        elapsed = 0.0
+        it = iter(self.inner.list(prefix, delimiter=delimiter))
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    obj = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - t0
+                yield obj
+        finally:
+            record_timing("gcs-list", elapsed, prefix or "")
+
+    def list_prefixes(self, prefix=None, delimiter="/"):
+        with timed("gcs-list", prefix or ""):
+            return self.inner.list_prefixes(prefix, delimiter=delimiter)
+
+    def stat(self, name):
+        with timed("gcs-stat", name):
+            return self.inner.stat(name)
+
+    def read(self, name):
+        with timed("gcs-read", name):
+            return self.inner.read(name)
+
+    def open(self, name):
+        with timed("gcs-open", name):
+            return self.inner.open(name)
+
+    def write(self, name, data, **kwargs):
+        with timed("gcs-write", name):
+            return self.inner.write(name, data, **kwargs)
+
+    def delete(self, name, **kwargs):
+        with timed("gcs-delete", name):
+            return self.inner.delete(name, **kwargs)
+
+
+@before_render_template.connect_via(app)
+def _render_started(sender, template, context, **extra):
+    if "coha_timings" in g:
+        g.coha_render_start = time.perf_counter()
+
+
+@template_rendered.connect_via(app)
+def _render_finished(sender, template, context, **extra):
+    start = g.pop("coha_render_start", None)
+    if start is not None:
+        record_timing("render", time.perf_counter() - start, template.name)
+
+
+@app.before_request
+def _start_request_timing():
+    g.coha_request_start = time.perf_counter()
+    g.coha_timings = []
+
+
+@app.after_request
+def _finish_request_timing(response):
+    start = g.pop("coha_request_start", None)
+    timings = g.pop("coha_timings", None)
+    if start is None or timings is None:
+        return response
+    total = time.perf_counter() - start
+    endpoint = request.endpoint or "unmatched"
+
+    phases = {}     # phase -> [seconds, calls], in first-seen order
+    for phase, _, seconds in timings:
+        summary = phases.setdefault(phase, [0.0, 0])
+        summary[0] += seconds
+        summary[1] += 1
+
+    metrics = [f'{phase};dur={seconds * 1000:.1f};desc="{calls} call(s)"'
+               for phase, (seconds, calls) in phases.items()]
+    metrics.append(f"total;dur={total * 1000:.1f}")
+    response.headers["Server-Timing"] = ", ".join(metrics)
+
+    _observe(endpoint, "total", total * 1000)
+    for phase, (seconds, _) in phases.items():
+        _observe(endpoint, phase, seconds * 1000)
+
+    if TIMING_LOG and endpoint != "static":
+        _log_request_timing(endpoint, response, total, phases, timings)
+    return response
+
+
+def _log_request_timing(endpoint, response, total, phases, timings):
+    """Print a Cloud Logging structured entry (one JSON object per line on stdout)."""
+    entry = {
+        "severity": "WARNING" if response.status_code >= 500 else "INFO",
+        "message": f"{request.method} {request.path} {response.status_code} {total * 1000:.1f}ms",
+        "httpRequest": {
+            "requestMethod": request.method,
+            "requestUrl": request.url,
+            "status": response.status_code,
+            "latency": f"{total:.6f}s",
+            "userAgent": request.headers.get("User-Agent", ""),
+        },
+        "endpoint": endpoint,
+        "timings_ms": {phase: round(seconds * 1000, 3) for phase, (seconds, _) in phases.items()},
+        # Individual storage calls, so a slow save can be traced to one blob
+        "gcs_calls": [
+            {"op": phase[4:], "blob": detail, "ms": round(seconds * 1000, 3)}
+            for phase, detail, seconds in timings if phase.startswith("gcs-")
+        ][:50],
+    }
+    trace = request.headers.get("X-Cloud-Trace-Context", "")
+    project = os.environ.get("COHA_GCP_PROJECT_ID")
+    if trace and project:
+        entry["logging.googleapis.com/trace"] = f"projects/{project}/traces/{trace.split('/')[0]}"
+    print(json.dumps(entry, separators=(",", ":")), flush=True)
+
+
+def timing_snapshot():
+    """Return the per-endpoint, per-phase histograms recorded since instance start."""
+    with _timing_lock:
+        items = sorted((key, hist.as_dict()) for key, hist in _timing_histograms.items())
+    endpoints = {}
+    for (endpoint, phase), stats in items:
+        endpoints.setdefault(endpoint, {})[phase] = stats
+    return {
+        "since": _timing_started.isoformat(timespec="seconds"),
+        "bucket_bounds_ms": list(TIMING_BUCKETS_MS),
+        "endpoints": endpoints,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Private helpers
+# ---------------------------------------------------------------------------
+
+def _csv_to_string(rows):
+    """Serialise a list of Observations to a CSV string with a header row."""
+    with timed("csv-write"):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(FILE_FIELD_NAMES)
+        writer.writerows(r.to_csv_values() for r in rows)
+        return buf.getvalue()
+
+
+def _year_from_filename(name):
+    """Extract the 4-digit year from an observation filename (Q.SS.YYYY-...) or blob name."""
+    return _observation_basename(name)[5:9]
+
+
+def _observation_basename(name):
+    """Q.SS.YYYY-MM-DD.HH-MM-SS.csv, for a blob in either layout."""
+    return name.rsplit("/", 1)[-1]
+
+
+def observation_blob_name(filename):
+    """Where an observation file is stored: obs/YYYY/Q.SS.YYYY-MM-DD.HH-MM-SS.csv."""
+    return f"{OBSERVATION_PREFIX}{_year_from_filename(filename)}/{_observation_basename(filename)}"
+
+
+def _yearly_summary_name(year):
+    return f"COHA-data-{year}.csv"
+
+
+def _observation_key(row):
+    """
+    Identify an observation row the same way its filename does, with the
+    station normalised so "05" and 5 match; comparable with _filename_key().
+    """
+    return row.quadrat, station_key(row.station), row.timestamp
+
+
+def _filename_key(name):
+    """The _observation_key() of the row an observation file should hold."""
+    quadrat, station, timestamp = _observation_basename(name)[:-len(".csv")].split(".", 2)
+    return quadrat, station_key(station), timestamp
+
+
+def _merge_rows(rows, extra_rows):
+    """Return rows followed by any extra_rows whose key is not already present."""
+    seen = {_observation_key(r) for r in rows}
+    merged = list(rows)
+    for row in extra_rows:
+        key = _observation_key(row)
+        if key not in seen:
+            seen.add(key)
+            merged.append(row)
+    return merged
+
+
+def _read_csv(name):
+    """Return (Observations, StoredObject) for a CSV object; raises NotFound if absent."""
+    data, obj = get_storage().read(name)
+    with timed("csv-parse", name):
+        return observations_from_csv(data.decode("utf-8")), obj
+
+
+def flat_observation_blobs(year=None):
+    """Observation files still in the old flat layout at the top of the bucket, for one year or all."""
+    year_str = str(year) if year is not None else None
+    for blob in get_storage().list(delimiter="/"):
+        if _DATA_FILE_RE.match(blob.name) and year_str in (None, _year_from_filename(blob.name)):
+            yield blob
+
+
+def _iter_observation_blobs(year=None):
+    """
+    Yield the stored observation files, for one year or for all of them.
+
+    Only the OBSERVATION_PREFIX listing for the year is fetched, plus the top
+    level of the bucket (without any "directories") for files still in the
+    old flat layout.  A file present in both layouts, as during a migration,
+    is yielded once, from its new location.
+    """
+    year_str = str(year) if year is not None else None
+    legacy = {blob.name: blob for blob in flat_observation_blobs(year_str)}
+
+    prefix = OBSERVATION_PREFIX + (f"{year_str}/" if year_str is not None else "")
+    for blob in get_storage().list(prefix):
+        if _OBSERVATION_BLOB_RE.match(blob.name):
+            legacy.pop(_observation_basename(blob.name), None)
+            yield blob
+    yield from legacy.values()
+
+
+def observation_years():
+    """Sorted years that have observation files, from the year prefixes and any flat-layout files."""
+    years = {p[len(OBSERVATION_PREFIX):-1] for p in get_storage().list_prefixes(OBSERVATION_PREFIX)}
+    years |= {_year_from_filename(blob.name) for blob in flat_observation_blobs()}
+    return sorted(y for y in years if _YEAR_RE.match(y))
+
+
+# ---------------------------------------------------------------------------
+# GCS read/write
+# ---------------------------------------------------------------------------
+
+def csv_write_to_google_cloud(filename, data):
+    """
+    Unconditionally write a CSV to GCS (individual observation files).
+    Returns (success: bool, message: str).
+    """
+    try:
+        get_storage().write(filename, _csv_to_string(data))
+        return True, f"saved data to file {filename}"
+    except Exception as e:
+        return False, f"Failed to save data: {e}"
+
+
+def write_summary_columns(summary_file, rows, generation):
+    """
+    Write the columnar companion of summary_file (see summary_columns.py),
+    tagged with the generation of the CSV it mirrors.  Failure is only logged:
+    readers notice the mismatched generation and read the CSV instead.
+    """
+    try:
+        with timed("columns-write", summary_file):
+            data = summary_columns.encode([r.to_csv_values() for r in rows], FILE_FIELD_NAMES,
+                                          source_generation=generation)
+        get_storage().write(summary_columns.companion_name(summary_file), data,
+                            content_type="application/octet-stream")
+    except Exception as e:
+        print(f"Failed to save columnar copy of {summary_file}: {e}")
+
+
+def write_summary_file(summary_file, rows):
+    """
+    Unconditionally write a summary CSV and its columnar companion (used by
+    full regeneration).  Returns (success: bool, message: str).
+    """
+    try:
+        obj = get_storage().write(summary_file, _csv_to_string(rows))
+    except Exception as e:
+        return False, f"Failed to save data: {e}"
+    write_summary_columns(summary_file, rows, obj.generation)
+    return True, f"saved data to file {summary_file}"
+
+
+def read_summary_columns(summary_file, generation=None):
+    """
+    Return the ColumnTable companion of summary_file if it was built from the
+    CSV's generation (looked up when not given), else None: missing, stale or
+    unreadable companions mean the CSV has to be read instead.
+    """
+    try:
+        if generation is None:
+            generation = get_storage().stat(summary_file).generation
+        data, _ = get_storage().read(summary_columns.companion_name(summary_file))
+        table = summary_columns.ColumnTable(data)
+    except NotFound:
+        return None
+    except Exception as e:
+        print(f"Ignoring columnar copy of {summary_file}: {e}")
+        return None
+    if table.source_generation != generation or table.names != FILE_FIELD_NAMES:
+        return None
+    return table
+
+
+def _observations_from_columns(table):
+    """
+    Observations for every row of a ColumnTable.  Dictionary-encoded fields
+    are parsed once per distinct value rather than once per row.
+    """
+    with timed("columns-parse"):
+        columns = []
+        for name in FILE_FIELD_NAMES:
+            if table.kind(name) == "category":
+                parsed = [Observation.parse_field(name, v) for v in table.categories(name)]
+                columns.append(list(map(parsed.__getitem__, table.codes(name).tolist())))
+            else:
+                columns.append([Observation.parse_field(name, v) for v in table.column(name)])
+        return [Observation.from_values(values) for values in zip(*columns)]
+
+
+def remove_from_summary_file(blob_name, timestamp, attempts=None):
+    """
+    Remove all rows matching timestamp from a summary CSV using generation-match.
+
+    Matching on timestamp is sufficient: each individual file has one row whose
+    timestamp value equals the timestamp encoded in its filename.  If two files
+    somehow share the same timestamp (manual imports, etc.) all matching rows are
+    removed — correct behaviour since the source file no longer exists.
+
+    Returns (success: bool, message: str).
+    """
+    return _commit_summary_change(blob_name, [("remove", timestamp)], attempts)
+
+
+def append_to_summary_file(blob_name, new_rows, attempts=None):
+    """
+    Append rows to a summary CSV using GCS generation-match for concurrency safety.
+
+    If two Cloud Run instances try to update the summary simultaneously, the
+    generation-match precondition causes one write to fail. The loser backs off
+    and retries, re-reading the (now updated) file so neither observation is lost.  Rows that
+    are already present are skipped, so folding the same log segment twice is
+    harmless.
+
+    Returns (success: bool, message: str).
+    """
+    return _commit_summary_change(blob_name, [("add", list(new_rows))], attempts)
+
+
+# ---------------------------------------------------------------------------
+# Conditional updates
+# ---------------------------------------------------------------------------
+# Every read-modify-write of a summary CSV or log segment goes through
+# conditional_update(), which retries generation-match conflicts with
+# exponential backoff and full jitter, within an attempt limit and a deadline.
+
+_update_lock = threading.Lock()
+_update_stats = {}      # stats key -> counters, see _update_stats_key()
+
+
+def _update_stats_key(blob_name):
+    """Counters are kept per summary CSV; log segments are grouped per year."""
+    if blob_name.startswith(SUMMARY_LOG_PREFIX):
+        return blob_name.rsplit("/", 1)[0] + "/*"
+    return blob_name
+
+
+def _update_count(blob_name, **counts):
+    with _update_lock:
+        stats = _update_stats.setdefault(_update_stats_key(blob_name), {
+            "updates": 0, "attempts": 0, "conflicts": 0, "writes": 0, "gave_up": 0, "backoff_ms": 0.0})
+        for name, n in counts.items():
+            stats[name] += n
+
+
+def conditional_update_stats():
+    """Per-blob counters for conditional updates made by this instance since it started."""
+    with _update_lock:
+        return {key: dict(stats, backoff_ms=round(stats["backoff_ms"], 1))
+                for key, stats in sorted(_update_stats.items())}
+
+
+def _backoff_delay(attempt):
+    """Full jitter: a uniform delay up to an exponentially growing, capped ceiling."""
+    return random.uniform(0, min(UPDATE_BACKOFF_MAX, UPDATE_BACKOFF_BASE * 2 ** attempt))
+
+
+def _log_update(blob_name, outcome, attempts, conflicts, started):
+    """Structured log entry for an update that hit conflicts."""
+    entry = {
+        "severity": "WARNING" if outcome == "gave_up" else "INFO",
+        "message": f"conditional update of {blob_name}: {outcome} after {attempts} attempt(s)",
+        "blob": blob_name,
+        "outcome": outcome,
+        "attempts": attempts,
+        "conflicts": conflicts,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+    }
+    print(json.dumps(entry, separators=(",", ":")), flush=True)
+
+
+def conditional_update(blob_name, mutate, attempts=None, deadline=None, delete_if_empty=False):
+    """
+    Read-modify-write a CSV blob under generation-match.
+
+    mutate(rows, exists) gets the blob's current Observations (an empty list
+    and exists=False when the blob is absent) and returns (new_rows, message);
+    new_rows of None means there is nothing to change.  When the write loses a
+    race the blob is read again and mutate called again, after a backoff
+    delay, for up to attempts tries (default UPDATE_ATTEMPTS) or deadline
+    seconds (default UPDATE_DEADLINE), whichever runs out first.  With
+    delete_if_empty an empty result deletes the blob instead of writing it.
+
+    Returns (success: bool, message: str, written: StoredObject or None).
+    """
+    return _conditional_write(blob_name, mutate, lambda: _read_csv(blob_name), list, _csv_to_string, {},
+                              attempts, deadline, delete_if_empty)
+
+
+def conditional_update_document(blob_name, mutate, attempts=None, deadline=None):
+    """
+    conditional_update() for a JSON blob: mutate(document, exists) gets the
+    decoded object ({} and exists=False when the blob is absent) and returns
+    (new_document, message).  Returns (success, message, written) likewise.
+    """
+    def read():
+        data, obj = get_storage().read(blob_name)
+        return json.loads(data), obj
+
+    return _conditional_write(blob_name, mutate, read, dict,
+                              lambda document: json.dumps(document, separators=(",", ":")),
+                              {"content_type": "application/json"}, attempts, deadline, False)
+
+
+def _conditional_write(blob_name, mutate, read, empty, encode, write_args, attempts, deadline,
+                       delete_if_empty):
+    """
+    The retry loop shared by conditional_update() and conditional_update_document():
+    read() returns (value, StoredObject), empty() the value of an absent blob and
+    encode(value) the data to write.
+    """
+    attempts = attempts or UPDATE_ATTEMPTS
+    started = time.monotonic()
+    give_up_at = started + (UPDATE_DEADLINE if deadline is None else deadline)
+    _update_count(blob_name, updates=1)
+    conflicts = 0
+
+    for attempt in range(attempts):
+        attempt_start = time.perf_counter()
+        _update_count(blob_name, attempts=1)
+        try:
+            current, obj = read()
+            exists, generation = True, obj.generation
+        except NotFound:
+            # generation=0 means "write only if absent"
+            current, exists, generation = empty(), False, 0
+        except Exception as e:
+            return False, f"Failed to read {blob_name}: {e}", None
+
+        new_value, message = mutate(current, exists)
+        if new_value is None:
+            return True, message, None
+
+        try:
+            if delete_if_empty and not new_value:
+                if exists:
+                    get_storage().delete(blob_name, if_generation_match=generation)
+                written = None
+            else:
+                written = get_storage().write(blob_name, encode(new_value),
+                                              if_generation_match=generation, **write_args)
+            _update_count(blob_name, writes=1)
+            if conflicts:
+                _log_update(blob_name, "written", attempt + 1, conflicts, started)
+            return True, message, written
+        except (PreconditionFailed, NotFound):
+            # Another writer got there first — back off, then retry with a fresh read
+            conflicts += 1
+            _update_count(blob_name, conflicts=1)
+            record_timing("retry", time.perf_counter() - attempt_start, blob_name)
+        except Exception as e:
+            return False, f"Failed to update {blob_name}: {e}", None
+
+        if attempt + 1 < attempts:
+            delay = min(_backoff_delay(attempt), give_up_at - time.monotonic())
+            if delay < 0:
+                break
+            _update_count(blob_name, backoff_ms=delay * 1000)
+            time.sleep(delay)
+
+    # Out of attempts or time.  The rows are still in the summary log (or the
+    # individual files); a later compaction or admin regen will catch up.
+    _update_count(blob_name, gave_up=1)
+    _log_update(blob_name, "gave_up", attempt + 1, conflicts, started)
+    return False, f"Summary update for {blob_name} deferred", None
+
+
+# ---------------------------------------------------------------------------
+# Summary group commit
+# ---------------------------------------------------------------------------
+# Threads of one instance updating the same summary CSV would otherwise race
+# each other through generation-match retries.  Instead, changes to a blob
+# queue up while its current read-modify-write is in flight; the first thread
+# to arrive takes everything queued and applies it in one read-modify-write,
+# and every thread in the group gets that write's result.  Other instances
+# are still kept in line by generation-match.
+
+class _CommitGroup:
+    """Changes to one summary blob that will be written together."""
+
+    def __init__(self):
+        self.changes = []           # see _apply_summary_changes(), in arrival order
+        self.done = Future()
+
+
+_commit_lock = threading.Lock()
+_commit_open = {}                   # blob name -> _CommitGroup still accepting changes
+_commit_writers = {}                # blob name -> Lock held while a group is written
+_commit_stats = {"changes": 0, "commits": 0}
+
+
+def _commit_count(name, n=1):
+    with _commit_lock:
+        _commit_stats[name] += n
+
+
+def summary_commit_stats():
+    """
+    Changes requested and group commits made by this instance since it started
+    (writes, conflicts and give-ups are in conditional_update_stats()).
+    """
+    with _commit_lock:
+        return dict(_commit_stats)
+
+
+def _commit_summary_change(blob_name, changes, attempts):
+    """Apply changes to blob_name, sharing a write with concurrent changes when enabled."""
+    _commit_count("changes")
+    if not SUMMARY_GROUP_COMMIT:
+        _commit_count("commits")
+        return _update_summary_file(blob_name, changes, attempts)
+
+    with _commit_lock:
+        group = _commit_open.get(blob_name)
+        leader = group is None
+        if leader:
+            group = _commit_open[blob_name] = _CommitGroup()
+        group.changes.extend(changes)
+        writer = _commit_writers.setdefault(blob_name, threading.Lock())
+    if not leader:
+        return group.done.result()
+
+    # While the previous group for this blob is being written, later changes
+    # keep joining this one
+    with writer:
+        with _commit_lock:
+            del _commit_open[blob_name]
+            _commit_stats["commits"] += 1
+        try:
+            result = _update_summary_file(blob_name, group.changes, attempts)
+        except Exception as e:
+            result = (False, f"Failed to update {blob_name}: {e}")
+        group.done.set_result(result)
+    return result
+
+
+def _apply_summary_changes(rows, changes):
+    """
+    Return (rows, added, removed) after applying changes in order.  A change is
+    ("add", rows), ("remove", timestamp) or ("drop", set of _observation_key()s).
+    """
+    added = removed = 0
+    for kind, value in changes:
+        before = len(rows)
+        if kind == "add":
+            rows = _merge_rows(rows, value)
+            added += len(rows) - before
+        elif kind == "drop":
+            rows = [r for r in rows if _observation_key(r) not in value]
+            removed += before - len(rows)
+        else:
+            rows = [r for r in rows if r.timestamp != value]
+            removed += before - len(rows)
+    return rows, added, removed
+
+
+def _update_summary_file(blob_name, changes, attempts=None):
+    """
+    Apply changes to a summary CSV through conditional_update(), then rewrite
+    its columnar companion.  Saves only write log segments, so this runs from
+    compaction, reconciliation and admin deletes, never while a save waits.
+    Returns (success: bool, message: str).
+    """
+    def mutate(rows, exists):
+        updated, added, removed = _apply_summary_changes(rows, changes)
+        if not added and not removed:
+            if all(kind == "remove" for kind, _ in changes):
+                if not exists:
+                    return None, f"{blob_name} not found — nothing to remove"
+                return None, f"Removed 0 row(s) from {blob_name}"
+            return None, f"{blob_name} already up to date"
+        done = []
+        if added:
+            done.append(f"Added {added} row(s) to {blob_name}")
+        if removed:
+            done.append(f"Removed {removed} row(s) from {blob_name}")
+        written_rows[:] = updated
+        return updated, "; ".join(done)
+
+    written_rows = []   # rows of the attempt that was written
+    ok, msg, written = conditional_update(blob_name, mutate, attempts)
+    if written is not None:
+        write_summary_columns(blob_name, written_rows, written.generation)
+    if not ok and SUMMARY_QUEUE:
+        # Let reconciliation repair whatever this update would have changed
+        _summary_queue.request_reconcile()
+    return ok, msg
+
+
+# ---------------------------------------------------------------------------
+# Summary log
+# ---------------------------------------------------------------------------
 
-# Module-level storage client — created once per instance to avoid repeated auth overhead
-_storage_client = None
+def _summary_log_prefix(summary_file):
+    """Log prefix holding the pending segments for a summary CSV."""
+    m = _YEARLY_SUMMARY_RE.match(summary_file)
+    if m:
+        return f"{SUMMARY_LOG_PREFIX}{m.group(1)}/"
+    return SUMMARY_LOG_PREFIX
 
-def get_storage_client():
-    global _storage_client
-    if _storage_client is None:
+
+def _read_summary_log(prefix=SUMMARY_LOG_PREFIX):
+    """
+    Return [(StoredObject, rows)] for every log segment under prefix, oldest
+    name first.  Segments that vanish between listing and download (compacted
+    by another instance) are skipped.
+    """
+    segments = []
+    for listed in get_storage().list(prefix):
+        try:
+            rows, obj = _read_csv(listed.name)
+        except Exception:
+            continue
+        segments.append((obj, rows))
+    return segments
+
+
+def append_to_summary_log(rows, segment_name):
+    """
+    Record saved observations, all from the same year, in the summary log.
+
+    A single save names its segment after the observation file and a batch
+    save uses a unique batch name, so every save writes one small, uniquely
+    named object and never contends with other saves.
+    Returns (success: bool, message: str).
+    """
+    year = rows[0].year
+    try:
+        obj = get_storage().write(f"{SUMMARY_LOG_PREFIX}{year}/{segment_name}",
+                                  _csv_to_string(rows))
+        _cache_add_segment(obj.name, obj.generation, rows)
+        return True, f"Logged {segment_name} for summary"
+    except Exception as e:
+        return False, f"Failed to log {segment_name} for summary: {e}"
+
+
+def remove_from_summary_log(year, timestamp):
+    """
+    Remove rows matching timestamp from the year's pending log segments.
+    Returns (success: bool, message: str).
+    """
+    removed = 0
+    for blob, rows in _read_summary_log(f"{SUMMARY_LOG_PREFIX}{year}/"):
+        if not any(r.timestamp == timestamp for r in rows):
+            continue
+        dropped = [0]   # from the attempt that was written
+
+        def mutate(current, exists):
+            kept = [r for r in current if r.timestamp != timestamp]
+            dropped[0] = len(current) - len(kept)
+            # Unchanged if compacted meanwhile; the row is in the summary CSVs instead
+            return (kept if dropped[0] else None), ""
+
+        ok, msg, _ = conditional_update(blob.name, mutate, delete_if_empty=True)
+        if not ok:
+            return False, msg
+        removed += dropped[0]
+    return True, f"Removed {removed} row(s) from the summary log"
+
+
+def summary_log_due():
+    """
+    True once the summary log holds SUMMARY_LOG_COMPACT_THRESHOLD segments or
+    its oldest segment is more than SUMMARY_LOG_COMPACT_AGE seconds old.
+    """
+    segments = list(get_storage().list(SUMMARY_LOG_PREFIX))
+    if len(segments) >= SUMMARY_LOG_COMPACT_THRESHOLD:
+        return True
+    if not SUMMARY_LOG_COMPACT_AGE:
+        return False
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=SUMMARY_LOG_COMPACT_AGE)
+    return any(seg.updated is not None and seg.updated <= cutoff for seg in segments)
+
+
+def _delete_log_segments(segments):
+    """Delete folded segments, leaving any that were rewritten since they were read."""
+    for blob, _ in segments:
+        try:
+            get_storage().delete(blob.name, if_generation_match=blob.generation)
+        except (NotFound, PreconditionFailed):
+            pass
+        except Exception as e:
+            print(f"Could not delete log segment {blob.name}: {e}")
+
+
+def compact_summary_log():
+    """
+    Fold every pending log segment into the canonical summary CSVs, then delete
+    the segments.  Safe to run concurrently with saves and with itself: rows
+    already in a summary are skipped, and a segment is only deleted once its
+    rows are in both the yearly and the all-years summary.
+
+    Returns (success: bool, message: str, rows_folded: int).
+    """
+    segments = _read_summary_log()
+    if not segments:
+        return True, "Summary log is empty", 0
+
+    rows_by_year = {}
+    all_rows = []
+    for _, rows in segments:
+        for row in rows:
+            rows_by_year.setdefault(row.year, []).append(row)
+            all_rows.append(row)
+
+    results = [append_to_summary_file(_yearly_summary_name(year), rows)
+               for year, rows in sorted(rows_by_year.items())]
+    results.append(append_to_summary_file(SUMMARY_FILE_NAME, all_rows))
+    if not all(ok for ok, _ in results):
+        msg = "; ".join(m for ok, m in results if not ok)
+        print(f"Summary log compaction incomplete — {msg}")
+        return False, msg, 0
+
+    _delete_log_segments(segments)
+    invalidate_summary_cache()
+    return True, f"Folded {len(all_rows)} row(s) from {len(segments)} log segment(s)", len(all_rows)
+
+
+# ---------------------------------------------------------------------------
+# Summary maintenance queue
+# ---------------------------------------------------------------------------
+
+class _SummaryQueue:
+    """
+    Background worker that keeps the summary log up to date off the request path.
+
+    Saves write their observation file and then submit() the row here.
+    submit() records the observation files in a pending marker
+    (SUMMARY_PENDING_PREFIX/<instance>.<stamp>.json) before the save responds,
+    so queued rows are never only in memory.  The worker waits
+    SUMMARY_QUEUE_DELAY seconds so a burst of saves arrives together, writes
+    one log segment per year for everything queued and deletes the markers
+    whose rows are all logged.  Between batches it compacts the log once it
+    holds SUMMARY_LOG_COMPACT_THRESHOLD segments or its oldest segment is
+    SUMMARY_LOG_COMPACT_AGE seconds old.  A marker left behind by an instance that
+    was stopped or starved of CPU is picked up by any worker once it is older
+    than SUMMARY_PENDING_STALE seconds.
+
+    The worker runs after responses have been sent, so Cloud Run must keep
+    CPU allocated between requests (--no-cpu-throttling; see Deployment.md).
+
+    The queue holds at most SUMMARY_QUEUE_DEPTH rows.  When it is full,
+    submit() waits briefly and then logs the rows itself, so a backlog slows
+    saves down instead of growing without bound.
+    """
+
+    def __init__(self, depth, delay):
+        self.delay = delay
+        self._queue = queue.Queue(maxsize=depth)
+        self._compact = threading.Event()
+        self._reconcile = threading.Event()
+        self._last_reconcile = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = None           # stop event of the running worker thread
+        self._outstanding = 0       # rows submitted but not yet logged
+        self._markers = {}          # pending marker -> rows of it not yet logged
+        self._idle = threading.Condition(self._lock)
+        self._last_recovery = 0.0
+        self._last_log_check = 0.0
+        self.stats = {"submitted": 0, "logged": 0, "segments": 0, "inline": 0,
+                      "recovered": 0, "failures": 0}
+
+    def start(self):
+        """Start the worker thread if it is not running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,),
+                                                name="summary-queue", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Wait up to timeout seconds for every submitted row to be logged, then
+        end the worker thread.  Returns True if everything was logged.
+        """
+        drained = self.drain(timeout)
+        with self._lock:
+            thread, stop, self._thread = self._thread, self._stop, None
+        if thread is not None:
+            stop.set()
+            try:
+                self._queue.put_nowait(None)    # wake the worker
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        return drained
+
+    def submit(self, rows, source):
+        """
+        Queue saved rows for the summary log; source names them in log messages.
+        The rows' pending marker is written before this returns.
+        Returns (success: bool, message: str).
+        """
+        self.start()
+        marker = _write_pending_marker(rows)
+        with self._lock:
+            self._outstanding += len(rows)
+            if marker is not None:
+                self._markers[marker] = len(rows)
+        for n, row in enumerate(rows):
+            try:
+                self._queue.put((row, marker), timeout=SUMMARY_QUEUE_BLOCK)
+            except queue.Full:
+                # Backpressure: log what is left directly rather than dropping it
+                self._count("submitted", n)
+                self._count("inline", len(rows) - n)
+                ok, msg = _log_rows(rows[n:], f"inline.{_segment_stamp()}.csv")
+                self._finish(rows[n:], marker, ok)
+                self._done(len(rows) - n)
+                return ok, msg
+        self._count("submitted", len(rows))
+        return True, f"Queued {source} for summary"
+
+    def request_compaction(self):
+        """Ask the worker to compact the summary log on its next pass."""
+        self._compact.set()
+        self.start()
+
+    def request_reconcile(self):
+        """Ask the worker to reconcile the summaries (at most every RECONCILE_MIN_INTERVAL)."""
+        self._reconcile.set()
+        self.start()
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def snapshot(self):
+        with self._lock:
+            depth = self._queue.qsize()
+            return dict(self.stats, depth=depth, in_progress=max(0, self._outstanding - depth))
+
+    def _count(self, name, n):
+        with self._lock:
+            self.stats[name] += n
+
+    def _done(self, n):
+        with self._idle:
+            self._outstanding -= n
+            self._idle.notify_all()
+
+    def drain(self, timeout=None):
+        """Wait until every submitted row has been logged.  Returns True if the queue emptied."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            outstanding = self._outstanding
+        if outstanding:
+            self.start()
+        with self._idle:
+            while self._outstanding:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def _take(self):
+        """
+        Block for the first (row, marker) item, give a burst time to arrive,
+        then take everything queued.  The None that stop() queues is skipped.
+        """
+        try:
+            first = self._queue.get(timeout=min(SUMMARY_PENDING_STALE, 60))
+        except queue.Empty:
+            return []
+        if self.delay and first is not None:
+            time.sleep(self.delay)
+        items = [first]
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return [item for item in items if item is not None]
+
+    def _run(self, stop):
+        while not stop.is_set():
+            try:
+                items = self._take()
+                if items:
+                    try:
+                        self._log_batch(items)
+                    finally:
+                        self._done(len(items))
+                self._maintain()
+            except Exception as e:
+                # Never let the worker die; the rows are safe in their observation files
+                self._count("failures", 1)
+                print(f"Summary queue error: {e}")
+
+    def _maintain(self):
+        """Periodic work between batches: recovery, compaction and reconciliation."""
+        now = time.monotonic()
+        if now - self._last_recovery >= SUMMARY_PENDING_STALE:
+            self._last_recovery = now
+            self._count("recovered", recover_pending_summary_work())
+        check_every = min(SUMMARY_LOG_CHECK_INTERVAL, SUMMARY_LOG_COMPACT_AGE or SUMMARY_LOG_CHECK_INTERVAL)
+        if not self._compact.is_set() and now - self._last_log_check >= check_every:
+            self._last_log_check = now
+            if summary_log_due():
+                self._compact.set()
+        if self._compact.is_set():
+            self._compact.clear()
+            ok, msg, _ = compact_summary_log()
+            print(msg)
+        since = time.monotonic() - self._last_reconcile
+        if ((self._reconcile.is_set() and since >= RECONCILE_MIN_INTERVAL)
+                or (RECONCILE_INTERVAL and since >= RECONCILE_INTERVAL)):
+            self._reconcile.clear()
+            self._last_reconcile = time.monotonic()
+            ok, msg, _ = reconcile_summaries()
+            print(msg)
+
+    def _log_batch(self, items):
+        """Log queued (row, marker) items as one segment per year, then retire their markers."""
+        batch = _segment_stamp()
+        rows = [row for row, _ in items]
+        ok = True
+        for year, year_rows in _rows_by_year(rows).items():
+            log_ok, log_msg = _log_rows(year_rows, f"queued.{batch}.csv")
+            if log_ok:
+                self._count("logged", len(year_rows))
+                self._count("segments", 1)
+            else:
+                ok = False
+                self._count("failures", 1)
+                print(f"Summary update warning — {log_msg}")
+
+        if ok:
+            add_to_summary_metadata(rows)
+        for marker in {marker for _, marker in items}:
+            self._finish([row for row, m in items if m == marker], marker, ok)
+
+    def _finish(self, rows, marker, ok):
+        """
+        Account for rows of marker that were logged (ok) or failed.  A marker is
+        deleted once all its rows are logged; after a failure it is left for
+        recover_pending_summary_work() to retry.
+        """
+        if marker is None:
+            return
+        with self._lock:
+            remaining = self._markers.get(marker)
+            if remaining is None:
+                return
+            if not ok:
+                del self._markers[marker]
+                return
+            remaining -= len(rows)
+            if remaining > 0:
+                self._markers[marker] = remaining
+                return
+            del self._markers[marker]
+        try:
+            get_storage().delete(marker)
+        except NotFound:
+            pass    # recovered by another instance meanwhile
+        except Exception as e:
+            print(f"Could not delete pending marker {marker}: {e}")
+
+
+# Identifies this instance's pending markers
+_INSTANCE_ID = uuid.uuid4().hex[:12]
+
+
+def _segment_stamp():
+    """Unique, time-ordered name component for log segments and markers."""
+    now = datetime.datetime.now(tz=pytz.timezone("Canada/Pacific"))
+    return f"{now:%Y-%m-%d.%H-%M-%S}.{uuid.uuid4().hex[:12]}"
+
+
+def _write_pending_marker(rows):
+    """
+    Record the observation files behind rows in a new pending marker.
+    Returns the marker name, or None if it could not be written.
+    """
+    marker = f"{SUMMARY_PENDING_PREFIX}{_INSTANCE_ID}.{_segment_stamp()}.json"
+    files = sorted({observation_blob_name(_observation_filename(row.to_csv_row())) for row in rows})
+    try:
+        get_storage().write(marker, json.dumps({"instance": _INSTANCE_ID, "files": files}),
+                            content_type="application/json")
+        return marker
+    except Exception as e:
+        print(f"Could not write pending marker {marker}: {e}")
+        return None
+
+
+def _rows_by_year(rows):
+    by_year = {}
+    for row in rows:
+        by_year.setdefault(row.year, []).append(row)
+    return by_year
+
+
+def _log_rows(rows, segment_name):
+    """Log rows that may span several years.  Returns (success: bool, message: str)."""
+    results = [append_to_summary_log(year_rows, segment_name)
+               for year_rows in _rows_by_year(rows).values()]
+    return all(ok for ok, _ in results), "; ".join(msg for _, msg in results)
+
+
+def recover_pending_summary_work(stale_after=None):
+    """
+    Log the observations named in pending markers that have not been touched
+    for stale_after seconds (default SUMMARY_PENDING_STALE), then delete the
+    markers.  Logging a row twice is harmless: readers and compaction skip
+    rows they already have.  Returns the number of markers recovered.
+    """
+    stale_after = SUMMARY_PENDING_STALE if stale_after is None else stale_after
+    cutoff = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(seconds=stale_after)
+    recovered = 0
+    for marker in get_storage().list(SUMMARY_PENDING_PREFIX):
+        if marker.updated is not None and marker.updated > cutoff:
+            continue
+        try:
+            data, obj = get_storage().read(marker.name)
+            files = json.loads(data).get("files", [])
+        except NotFound:
+            continue    # another instance recovered it
+        except Exception as e:
+            print(f"Could not read pending marker {marker.name}: {e}")
+            continue
+
+        rows = []
+        for name in files:
+            try:
+                try:
+                    rows.extend(_read_csv(name)[0])
+                except NotFound:
+                    # Markers written before the obs/YYYY/ layout name flat files
+                    rows.extend(_read_csv(observation_blob_name(name))[0])
+            except NotFound:
+                pass    # deleted since it was saved
+            except Exception as e:
+                print(f"Could not recover {name} from {marker.name}: {e}")
+                break
+        else:
+            ok = True
+            if rows:
+                ok, msg = _log_rows(rows, f"recovered.{_segment_stamp()}.csv")
+                print(msg)
+            if ok:
+                try:
+                    get_storage().delete(marker.name, if_generation_match=obj.generation)
+                    recovered += 1
+                except (NotFound, PreconditionFailed):
+                    pass
+    return recovered
+
+
+_summary_queue = _SummaryQueue(SUMMARY_QUEUE_DEPTH, SUMMARY_QUEUE_DELAY)
+
+
+def queue_summary_update(rows, source):
+    """
+    Hand saved rows to the background summary queue (or log them directly
+    when COHA_SUMMARY_QUEUE=0).  Returns (success: bool, message: str).
+    """
+    if not SUMMARY_QUEUE:
+        ok, msg = _log_rows(rows, source)
+        if ok:
+            add_to_summary_metadata(rows)
+        return ok, msg
+    return _summary_queue.submit(rows, source)
+
+
+@atexit.register
+def _drain_summary_queue():
+    # Cloud Run sends SIGTERM before stopping an instance; log everything still
+    # queued or in flight.  Rows left over are recovered from their markers.
+    _summary_queue.stop(timeout=SUMMARY_QUEUE_BLOCK * 2)
+
+
+# ---------------------------------------------------------------------------
+# Summary cache
+# ---------------------------------------------------------------------------
+
+class _CachedSummary:
+    """
+    One summary CSV and its log segments, with their generations.  When the
+    summary was loaded from its columnar companion, table holds it and the
+    base rows are only decoded into Observations when something asks for them.
+    """
+
+    def __init__(self, generation=None, base_rows=None, segments=None, table=None):
+        self.generation = generation        # None when the summary CSV is absent
+        self.table = table                  # summary_columns.ColumnTable, or None
+        self._base_rows = list(base_rows) if base_rows is not None else None
+        self.segments = segments or {}      # segment name -> (generation, rows)
+        self.checked_at = time.monotonic()
+        # Changes whenever the summary CSV or any of its segments changes
+        self.version = (generation,) + tuple((name, gen) for name, (gen, _) in sorted(self.segments.items()))
+        self._rows = None
+        self._index = None
+
+    @property
+    def base_rows(self):
+        if self._base_rows is None:
+            self._base_rows = _observations_from_columns(self.table) if self.table is not None else []
+        return self._base_rows
+
+    @property
+    def rows(self):
+        """The summary's rows followed by those of its segments that it lacks."""
+        if self._rows is None:
+            rows = self.base_rows
+            for _, (_, segment_rows) in sorted(self.segments.items()):
+                rows = _merge_rows(rows, segment_rows)
+            self._rows = rows
+        return self._rows
+
+    @property
+    def index(self):
+        """SummaryIndex over rows, built on first use and kept for this version."""
+        if self._index is None:
+            self._index = SummaryIndex(self.rows)
+        return self._index
+
+
+# Per-instance cache keyed by summary blob name.  Entry rows are replaced, never
+# mutated, so readers can use an entry without holding the lock.
+_summary_cache = {}
+_summary_cache_lock = threading.Lock()
+
+
+def _load_summary(summary_file, cached=None):
+    """
+    Build a cache entry for summary_file, reusing whatever parts of cached are
+    still current.  Unchanged blobs cost a metadata request or a listing entry;
+    only new generations are downloaded, from the columnar companion when it
+    is current and from the CSV otherwise.
+    """
+    try:
+        generation = get_storage().stat(summary_file).generation
+    except NotFound:
+        generation = None
+    except Exception as e:
+        print(f"Could not read {summary_file}: {e}")
+        generation = None
+
+    base_rows, table = [], None
+    if cached is not None and generation is not None and generation == cached.generation:
+        base_rows, table = cached._base_rows, cached.table
+    elif generation is not None:
+        table = read_summary_columns(summary_file, generation)
+        if table is not None:
+            base_rows = None
+        else:
+            try:
+                base_rows, obj = _read_csv(summary_file)
+                generation = obj.generation
+            except Exception as e:
+                print(f"Could not read {summary_file}: {e}")
+                generation = None
+
+    old_segments = cached.segments if cached is not None else {}
+    segments = {}
+    for seg in get_storage().list(_summary_log_prefix(summary_file)):
+        known = old_segments.get(seg.name)
+        if known is not None and known[0] == seg.generation:
+            segments[seg.name] = known
+            continue
+        try:
+            rows, obj = _read_csv(seg.name)
+        except Exception:
+            continue    # compacted between listing and download
+        segments[seg.name] = (obj.generation, rows)
+
+    return _CachedSummary(generation, base_rows, segments, table)
+
+
+def _cache_add_segment(name, generation, rows):
+    """Fold a segment this instance just wrote into every cached summary it belongs to."""
+    with _summary_cache_lock:
+        for summary_file, entry in list(_summary_cache.items()):
+            if not name.startswith(_summary_log_prefix(summary_file)):
+                continue
+            segments = dict(entry.segments)
+            segments[name] = (generation, rows)
+            updated = _CachedSummary(entry.generation, entry._base_rows, segments, entry.table)
+            updated.checked_at = entry.checked_at
+            _summary_cache[summary_file] = updated
+
+
+def invalidate_summary_cache(summary_file=None):
+    """Drop one cached summary, or all of them."""
+    with _summary_cache_lock:
+        if summary_file is None:
+            _summary_cache.clear()
+        else:
+            _summary_cache.pop(summary_file, None)
+
+
+def read_summary_manifest():
+    """Return the files recorded by the last regeneration, or {} if there is no usable manifest."""
+    try:
+        files = json.loads(get_storage().read(SUMMARY_MANIFEST_NAME)[0]).get("files", {})
+        for entry in files.values():
+            entry["rows"] = [Observation.from_csv_row(r) for r in entry["rows"]]
+        return files
+    except NotFound:
+        return {}
+    except Exception as e:
+        print(f"Ignoring unreadable {SUMMARY_MANIFEST_NAME}: {e}")
+        return {}
+
+
+def write_summary_manifest(files):
+    """Save files ({name: {"generation", "md5", "rows"}}) as the manifest; failure is only logged."""
+    files = {name: dict(entry, rows=[r.to_csv_row() for r in entry["rows"]])
+             for name, entry in files.items()}
+    try:
+        get_storage().write(SUMMARY_MANIFEST_NAME, json.dumps({"files": files}, separators=(",", ":")),
+                            content_type="application/json")
+    except Exception as e:
+        print(f"Failed to save {SUMMARY_MANIFEST_NAME}: {e}")
+
+
+def regenerate_data_summaries(full=False, lease=None):
+    """
+    Rebuild all summary CSVs from the individual observation files.
+
+    By default only observation files that are new or whose generation changed
+    since the last run (per the summary manifest) are downloaded; everything
+    else is taken from the manifest, and files that no longer exist drop out.
+    full=True ignores the manifest and re-reads every file.  Run it through
+    regenerate_single_flight() so that only one rebuild runs at a time; that
+    passes its _RegenLease, and nothing is written, returning (None, None),
+    if the lease is no longer held once the files have been read.
+    """
+    manifest = {} if full else read_summary_manifest()
+    files = _scan_observations(manifest)
+    downloaded = sum(1 for name, f in files.items() if manifest.get(name) is not f)
+    removed = len(manifest.keys() - files.keys())
+    print(f"Regeneration: {len(files)} observation file(s), {downloaded} downloaded, {removed} removed")
+
+    yearly_data = {}
+    for f in files.values():
+        for row in f["rows"]:
+            yearly_data.setdefault(row.year, []).append(row)
+
+    # All-years summary sorted by year, then by quadrat/station/timestamp within each year
+    # (within-year order comes from the bucket listing, which is lexicographic by name)
+    data_sorted = []
+    for year in sorted(yearly_data.keys()):
+        data_sorted.extend(yearly_data[year])
+
+    # Snapshot the log before rewriting so that segments saved after the
+    # observation listing survive until the next compaction.
+    segments = _read_summary_log()
+
+    if lease is not None and not lease.held():
+        print(f"Regeneration: lost {REGEN_LOCK_NAME}; not writing the summaries")
+        return None, None
+
+    uploads = [(SUMMARY_FILE_NAME, data_sorted)]
+    uploads += [(_yearly_summary_name(year), rows) for year, rows in yearly_data.items()]
+    with ThreadPoolExecutor(max_workers=REGEN_CONCURRENCY) as pool:
+        results = list(pool.map(lambda u: write_summary_file(*u), uploads))
+    for ok, msg in results:
+        if not ok:
+            print(msg)
+    if all(ok for ok, _ in results):
+        write_summary_manifest(files)
+
+    regenerated = {_observation_key(r) for r in data_sorted}
+    _delete_log_segments([
+        (blob, rows) for blob, rows in segments
+        if all(_observation_key(r) in regenerated for r in rows)
+    ])
+    invalidate_summary_cache()
+    refresh_summary_metadata(rebuilt=True)
+
+    return data_sorted, yearly_data
+
+
+def _download_observation(blob, attempts=REGEN_DOWNLOAD_ATTEMPTS):
+    """
+    Download and parse one observation file, retrying transient failures with
+    exponential backoff and full jitter.  Returns [] if the file was deleted
+    since it was listed, and None if it could not be read.
+    """
+    for attempt in range(attempts):
+        attempt_start = time.perf_counter()
+        try:
+            return _read_csv(blob.name)[0]
+        except NotFound:
+            return []   # deleted since it was listed
+        except Exception as e:
+            if attempt == attempts - 1:
+                print(f"Skipping {blob.name}: {e}")
+                return None
+            time.sleep(random.uniform(0, 0.25 * 2 ** attempt))
+            record_timing("retry", time.perf_counter() - attempt_start, blob.name)
+    return None
+
+
+def _scan_observations(manifest, year=None, concurrency=REGEN_CONCURRENCY):
+    """
+    List observation files for the given year (or all years) and return
+    {filename: {"generation", "md5", "rows"}} in listing order.
+
+    Files whose generation matches the manifest reuse its rows; the rest are
+    downloaded through a bounded thread pool, starting while the listing is
+    still being paged.
+    """
+    listed = []     # (blob, manifest entry or Future)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for blob in _iter_observation_blobs(year):
+            known = manifest.get(blob.name)
+            if known is not None and known.get("generation") == blob.generation:
+                listed.append((blob, known))
+            else:
+                listed.append((blob, pool.submit(_download_observation, blob)))
+
+    files = {}
+    for blob, entry in listed:
+        if isinstance(entry, Future):
+            rows = entry.result()
+            # A file that could not be read is left out of the summaries and
+            # recorded without a generation, so the next run downloads it again
+            entry = {"generation": blob.generation if rows is not None else None,
+                     "md5": blob.md5_hash, "rows": rows or []}
+        files[blob.name] = entry
+    return files
+
+
+# ---------------------------------------------------------------------------
+# Summary metadata
+# ---------------------------------------------------------------------------
+# SUMMARY_METADATA_NAME is a small JSON description of the summary (years,
+# row counts per year and quadrat, latest observation) that pages needing
+# only the list of years read instead of the summary itself:
+#
+#   {"version": 1, "updated": "...", "rows": 1234, "rebuilt_at": "...",
+#    "years": {"2025": {"rows": 512, "quadrats": {"A": 30, ...},
+#                       "latest_observation": "2025-05-30.18-01-02",
+#                       "updated": "2025-05-30T18:01:05+00:00"}, ...}}
+#
+# "updated" times are when the figures last changed, and "rebuilt_at" when the
+# last regeneration finished, in UTC.  Saves add their
+# rows to the counts (add_to_summary_metadata()); deletes recompute their year
+# and regeneration and reconciliation recompute everything.
+
+_metadata_cache = (None, None, 0.0)     # (generation, metadata, checked at)
+_metadata_lock = threading.Lock()
+# Served while the metadata cannot be read and no earlier copy is cached
+_METADATA_UNAVAILABLE = {"version": 1, "updated": None, "rows": 0, "years": {}}
+
+
+def _summary_metadata(rows, previous=None):
+    """Build the metadata document for rows, keeping the "updated" times of unchanged years."""
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    years = {}
+    for row in rows:
+        year = years.setdefault(row.year, {"rows": 0, "quadrats": {}, "latest_observation": ""})
+        year["rows"] += 1
+        year["quadrats"][row.quadrat] = year["quadrats"].get(row.quadrat, 0) + 1
+        if row.timestamp > year["latest_observation"]:
+            year["latest_observation"] = row.timestamp
+    old_years = (previous or {}).get("years", {})
+    changed = set(years) ^ set(old_years)
+    for name, year in years.items():
+        year["quadrats"] = dict(sorted(year["quadrats"].items()))
+        old = old_years.get(name, {})
+        if {k: old.get(k) for k in year} == year:
+            year["updated"] = old.get("updated", now)
+        else:
+            year["updated"] = now
+            changed.add(name)
+    return {
+        "version": 1,
+        "updated": now if changed or not previous else previous.get("updated", now),
+        "rows": len(rows),
+        "years": dict(sorted(years.items())),
+    }, bool(changed)
+
+
+def refresh_summary_metadata(years=None, rebuilt=False):
+    """
+    Recompute SUMMARY_METADATA_NAME from the current all-years summary and its
+    log, rewriting it only if the figures changed.  The summary is revalidated
+    on every attempt, so a write that raced another instance's is redone with
+    that instance's rows included.  With years, only those years are
+    recomputed, each from its yearly summary, and the others are kept.
+    rebuilt=True (after a regeneration) records the time as "rebuilt_at".
+    Returns (success: bool, message: str).
+    """
+    def mutate(previous, exists):
+        if years is None or not exists:
+            entry = _refresh_summary_entry()
+            metadata, changed = _summary_metadata(entry.rows, previous if exists else None)
+            if rebuilt:
+                metadata["rebuilt_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+                changed = True
+            elif exists and "rebuilt_at" in previous:
+                metadata["rebuilt_at"] = previous["rebuilt_at"]
+        else:
+            old_years = previous.get("years", {})
+            rows = []
+            for year in years:
+                rows.extend(_refresh_summary_entry(_yearly_summary_name(year)).rows)
+            fresh, _ = _summary_metadata(rows, {"years": {y: old_years[y] for y in years if y in old_years}})
+            merged = dict(old_years)
+            for year in years:
+                if year in fresh["years"]:
+                    merged[year] = fresh["years"][year]
+                else:
+                    merged.pop(year, None)
+            changed = merged != old_years
+            metadata = dict(previous, years=dict(sorted(merged.items())),
+                            rows=sum(y["rows"] for y in merged.values()))
+            if changed:
+                metadata["updated"] = fresh["updated"]
+        if exists and not changed:
+            return None, f"{SUMMARY_METADATA_NAME} is up to date"
+        return metadata, f"Updated {SUMMARY_METADATA_NAME}: {metadata['rows']} row(s)"
+
+    ok, msg, _ = conditional_update_document(SUMMARY_METADATA_NAME, mutate)
+    if not ok:
+        print(msg)
+    return ok, msg
+
+
+def add_to_summary_metadata(rows):
+    """
+    Count newly logged rows into SUMMARY_METADATA_NAME without reading the
+    summary, so each save costs O(rows) however large the summary grows.
+    A row logged twice (as marker recovery may) is counted twice until
+    reconciliation or regeneration recomputes the figures.  A missing
+    document is left for get_summary_metadata() to build in full.
+    Returns (success: bool, message: str).
+    """
+    def mutate(metadata, exists):
+        if not exists:
+            return None, f"{SUMMARY_METADATA_NAME} does not exist yet"
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+        years = metadata.setdefault("years", {})
+        for row in rows:
+            year = years.setdefault(row.year, {"rows": 0, "quadrats": {}, "latest_observation": ""})
+            year["rows"] += 1
+            year["quadrats"][row.quadrat] = year["quadrats"].get(row.quadrat, 0) + 1
+            year["quadrats"] = dict(sorted(year["quadrats"].items()))
+            year["latest_observation"] = max(year["latest_observation"], row.timestamp)
+            year["updated"] = now
+        metadata["years"] = dict(sorted(years.items()))
+        metadata["rows"] = metadata.get("rows", 0) + len(rows)
+        metadata["updated"] = now
+        return metadata, f"Counted {len(rows)} row(s) into {SUMMARY_METADATA_NAME}"
+
+    ok, msg, _ = conditional_update_document(SUMMARY_METADATA_NAME, mutate)
+    if not ok:
+        print(msg)
+    return ok, msg
+
+
+def get_summary_metadata():
+    """
+    Return the summary metadata, from a per-instance copy that is revalidated
+    against its generation after SUMMARY_CACHE_TTL seconds.  Built from the
+    summary if it does not exist yet.  If storage fails, the last copy read
+    is returned, or _METADATA_UNAVAILABLE before any has been, so pages still
+    render.
+    """
+    global _metadata_cache
+    generation, metadata, checked_at = _metadata_cache
+    # An empty summary is rechecked on every call, so pages notice a finished rebuild at once
+    if metadata and metadata["years"] and time.monotonic() - checked_at < SUMMARY_CACHE_TTL:
+        return metadata
+    try:
+        try:
+            current = get_storage().stat(SUMMARY_METADATA_NAME).generation
+            if current != generation:
+                data, obj = get_storage().read(SUMMARY_METADATA_NAME)
+                metadata, current = json.loads(data), obj.generation
+        except NotFound:
+            refresh_summary_metadata()
+            data, obj = get_storage().read(SUMMARY_METADATA_NAME)
+            metadata, current = json.loads(data), obj.generation
+    except Exception as e:
+        print(f"Could not read {SUMMARY_METADATA_NAME}: {e}")
+        return metadata if metadata is not None else _METADATA_UNAVAILABLE
+    with _metadata_lock:
+        _metadata_cache = (current, metadata, time.monotonic())
+    return metadata
+
+
+# ---------------------------------------------------------------------------
+# Regeneration guard
+# ---------------------------------------------------------------------------
+# A full rebuild downloads every observation file, so only one may run at a
+# time: per instance (a lock) and per bucket (REGEN_LOCK_NAME, holding a
+# lease that the running rebuild renews and that another instance may take
+# over once it has expired).  Pages that find no summary start a rebuild in
+# the background and show a "building" notice instead of waiting for it.
+
+_regen_running = threading.Lock()
+
+
+def _regen_lease(expires=None):
+    expires = time.time() + REGEN_LOCK_LEASE if expires is None else expires
+    return json.dumps({"instance": _INSTANCE_ID, "expires": expires})
+
+
+class _RegenLease:
+    """The bucket lock of a running rebuild, and until when it is known to be ours."""
+
+    def __init__(self, lock, expires):
+        self.lock = lock
+        self.expires = expires
+        self.lost = False
+
+    def held(self):
+        """False once another instance took the lock, or a renewal is overdue so that one may."""
+        return not self.lost and time.time() < self.expires
+
+
+def _read_regen_lock():
+    """Return (expiry time, StoredObject) of the bucket lock; raises NotFound if nobody holds it."""
+    data, obj = get_storage().read(REGEN_LOCK_NAME)
+    try:
+        return float(json.loads(data).get("expires", 0)), obj
+    except (ValueError, AttributeError):
+        return 0.0, obj
+
+
+def _acquire_regen_lock():
+    """Take the bucket-wide rebuild lease.  Returns the lock object, or None if someone holds it."""
+    try:
+        return get_storage().write(REGEN_LOCK_NAME, _regen_lease(), content_type="application/json",
+                                   if_generation_match=0)
+    except PreconditionFailed:
+        pass
+    try:
+        expires, obj = _read_regen_lock()
+    except NotFound:
+        return None     # released just now; the caller can try again later
+    if expires > time.time():
+        return None
+    try:
+        # The holder's lease ran out (instance stopped mid-rebuild); take it over
+        print(f"Taking over expired {REGEN_LOCK_NAME}")
+        return get_storage().write(REGEN_LOCK_NAME, _regen_lease(), content_type="application/json",
+                                   if_generation_match=obj.generation)
+    except PreconditionFailed:
+        return None
+
+
+def _hold_regen_lock(lease, stop):
+    """Renew lease every third of REGEN_LOCK_LEASE until stop is set or the lock is lost."""
+    while not stop.wait(REGEN_LOCK_LEASE / 3):
+        expires = time.time() + REGEN_LOCK_LEASE
+        try:
+            lease.lock = get_storage().write(REGEN_LOCK_NAME, _regen_lease(expires),
+                                             content_type="application/json",
+                                             if_generation_match=lease.lock.generation)
+            lease.expires = expires
+        except (PreconditionFailed, NotFound):
+            print(f"Lost {REGEN_LOCK_NAME}; another instance may start a rebuild")
+            lease.lost = True
+            return
+        except Exception as e:
+            print(f"Could not renew {REGEN_LOCK_NAME}: {e}")
+
+
+def regenerate_single_flight(full=False):
+    """
+    Run regenerate_data_summaries(full) unless a rebuild is already running on
+    this instance or, per the bucket lock, on another one.  If the lease is
+    lost before the summaries are written (renewals starved of CPU, say), the
+    rebuild is abandoned rather than racing the instance that took over.
+    Returns (ran: bool, message: str, data rows or None).
+    """
+    if not _regen_running.acquire(blocking=False):
+        return False, "A regeneration is already running", None
+    try:
+        acquired_at = time.time()
+        lock = _acquire_regen_lock()
+        if lock is None:
+            return False, "A regeneration is already running on another instance", None
+        lease = _RegenLease(lock, acquired_at + REGEN_LOCK_LEASE)
+        stop = threading.Event()
+        renewer = threading.Thread(target=_hold_regen_lock, args=(lease, stop), daemon=True)
+        renewer.start()
         try:
-            if GCP_PROJECT_ID:
-                _storage_client = storage.Client(project=GCP_PROJECT_ID)
-            else:
-                _storage_client = storage.Client()
-        except Exception as e:
-            print(f"Error creating storage client: {e}")
-            _storage_client = storage.Client.create_anonymous_client()
-    return _storage_client
+            data, _ = regenerate_data_summaries(full=full, lease=lease)
+        finally:
+            stop.set()
+            renewer.join()
+            if not lease.lost:
+                try:
+                    get_storage().delete(REGEN_LOCK_NAME, if_generation_match=lease.lock.generation)
+                except (PreconditionFailed, NotFound):
+                    pass
+        if data is None:
+            return False, f"Regeneration abandoned: lost {REGEN_LOCK_NAME} before writing the summaries", None
+        return True, f"Regenerated summaries from {len(data)} observations", data
+    finally:
+        _regen_running.release()
+
+
+def regeneration_in_progress():
+    """True while this instance, or another holding a live lease, is rebuilding the summaries."""
+    if _regen_running.locked():
+        return True
+    try:
+        return _read_regen_lock()[0] > time.time()
+    except NotFound:
+        return False
 
 
-def get_bucket():
-    return get_storage_client().bucket(STORAGE_BUCKET_NAME)
+def start_background_regeneration(full=False):
+    """Start a single-flight rebuild in a background thread unless one is already running."""
+    if regeneration_in_progress():
+        return
+    threading.Thread(target=regenerate_single_flight, kwargs={"full": full},
+                     name="summary-regen", daemon=True).start()
 
 
 # ---------------------------------------------------------------------------
-# Private helpers
+# Summary reconciliation
 # ---------------------------------------------------------------------------
 
-def _csv_to_string(columns, rows):
-    """Serialise a list of dicts to a CSV string with a header row."""
-    buf = io.StringIO()
-    writer = csv.DictWriter(buf, fieldnames=columns)
-    writer.writeheader()
-    writer.writerows(rows)
-    return buf.getvalue()
-
-
-def _year_from_filename(name):
-    """Extract the 4-digit year from an observation filename (Q.SS.YYYY-...)."""
-    return name[5:9]
+# Keys listed per summary in the reconciliation report
+RECONCILE_REPORT_EXAMPLES = 20
 
 
-def _iter_observation_blobs(year=None):
+def _observation_file_exists(key):
     """
-    Yield GCS blob objects whose names match the observation file pattern.
-    If year is given, only blobs for that year are yielded.
+    Whether the observation file for an _observation_key() exists now, in
+    either layout.  Errors count as existing, so nothing is dropped on a guess.
     """
-    year_str = str(year) if year is not None else None
-    for blob in get_storage_client().list_blobs(STORAGE_BUCKET_NAME):
-        if not _DATA_FILE_RE.match(blob.name):
-            continue
-        if year_str is not None and _year_from_filename(blob.name) != year_str:
+    quadrat, station, timestamp = key
+    station = f"{station:02d}" if isinstance(station, int) else station
+    filename = f"{quadrat}.{station}.{timestamp}.csv"
+    for name in (observation_blob_name(filename), filename):
+        try:
+            get_storage().stat(name)
+            return True
+        except NotFound:
             continue
-        yield blob
-
+        except Exception as e:
+            print(f"Could not check {name}: {e}")
+            return True
+    return False
 
-# ---------------------------------------------------------------------------
-# GCS read/write
-# ---------------------------------------------------------------------------
 
-def csv_write_to_google_cloud(filename, columns, data):
+def reconcile_summaries(repair=True):
     """
-    Unconditionally write a CSV to GCS (used by full regeneration).
-    Returns (success: bool, message: str).
+    Compare the summaries with the observation files and repair the differences.
+
+    One listing of the observation files gives their names and generations.
+    Each summary (with its pending log) is checked for:
+    - missing rows: an observation file whose row is not in the summary
+    - extra rows: a summary row with no observation file, confirmed by a stat
+      after the summary is read, since a save made after the listing has a
+      row but was not listed
+    - changed rows: a file whose generation differs from the last regeneration's
+      manifest and whose row no longer matches the summary
+    Only the files behind missing and changed rows are downloaded, and only
+    summaries that differ are rewritten (through conditional_update), so a
+    check that finds nothing costs a listing plus a read of each summary,
+    far less than regenerate_data_summaries().  With repair=False nothing is
+    written except the report.
+
+    The report is saved as SUMMARY_RECONCILE_NAME and logged.
+    Returns (success: bool, message: str, report: dict).
     """
-    blob = get_bucket().blob(filename)
-    blob.cache_control = "max-age=0,no-store"
+    started = time.monotonic()
+    manifest = read_summary_manifest()
+    files = {_filename_key(blob.name): blob for blob in _iter_observation_blobs()}
+    years = {key[2][:4] for key in files}
+    for blob in get_storage().list("COHA-data-", delimiter="/"):
+        m = _YEARLY_SUMMARY_RE.match(blob.name)
+        if m:
+            years.add(m.group(1))
+
+    downloaded = {}     # filename -> row or None, shared by every summary
+
+    def file_row(blob):
+        if blob.name not in downloaded:
+            rows = _download_observation(blob)
+            downloaded[blob.name] = rows[0] if rows else None
+        return downloaded[blob.name]
+
+    report = {
+        "checked_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "repair": repair,
+        "files": len(files),
+        "summaries": {},
+    }
+    ok_all = True
+    drifted = 0
+    logged_extras = set()   # (year, timestamp) of extra rows still in the summary log
+    for summary_file in [SUMMARY_FILE_NAME] + [_yearly_summary_name(y) for y in sorted(years)]:
+        m = _YEARLY_SUMMARY_RE.match(summary_file)
+        year = m.group(1) if m else None
+        expected = {k: blob for k, blob in files.items() if year is None or k[2][:4] == year}
+        entry = _load_summary(summary_file)
+        present = {_observation_key(r): r for r in entry.rows}
+        logged = {_observation_key(r) for _, rows in entry.segments.values() for r in rows}
+
+        missing = [k for k in expected if k not in present]
+        extra = [k for k in present if k not in expected and not _observation_file_exists(k)]
+        changed = []
+        for k, blob in expected.items():
+            known = manifest.get(blob.name)
+            if k in present and known is not None and known.get("generation") != blob.generation:
+                row = file_row(blob)
+                if row is not None and row.to_csv_values() != present[k].to_csv_values():
+                    changed.append(k)
+
+        result = {"rows": len(present), "missing": len(missing), "extra": len(extra),
+                  "changed": len(changed)}
+        if missing or extra or changed:
+            drifted += 1
+            result["examples"] = [".".join(str(p) for p in k)
+                                  for k in (missing + extra + changed)[:RECONCILE_REPORT_EXAMPLES]]
+        if repair and (missing or extra or changed):
+            changes = []
+            if extra or changed:
+                changes.append(("drop", set(extra) | set(changed)))
+            add_rows = [row for row in (file_row(expected[k]) for k in missing + changed) if row is not None]
+            if add_rows:
+                changes.append(("add", add_rows))
+            ok, msg = _commit_summary_change(summary_file, changes, None)
+            result["repaired"] = ok
+            result["message"] = msg
+            ok_all = ok_all and ok
+            logged_extras |= {(k[2][:4], k[2]) for k in extra if k in logged}
+        report["summaries"][summary_file] = result
+
+    for log_year, timestamp in sorted(logged_extras):
+        ok, msg = remove_from_summary_log(log_year, timestamp)
+        if not ok:
+            ok_all = False
+            print(msg)
+    if repair and drifted:
+        invalidate_summary_cache()
+    if repair:
+        # Also corrects counts that add_to_summary_metadata() got wrong
+        refresh_summary_metadata()
+
+    report["downloaded"] = len(downloaded)
+    report["elapsed_s"] = round(time.monotonic() - started, 3)
+    if not drifted:
+        message = f"Summaries match {len(files)} observation file(s)"
+    elif repair:
+        message = f"Repaired {drifted} summary file(s)" if ok_all else f"Could not repair all of {drifted} summary file(s)"
+    else:
+        message = f"{drifted} summary file(s) differ from the observation files"
+    report["message"] = message
     try:
-        blob.upload_from_string(_csv_to_string(columns, data), content_type="text/csv")
-        return True, f"saved data to file {filename}"
+        get_storage().write(SUMMARY_RECONCILE_NAME, json.dumps(report, indent=1),
+                            content_type="application/json")
     except Exception as e:
-        return False, f"Failed to save data: {e}"
+        print(f"Failed to save {SUMMARY_RECONCILE_NAME}: {e}")
+    print(json.dumps({"severity": "WARNING" if drifted else "INFO", "message": message,
+                      "reconcile": report}, separators=(",", ":")), flush=True)
+    return ok_all, message, report
 
 
-def remove_from_summary_file(blob_name, timestamp, max_retries=3):
-    """
-    Remove all rows matching timestamp from a summary CSV using generation-match.
+def last_reconcile_report():
+    """The report saved by the last reconcile_summaries() run, or None."""
+    try:
+        return json.loads(get_storage().read(SUMMARY_RECONCILE_NAME)[0])
+    except NotFound:
+        return None
 
-    Matching on timestamp is sufficient: each individual file has one row whose
-    timestamp value equals the timestamp encoded in its filename.  If two files
-    somehow share the same timestamp (manual imports, etc.) all matching rows are
-    removed — correct behaviour since the source file no longer exists.
 
-    Returns (success: bool, message: str).
+def _get_summary_entry(summary_file=SUMMARY_FILE_NAME):
     """
-    blob = get_bucket().blob(blob_name)
-    blob.cache_control = "max-age=0,no-store"
+    Return the current cache entry for summary_file: the summary CSV merged
+    with its pending log segments, and an index over those rows.
 
-    for attempt in range(max_retries):
-        try:
-            content = blob.download_as_text()
-            generation = blob.generation
-            rows = list(csv.DictReader(io.StringIO(content)))
-        except Exception:
-            return True, f"{blob_name} not found — nothing to remove"
+    After SUMMARY_CACHE_TTL seconds the entry is revalidated against the GCS
+    generations and only changed blobs are downloaded again.  Once the log
+    grows past SUMMARY_LOG_COMPACT_THRESHOLD segments, the summary queue is
+    asked to compact it.
+    """
+    with _summary_cache_lock:
+        cached = _summary_cache.get(summary_file)
+    if cached is not None and time.monotonic() - cached.checked_at < SUMMARY_CACHE_TTL:
+        return cached
+
+    entry = _refresh_summary_entry(summary_file)
+    if len(entry.segments) >= SUMMARY_LOG_COMPACT_THRESHOLD:
+        if SUMMARY_QUEUE:
+            _summary_queue.request_compaction()
+        else:
+            ok, msg, _ = compact_summary_log()
+            print(msg)
+    elif entry.segments:
+        # The worker folds in segments once they are old enough; make sure it
+        # runs on instances that serve reads but have not saved anything
+        _summary_queue.start()
+    return entry
+
+
+def _refresh_summary_entry(summary_file=SUMMARY_FILE_NAME):
+    """Revalidate the cache entry for summary_file now, whatever its age."""
+    with _summary_cache_lock:
+        cached = _summary_cache.get(summary_file)
+    entry = _load_summary(summary_file, cached)
+    if cached is not None and entry.version == cached.version:
+        entry = cached
+        entry.checked_at = time.monotonic()
+    with _summary_cache_lock:
+        _summary_cache[summary_file] = entry
+    return entry
+
+
+def get_summary_index(summary_file=SUMMARY_FILE_NAME):
+    """
+    Return a SummaryIndex over the summary and its pending log segments, for
+    lookups by station and date without scanning every row.  The index is
+    built once per summary version and shared by all requests.
+    """
+    return _get_summary_entry(summary_file).index
 
-        filtered = [r for r in rows if r.get("timestamp") != timestamp]
-        removed = len(rows) - len(filtered)
 
-        try:
-            blob.upload_from_string(
-                _csv_to_string(FILE_FIELD_NAMES, filtered),
-                content_type="text/csv",
-                if_generation_match=generation
+def sanitize_text_input(untrusted, max_len=100):
+    sanitized = re.sub(r"[^A-Za-z.,:; ']", "", untrusted)
+    return sanitized[:max_len]
+
+
+def requires_admin(f):
+    """Decorator: enforce HTTP Basic Auth using the COHA_ADMIN_PASSWORD env var."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not ADMIN_PASSWORD:
+            return Response(
+                "Admin access not configured — set the COHA_ADMIN_PASSWORD environment variable.",
+                503
             )
-            return True, f"Removed {removed} row(s) from {blob_name}"
-        except PreconditionFailed:
-            continue
-        except Exception as e:
-            return False, f"Failed to update {blob_name}: {e}"
+        auth = request.authorization
+        if not auth or auth.password != ADMIN_PASSWORD:
+            return Response(
+                "Authentication required",
+                401,
+                {"WWW-Authenticate": 'Basic realm="COHA Admin"'}
+            )
+        return f(*args, **kwargs)
+    return decorated
 
-    return False, f"Gave up updating {blob_name} after {max_retries} retries"
 
+# ---------------------------------------------------------------------------
+# Precompressed responses
+# ---------------------------------------------------------------------------
 
-def append_to_summary_file(blob_name, new_row, max_retries=3):
-    """
-    Append a row to a summary CSV using GCS generation-match for concurrency safety.
+class _Payload:
+    """A response body serialised and compressed once, served many times."""
 
-    If two Cloud Run instances try to update the summary simultaneously, the
-    generation-match precondition causes one write to fail. The loser retries,
-    re-reading the (now updated) file so neither observation is lost.
+    def __init__(self, body, mimetype="application/json"):
+        self.body = body
+        self.mimetype = mimetype
+        self.gzip = gzip.compress(body, compresslevel=9, mtime=0)
+        self.br = brotli.compress(body) if brotli is not None else None
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # Strong validators must differ per content-coding
+        self.etags = {"identity": f'"{digest}"', "gzip": f'"{digest}-gz"', "br": f'"{digest}-br"'}
 
-    Returns (success: bool, message: str).
+
+def _send_payload(payload, cache_control="no-cache"):
+    """
+    Serve a precompressed payload, honouring Accept-Encoding and
+    If-None-Match.  With the default Cache-Control browsers revalidate every
+    time, so unchanged data costs a 304.
     """
-    blob = get_bucket().blob(blob_name)
-    blob.cache_control = "max-age=0,no-store"
+    accepted = request.accept_encodings
+    if payload.br is not None and accepted["br"]:
+        coding, body = "br", payload.br
+    elif accepted["gzip"]:
+        coding, body = "gzip", payload.gzip
+    else:
+        coding, body = "identity", payload.body
 
-    for attempt in range(max_retries):
-        try:
-            content = blob.download_as_text()
-            generation = blob.generation
-            rows = list(csv.DictReader(io.StringIO(content)))
-        except Exception:
-            # File does not exist yet; generation=0 means "write only if absent"
-            rows = []
-            generation = 0
+    headers = {
+        "ETag": payload.etags[coding],
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if any(request.if_none_match.contains(tag.strip('"')) for tag in payload.etags.values()):
+        return Response(status=304, headers=headers)
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(body, mimetype=payload.mimetype, headers=headers)
 
-        rows.append(new_row)
 
-        try:
-            blob.upload_from_string(
-                _csv_to_string(FILE_FIELD_NAMES, rows),
-                content_type="text/csv",
-                if_generation_match=generation
-            )
-            return True, f"Updated {blob_name}"
-        except PreconditionFailed:
-            # Another instance wrote first — retry with fresh read
-            continue
-        except Exception as e:
-            return False, f"Failed to update {blob_name}: {e}"
+# ---------------------------------------------------------------------------
+# Fingerprinted static files
+# ---------------------------------------------------------------------------
 
-    # All retries exhausted. The individual observation file was already saved
-    # safely; a future admin regen will bring the summary back in sync.
-    print(f"Warning: gave up updating {blob_name} after {max_retries} retries")
-    return False, f"Summary update for {blob_name} deferred — individual file saved safely"
+# Written by build_assets.py: static/dist/<name>.<hash>.<ext>, with .br/.gz
+# variants of scripts and stylesheets, and a manifest mapping each name in
+# static/ to its copy
+ASSET_DIST_DIR = os.path.join(app.static_folder, "dist")
+ASSET_MANIFEST_FILE = os.path.join(ASSET_DIST_DIR, "manifest.json")
+ASSET_MAX_AGE = 31536000
+_ASSET_SUFFIXES = {"br": ".br", "gzip": ".gz"}
 
 
-def regenerate_data_summaries():
-    """
-    Full regeneration: read every individual observation file and rebuild all
-    summary CSVs. Slow but always correct; called only from the admin endpoint
-    and as a cold-start fallback.
-    """
-    data = get_data()
-    yearly_data = parse_data_by_year(data)
+def _load_asset_manifest():
+    """Return (name -> entry, fingerprinted file -> entry); empty if nothing was built."""
+    try:
+        with open(ASSET_MANIFEST_FILE, "r") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        print("No asset manifest: serving static files without fingerprints (run build_assets.py)")
+        return {}, {}
+    return manifest, {entry["file"]: entry for entry in manifest.values()}
 
-    # All-years summary sorted by year, then by quadrat/station/timestamp within each year
-    # (within-year order comes from list_blobs, which is lexicographic by blob name)
-    data_sorted = []
-    for year in sorted(yearly_data.keys()):
-        data_sorted.extend(yearly_data[year])
 
-    csv_write_to_google_cloud(SUMMARY_FILE_NAME, FILE_FIELD_NAMES, data_sorted)
-    for year, rows in yearly_data.items():
-        csv_write_to_google_cloud(f"COHA-data-{year}.csv", FILE_FIELD_NAMES, rows)
+_asset_manifest, _asset_files = _load_asset_manifest()
 
-    return data_sorted, yearly_data
 
+def asset_url(name):
+    """URL of a file from static/: its fingerprinted copy once build_assets.py has run."""
+    entry = _asset_manifest.get(name)
+    return "/dist/" + entry["file"] if entry else "/" + name
 
-def parse_data_by_year(data):
-    """Group a list of observation dicts by year string."""
-    yearly_data = {}
-    for row in data:
-        year = row["timestamp"][0:4]
-        yearly_data.setdefault(year, []).append(row)
-    return yearly_data
 
+app.jinja_env.globals["asset_url"] = asset_url
 
-def get_data(year=None):
-    """
-    Read individual observation files for the given year (or all years).
-    Uses blob objects from list_blobs directly — no redundant API calls.
-    """
-    data = []
-    for blob in _iter_observation_blobs(year):
-        try:
-            content = blob.download_as_text()
-            for row in csv.DictReader(io.StringIO(content)):
-                data.append(dict(row))
-        except Exception as e:
-            print(f"Skipping {blob.name}: {e}")
-    return data
 
+@app.route('/dist/<name>')
+def fingerprinted_asset(name):
+    """Serve a fingerprinted file, precompressed where the client accepts it; cached for a year."""
+    entry = _asset_files.get(name)
+    if entry is None:
+        abort(404)
+    accepted = request.accept_encodings
+    coding = next((c for c in entry["encodings"] if accepted[c]), None)
+    response = send_from_directory(ASSET_DIST_DIR, name + _ASSET_SUFFIXES.get(coding, ""),
+                                   mimetype=mimetypes.guess_type(name)[0], max_age=ASSET_MAX_AGE)
+    response.cache_control.immutable = True
+    if coding is not None:
+        response.headers["Content-Encoding"] = coding
+    if entry["encodings"]:
+        response.vary.add("Accept-Encoding")
+    return response
 
-def get_summary_data(summary_file=SUMMARY_FILE_NAME):
-    """Read data from a summary CSV. Returns empty list if the file is absent."""
-    data = []
-    try:
-        content = get_bucket().blob(summary_file).download_as_text()
-        for row in csv.DictReader(io.StringIO(content)):
-            data.append(dict(row))
-    except Exception as e:
-        print(f"Could not read {summary_file}: {e}")
-    return data
 
+# ---------------------------------------------------------------------------
+# Station coordinates
+# ---------------------------------------------------------------------------
+
+STATION_COORDS_FILE = os.path.join(app.static_folder, "COHA-Station-Coordinates-v1.csv")
 
-def load_station_coords():
+# (file mtime, frozen coords, JSON payload).  Loaded at import and reloaded
+# only when the CSV changes, e.g. after update_station_coordinates.py.
+_station_coords = None
+_station_coords_lock = threading.Lock()
+
+
+def _read_station_coords():
     coords = {}
-    with open("static/COHA-Station-Coordinates-v1.csv", "r") as f:
+    with open(STATION_COORDS_FILE, "r") as f:
         for row in csv.DictReader(f):
             q, s = row["Quadrat"], row["Station"]
             coords.setdefault(q, {})[s] = {
@@ -291,67 +2255,119 @@ def load_station_coords():
     return coords
 
 
-def sanitize_text_input(untrusted, max_len=100):
-    sanitized = re.sub(r"[^A-Za-z.,:; ']", "", untrusted)
-    return sanitized[:max_len]
+def _get_station_coords():
+    global _station_coords
+    mtime = os.stat(STATION_COORDS_FILE).st_mtime_ns
+    state = _station_coords
+    if state is None or state[0] != mtime:
+        with _station_coords_lock:
+            state = _station_coords
+            if state is None or state[0] != mtime:
+                coords = _read_station_coords()
+                frozen = MappingProxyType({
+                    q: MappingProxyType({s: MappingProxyType(c) for s, c in by_station.items()})
+                    for q, by_station in coords.items()
+                })
+                payload = _Payload(json.dumps(coords, separators=(",", ":")).encode("utf-8"))
+                state = (mtime, frozen, payload)
+                _station_coords = state
+    return state
 
 
-def get_cookie_data():
-    observers = sanitize_text_input(request.cookies.get('observers', ''))
-    quadrat   = request.cookies.get('quadrat', 'Choose')
-    quadrat   = quadrat if quadrat in quadrats else 'Choose'
-    return observers, quadrat
+def load_station_coords():
+    """Return the station coordinates as a read-only {quadrat: {station: {...}}} mapping."""
+    return _get_station_coords()[1]
 
 
-def is_iphone():
-    return re.search('iPhone', str(request.headers.get("user-agent"))) is not None
+def station_coords_url():
+    """Versioned URL of the station coordinates; changes whenever the CSV does."""
+    return "/stations.json?v=" + _get_station_coords()[2].etags["identity"].strip('"')
 
 
-def requires_admin(f):
-    """Decorator: enforce HTTP Basic Auth using the COHA_ADMIN_PASSWORD env var."""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        if not ADMIN_PASSWORD:
-            return Response(
-                "Admin access not configured — set the COHA_ADMIN_PASSWORD environment variable.",
-                503
-            )
-        auth = request.authorization
-        if not auth or auth.password != ADMIN_PASSWORD:
-            return Response(
-                "Authentication required",
-                401,
-                {"WWW-Authenticate": 'Basic realm="COHA Admin"'}
-            )
-        return f(*args, **kwargs)
-    return decorated
+_get_station_coords()
+
+
+@app.route('/stations.json')
+def station_coords_json():
+    """Serve the station coordinates; long-cached when requested by versioned URL."""
+    payload = _get_station_coords()[2]
+    if request.args.get('v') == payload.etags["identity"].strip('"'):
+        return _send_payload(payload, cache_control="public, max-age=31536000, immutable")
+    return _send_payload(payload)
 
 
 # ---------------------------------------------------------------------------
 # Survey form
 # ---------------------------------------------------------------------------
 
-@app.route('/')
-def collect_data():
-    observers, quadrat = get_cookie_data()
-    iphone = is_iphone()
+# (station coordinates URL, payload) for the pre-rendered form page.  The page
+# holds nothing specific to a user or device: coha.js fills in the observers and
+# quadrat from cookies and picks the iPhone or Android layout itself, so every
+# visitor gets the same bytes and browsers can reuse them.
+_form_page = None
+_form_page_lock = threading.Lock()
+
+
+FORM_PAGE_MESSAGE = "Select Station and conditions before starting the survey."
+
+
+def _render_form_page(stations_url, message=FORM_PAGE_MESSAGE):
     return render_template('coha-ui.html',
-                           observers=observers, quadrat=quadrat,
-                           message="Select Station and conditions before starting the survey.",
-                           iphone=iphone,
+                           message=message,
                            quadrats=quadrats, stations=stations,
-                           coords=load_station_coords(),
+                           stations_url=stations_url,
                            maps_api_key=MAPS_API_KEY,
                            map_id=MAP_ID)
 
 
-@app.route('/save/', methods=['GET', 'POST'])
-def save_data():
+def _get_form_page():
+    """Render the survey form once per version of the station coordinates."""
+    global _form_page
+    stations_url = station_coords_url()
+    state = _form_page
+    if state is None or state[0] != stations_url:
+        with _form_page_lock:
+            state = _form_page
+            if state is None or state[0] != stations_url:
+                page_html = _render_form_page(stations_url)
+                state = (stations_url, _Payload(page_html.encode("utf-8"), mimetype="text/html"))
+                _form_page = state
+    return state[1]
+
+
+# What the form page says after a save posted without JavaScript, keyed by the
+# ?outcome= that /save/ redirects with.  Fixed strings, so a link cannot put
+# arbitrary text on the form.
+SAVE_OUTCOME_MESSAGES = {
+    "saved": "Observation saved.",
+    "invalid": "ERROR: the observation was not saved: some values are missing or invalid.  "
+               "Check the form and save again.",
+    "error": "ERROR: the observation could not be saved.  Try again in a moment.",
+}
+
+
+@app.route('/')
+def collect_data():
+    message = SAVE_OUTCOME_MESSAGES.get(request.args.get("outcome"))
+    if message:
+        # After a save posted without JavaScript (see save_data()); rendered
+        # for this response only, the cached page is left as it is
+        response = Response(_render_form_page(station_coords_url(), message), mimetype="text/html")
+        response.headers["Cache-Control"] = "no-store"
+        return response
+    return _send_payload(_get_form_page(),
+                         cache_control=f"public, max-age={FORM_CACHE_MAX_AGE}, stale-while-revalidate=86400")
+
+
+def validate_observation(values, timestamp):
+    """
+    Validate and sanitise one observation's form values (a dict of strings
+    keyed by FORM_FIELD_NAMES).  Returns (fields, ok_to_save, message), where
+    fields includes the timestamp and message explains any rejection.
+    """
     ASCII_MAP = {k: '^' for k in range(32)}
     ok_to_save = True
     bad = "bad value"
-    timestamp = datetime.datetime.now(tz=pytz.timezone("Canada/Pacific")).strftime("%Y-%m-%d.%H-%M-%S")
-    observers, quadrat = get_cookie_data()
 
     fields = {"timestamp": timestamp}
     errmsg = "ERROR: Failed to save observation.   "
@@ -359,7 +2375,7 @@ def save_data():
 
     for field in FORM_FIELD_NAMES:
         try:
-            fields[field] = request.form[field]
+            fields[field] = values[field]
         except Exception:
             fields[field] = ""
             if field not in OPTIONAL_FIELDS:
@@ -403,81 +2419,411 @@ def save_data():
 
     for key in ("direction", "distance"):
         if fields.get(key):
-            fields[key] = str(int(re.sub(r"[^0-9]", "", fields[key])))[:4]
+            digits = re.sub(r"[^0-9]", "", fields[key])
+            fields[key] = str(int(digits))[:4] if digits else ""
         else:
             fields[key] = ""
 
     if any(fields[f] == bad for f in FORM_FIELD_NAMES):
         ok_to_save = False
 
-    if ok_to_save:
-        # 1. Write the individual observation file — this is the canonical record.
-        #    Each filename is unique (quadrat + station + timestamp), so there is
-        #    no possibility of a write conflict here.
-        filename = "{}.{:02d}.{}.csv".format(
-            fields['quadrat'], int(fields['station']), timestamp
-        )
-        ok, msg = csv_write_to_google_cloud(filename, FILE_FIELD_NAMES, [fields])
+    return fields, ok_to_save, "" if ok_to_save else errmsg + msg
 
-        if ok:
-            # 2. Update the summary files using generation-match conditional writes.
-            #    If a concurrent save causes a collision, the loser retries so both
-            #    observations end up in the summary.  If all retries fail the
-            #    individual file is still safe and an admin regen will fix the summary.
-            year = timestamp[:4]
-            ok1, m1 = append_to_summary_file(f"COHA-data-{year}.csv", fields)
-            ok2, m2 = append_to_summary_file(SUMMARY_FILE_NAME, fields)
-            if not ok1 or not ok2:
-                print(f"Summary update warning — {m1}; {m2}")
-    else:
-        msg = errmsg + msg
 
-    iphone = is_iphone()
-    return render_template('coha-ui.html',
-                           observers=observers, quadrat=quadrat,
-                           message=msg, iphone=iphone,
-                           quadrats=quadrats, stations=stations,
-                           coords=load_station_coords(),
-                           maps_api_key=MAPS_API_KEY,
-                           map_id=MAP_ID)
+def _observation_filename(fields):
+    return "{}.{:02d}.{}.csv".format(fields['quadrat'], int(fields['station']), fields['timestamp'])
+
+
+@app.route('/save/', methods=['GET', 'POST'])
+def save_data():
+    """
+    Save one observation posted from the survey form.  Responds with JSON
+    {"status": "saved" | "invalid" | "error", "message": ...}; the form page
+    shows the message, so the page itself is never sent again.  A browser
+    posting the form without JavaScript (it asks for HTML rather than JSON)
+    is redirected to the form instead, with the status as ?outcome= (see
+    SAVE_OUTCOME_MESSAGES).
+    """
+    if request.method == 'GET':
+        # Bookmarks of the page that used to be rendered here after a save
+        return redirect('/')
+
+    def respond(status, message, code=200):
+        if request.accept_mimetypes.best_match(["application/json", "text/html"]) == "text/html":
+            return redirect(f"/?outcome={status}", 303)
+        return jsonify({"status": status, "message": message}), code
+
+    timestamp = datetime.datetime.now(tz=pytz.timezone("Canada/Pacific")).strftime("%Y-%m-%d.%H-%M-%S")
+    fields, ok_to_save, msg = validate_observation(request.form, timestamp)
+    if not ok_to_save:
+        return respond("invalid", msg, 400)
+
+    # 1. Write the individual observation file — this is the canonical record.
+    #    Each filename is unique (quadrat + station + timestamp), so there is
+    #    no possibility of a write conflict here.
+    filename = _observation_filename(fields)
+    observation = Observation.from_csv_row(fields)
+    ok, msg = csv_write_to_google_cloud(observation_blob_name(filename), [observation])
+    if not ok:
+        return respond("error", msg, 500)
+
+    # 2. Queue the row for the summary log.  The background worker
+    #    coalesces queued saves into one log segment per year, so the
+    #    response only waits for the write above.  If logging fails the
+    #    individual file is still safe and an admin regen will fix the summary.
+    log_ok, log_msg = queue_summary_update([observation], filename)
+    if not log_ok:
+        print(f"Summary update warning — {log_msg}")
+    return respond("saved", msg)
+
+
+# Most observations one /save/batch request may carry
+BATCH_SAVE_LIMIT = 100
+# Device times older than this, or further ahead of the server clock than
+# BATCH_MAX_SKEW, are not trusted; the observation gets the time it arrived
+BATCH_MAX_AGE = datetime.timedelta(days=30)
+BATCH_MAX_SKEW = datetime.timedelta(minutes=15)
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}\.\d{2}-\d{2}-\d{2}$")
+
+
+def _batch_timestamp(value, now):
+    """
+    Return (timestamp, note): the survey time recorded on the device when an
+    observation was queued, or the server's receipt time when the device time
+    is malformed or implausible (a phone with a wrong clock must not lose its
+    observations).  note explains the substitution, else it is None.  Times
+    are Canada/Pacific, like server-assigned timestamps.
+    """
+    received = now.strftime("%Y-%m-%d.%H-%M-%S")
+    if not isinstance(value, str) or not _TIMESTAMP_RE.match(value):
+        return received, f"no valid device time; saved with the time it was received ({received})"
+    try:
+        when = pytz.timezone("Canada/Pacific").localize(datetime.datetime.strptime(value, "%Y-%m-%d.%H-%M-%S"))
+    except ValueError:
+        return received, f"no valid device time; saved with the time it was received ({received})"
+    if when > now + BATCH_MAX_SKEW or when < now - BATCH_MAX_AGE:
+        return received, f"device time {value} is implausible; saved with the time it was received ({received})"
+    return value, None
+
+
+def _save_new_observation(filename, observation):
+    """
+    Write an observation file only if it does not exist yet, so a batch that
+    is re-sent after a lost response does not save anything twice.
+    Returns "saved", "duplicate" or an error message.
+    """
+    try:
+        get_storage().write(filename, _csv_to_string([observation]), if_generation_match=0)
+        return "saved"
+    except PreconditionFailed:
+        return "duplicate"
+    except Exception as e:
+        return f"Failed to save data: {e}"
+
+
+@app.route('/save/batch', methods=['POST'])
+def save_batch():
+    """
+    Save observations queued on a device while it was offline.
+
+    Expects JSON {"observations": [{"id": ..., "timestamp": "YYYY-MM-DD.HH-MM-SS",
+    <form fields>}, ...]} and validates each one like /save/.  Observation files
+    are written concurrently and the new rows are queued for the summary log.
+    An implausible device timestamp is replaced by the receipt time (see
+    _batch_timestamp()) rather than rejected.  Responds with a status per id:
+    "saved", "duplicate" (already saved by an earlier attempt), "invalid"
+    (will never be accepted) or "error" (worth retrying).
+    """
+    payload = request.get_json(silent=True)
+    items = payload.get("observations") if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return jsonify({"error": "expected a JSON object with an observations list"}), 400
+    if len(items) > BATCH_SAVE_LIMIT:
+        return jsonify({"error": f"at most {BATCH_SAVE_LIMIT} observations per batch"}), 413
+
+    now = datetime.datetime.now(tz=pytz.timezone("Canada/Pacific"))
+    results = []
+    pending = {}    # filename -> (result, Observation)
+    substituted = 0
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({"id": None, "status": "invalid", "message": "not an object"})
+            continue
+        result = {"id": item.get("id")}
+        results.append(result)
+        # Receipt times are a second apart, so observations from one device
+        # with a broken clock do not collide as duplicates of each other
+        timestamp, note = _batch_timestamp(item.get("timestamp"),
+                                           now + datetime.timedelta(seconds=substituted))
+        if note:
+            substituted += 1
+        values = {k: str(v) for k, v in item.items() if k in FORM_FIELD_NAMES and v is not None}
+        fields, ok_to_save, msg = validate_observation(values, timestamp)
+        if not ok_to_save:
+            result.update(status="invalid", message=msg)
+            continue
+        filename = observation_blob_name(_observation_filename(fields))
+        result["filename"] = filename
+        if note:
+            result["note"] = note
+        if filename in pending:
+            result.update(status="duplicate", message=f"{filename} appears twice in this batch")
+            continue
+        pending[filename] = (result, Observation.from_csv_row(fields))
+
+    saved = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(REGEN_CONCURRENCY, len(pending))) as pool:
+            outcomes = pool.map(lambda p: _save_new_observation(p[0], p[1][1]), pending.items())
+        for (filename, (result, observation)), outcome in zip(pending.items(), outcomes):
+            if outcome == "saved":
+                result.update(status="saved", message=f"saved data to file {filename}")
+                if result.get("note"):
+                    result["message"] += f" ({result['note']})"
+                saved.append(observation)
+            elif outcome == "duplicate":
+                result.update(status="duplicate", message=f"{filename} was already saved")
+            else:
+                result.update(status="error", message=outcome)
+
+    if saved:
+        log_ok, log_msg = queue_summary_update(saved, f"batch.{_segment_stamp()}.csv")
+        if not log_ok:
+            print(f"Summary update warning — {log_msg}")
+
+    return jsonify({"saved": len(saved), "results": results})
+
+
+# ---------------------------------------------------------------------------
+# Offline support
+# ---------------------------------------------------------------------------
+
+# Files from static/ the service worker keeps, besides the form page and the
+# station coordinates, so the form starts without a connection
+OFFLINE_ASSETS = ["coha.js", "coha.css", "iphone.css", "android.css", "NoSleep.min.js",
+                  "COHA.modified.mp3", "favicon.ico"]
+
+# (form page payload, sw.js payload); rebuilt when the form page changes
+_service_worker = None
+_service_worker_lock = threading.Lock()
+
+
+def _get_service_worker():
+    """
+    Render sw.js for the current form page.  Its version hashes everything it
+    precaches, so browsers reinstall it whenever any of those files change.
+    """
+    global _service_worker
+    page = _get_form_page()
+    state = _service_worker
+    if state is None or state[0] is not page:
+        with _service_worker_lock:
+            state = _service_worker
+            if state is None or state[0] is not page:
+                urls = [asset_url(name) for name in OFFLINE_ASSETS]
+                digest = hashlib.sha256(page.body)
+                for url in urls:
+                    with open(os.path.join(app.static_folder, url.lstrip("/")), "rb") as f:
+                        digest.update(f.read())
+                script = render_template('sw.js', version=digest.hexdigest()[:16],
+                                         urls=["/", station_coords_url()] + urls)
+                state = (page, _Payload(script.encode("utf-8"), mimetype="text/javascript"))
+                _service_worker = state
+    return state[1]
+
+
+@app.route('/sw.js')
+def service_worker():
+    """The form's service worker; always revalidated so updates reach devices."""
+    return _send_payload(_get_service_worker())
 
 
 # ---------------------------------------------------------------------------
 # Map
 # ---------------------------------------------------------------------------
 
+# (summary version, payloads) for the all-years summary; rebuilt only when
+# the summary generation or its log segments change.
+_map_payloads = (None, None)
+_map_payloads_lock = threading.Lock()
+
+# year -> (yearly summary version, payload), built from COHA-data-YYYY.csv
+_year_payloads = {}
+# (metadata document, payload) for /map/years
+_years_payload = (None, None)
+
+
+def _build_map_payloads(index):
+    """Serialise each year once and assemble the all-years body from the parts."""
+    years = index.years()
+    by_year = {}
+    for year in years:
+        by_year[year] = json.dumps([r.to_csv_row() for r in index.query(year=year)],
+                                   separators=(",", ":")).encode("utf-8")
+    all_years = b"{" + b",".join(json.dumps(y).encode("utf-8") + b":" + by_year[y] for y in years) + b"}"
+    return {"all": _Payload(all_years)}
+
+
+def _get_map_payloads():
+    global _map_payloads
+    entry = _get_summary_entry()
+    with _map_payloads_lock:
+        version, payloads = _map_payloads
+        if version != entry.version:
+            payloads = _build_map_payloads(entry.index)
+            _map_payloads = (entry.version, payloads)
+    return payloads
+
+
+def _columns_json_rows(table):
+    """
+    The JSON object for each row of a ColumnTable, as json.dumps() writes
+    Observation.to_csv_row() with compact separators.  Each distinct value of
+    a dictionary-encoded column is encoded once and the rows are joined from
+    the column lists, so no per-row objects are built.
+    """
+    fields = []
+    for name in FILE_FIELD_NAMES:
+        prefix = json.dumps(name) + ":"
+        if table.kind(name) == "category":
+            encoded = [prefix + json.dumps(v) for v in table.categories(name)]
+            fields.append(map(encoded.__getitem__, table.codes(name).tolist()))
+        else:
+            fields.append([prefix + json.dumps(v) for v in table.column(name)])
+    return ["{" + ",".join(values) + "}" for values in zip(*fields)]
+
+
+def _columns_keys(table):
+    """_observation_key() of each row of a ColumnTable, read from its columns."""
+    quadrats = [q or None for q in table.column("quadrat")]
+    stations = [station_key(Observation.parse_field("station", s)) for s in table.column("station")]
+    timestamps = [t or None for t in table.column("timestamp")]
+    return set(zip(quadrats, stations, timestamps))
+
+
+def _year_payload_body(entry):
+    """
+    JSON list of the entry's rows.  A summary loaded from its columnar
+    companion is serialised from the columns; only the rows of pending log
+    segments, which are few, go through Observations.
+    """
+    if entry.table is None:
+        return json.dumps([r.to_csv_row() for r in entry.rows], separators=(",", ":"))
+    with timed("columns-json"):
+        parts = _columns_json_rows(entry.table)
+        if entry.segments:
+            seen = _columns_keys(entry.table)
+            for _, (_, rows) in sorted(entry.segments.items()):
+                for row in rows:
+                    key = _observation_key(row)
+                    if key not in seen:
+                        seen.add(key)
+                        parts.append(json.dumps(row.to_csv_row(), separators=(",", ":")))
+        return "[" + ",".join(parts) + "]"
+
+
+def _get_year_payload(year):
+    """Return the JSON payload for one year's summary, or None if it has no rows."""
+    entry = _get_summary_entry(_yearly_summary_name(year))
+    with _map_payloads_lock:
+        version, payload = _year_payloads.get(year, (None, None))
+        if version != entry.version:
+            payload = None
+            body = _year_payload_body(entry)
+            if body != "[]":
+                payload = _Payload(body.encode("utf-8"))
+            _year_payloads[year] = (entry.version, payload)
+    return payload
+
+
+def _summary_years():
+    """
+    Years with survey data, from the summary metadata, and whether the
+    summaries are being rebuilt.  When there is no summary (first deployment
+    or an emptied bucket) a rebuild is started in the background, unless one
+    has already finished and found nothing: the next save adds its year.
+    """
+    metadata = get_summary_metadata()
+    years = list(metadata["years"])
+    if years or metadata is _METADATA_UNAVAILABLE or metadata.get("rebuilt_at"):
+        # Without readable metadata, a rebuild would fail on the same storage
+        return years, False
+    start_background_regeneration()
+    return years, regeneration_in_progress()
+
+
+def _get_years_payload():
+    """{"years": [...], "counts": {year: rows}} from the summary metadata, rebuilt when it changes."""
+    global _years_payload
+    metadata = get_summary_metadata()
+    with _map_payloads_lock:
+        source, payload = _years_payload
+        if source is not metadata:
+            years = metadata["years"]
+            body = {"years": list(years), "counts": {y: info["rows"] for y, info in years.items()}}
+            payload = _Payload(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+            _years_payload = (metadata, payload)
+    return payload
+
+
 @app.route('/map/')
 def show_map():
-    """Display survey points. Reads summary file only — no individual file scans."""
-    data = get_summary_data()
-    if not data:
-        # Summary missing (e.g. first deployment); fall back to full regeneration
-        data, _ = regenerate_data_summaries()
-
-    yearly_data = parse_data_by_year(data)
+    """Display survey points.  Reads only the summary metadata; the page fetches the data."""
     year = datetime.date.today().year
-    years = sorted(yearly_data.keys())
+    years, building = _summary_years()
     if str(year) not in years and years:
         year = years[-1]
 
     return render_template('coha-map.html',
                            year=year,
                            years=years,
+                           building=building,
                            maps_api_key=MAPS_API_KEY,
                            map_id=MAP_ID)
 
 
 @app.route('/map/data')
 def map_data():
-    """Return all survey data as JSON for client-side map rendering."""
+    """Return all survey data as JSON, keyed by year."""
     try:
-        data = get_summary_data()
-        return jsonify(parse_data_by_year(data))
+        return _send_payload(_get_map_payloads()["all"])
     except Exception as e:
         print(f"Error in map_data: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/map/data/<year>')
+def map_data_year(year):
+    """
+    Return one year's survey data as JSON.  Reads only that year's summary, so
+    the map's first load does not grow with the number of survey seasons.
+    """
+    if not _YEAR_RE.match(year):
+        return jsonify({"error": "invalid year"}), 400
+    try:
+        # Only years the summary knows are cached, so arbitrary years cannot
+        # grow the per-instance summary cache
+        if year not in get_summary_metadata()["years"]:
+            return jsonify({"error": f"no data for {year}"}), 404
+        payload = _get_year_payload(year)
+        if payload is None:
+            return jsonify({"error": f"no data for {year}"}), 404
+        return _send_payload(payload)
+    except Exception as e:
+        print(f"Error in map_data_year: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/map/years')
+def map_years():
+    """Return the years with survey data and their observation counts."""
+    try:
+        return _send_payload(_get_years_payload())
+    except Exception as e:
+        print(f"Error in map_years: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 # ---------------------------------------------------------------------------
 # Data download
 # ---------------------------------------------------------------------------
@@ -485,28 +2831,183 @@ def map_data():
 @app.route('/data/')
 def csv_data():
     """Display links to download the public summary CSV files."""
-    data = get_summary_data()
-    if not data:
-        data, _ = regenerate_data_summaries()
-
-    yearly_data = parse_data_by_year(data)
-    years = sorted(yearly_data.keys())
+    years, building = _summary_years()
     yearly_summaries = {
         y: f"{STORAGE_BUCKET_PUBLIC_URL}/COHA-data-{y}.csv" for y in years
     }
     return render_template("coha-download.html",
                            all_years=SUMMARY_FILE_PUBLIC_URL,
                            years=years,
-                           yearly_summaries=yearly_summaries)
+                           building=building,
+                           yearly_summaries=yearly_summaries,
+                           quadrats=quadrats[1:],
+                           stations=stations[1:])
+
+
+# Rows are flushed to the client in chunks of about this many characters
+EXPORT_CHUNK_SIZE = 64 * 1024
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _multi_arg(name):
+    """Values of a query parameter given repeatedly and/or comma-separated."""
+    values = []
+    for arg in request.args.getlist(name):
+        values.extend(v.strip() for v in arg.split(",") if v.strip())
+    return values
+
+
+def _parse_export_filters():
+    """
+    Read the /data/export filters from the query string.
+    Returns (filters dict, None) or (None, error message).
+    """
+    years = _multi_arg("year")
+    quadrat_filter = [q.upper() for q in _multi_arg("quadrat")]
+    station_filter = _multi_arg("station")
+    detection = request.args.get("detection", "").lower()
+    date_from = request.args.get("from", "")
+    date_to = request.args.get("to", "")
+
+    if any(not _YEAR_RE.match(y) for y in years):
+        return None, "year must be YYYY"
+    if any(q not in quadrats[1:] for q in quadrat_filter):
+        return None, "quadrat must be one of A-X"
+    if any(s not in stations[1:] for s in station_filter):
+        return None, "station must be 1-16"
+    if detection not in ("", "yes", "no"):
+        return None, "detection must be yes or no"
+    for value, label in ((date_from, "from"), (date_to, "to")):
+        if value:
+            try:
+                if not _DATE_RE.match(value):
+                    raise ValueError
+                datetime.date.fromisoformat(value)
+            except ValueError:
+                return None, f"{label} must be a YYYY-MM-DD date"
+
+    return {
+        "years": set(years),
+        "quadrats": set(quadrat_filter),
+        "stations": {int(s) for s in station_filter},
+        "detection": detection,
+        "from": date_from,
+        "to": date_to,
+    }, None
+
+
+def _export_matches(obs, filters):
+    if filters["quadrats"] and obs.quadrat not in filters["quadrats"]:
+        return False
+    if filters["stations"] and station_key(obs.station) not in filters["stations"]:
+        return False
+    if filters["detection"] and is_detection(obs) != (filters["detection"] == "yes"):
+        return False
+    date = obs.timestamp[:10]
+    if filters["from"] and date < filters["from"]:
+        return False
+    if filters["to"] and date > filters["to"]:
+        return False
+    return True
+
+
+def _export_years(filters):
+    """
+    Years to read: every year with a summary or pending log segments, narrowed
+    to the requested ones.  Years without data are never looked up, so
+    arbitrary year filters cannot grow the summary cache.
+    """
+    years = set()
+    for obj in get_storage().list("COHA-data-"):
+        m = _YEARLY_SUMMARY_RE.match(obj.name)
+        if m:
+            years.add(m.group(1))
+    for obj in get_storage().list(SUMMARY_LOG_PREFIX):
+        years.add(obj.name[len(SUMMARY_LOG_PREFIX):].split("/")[0])
+    if filters["years"]:
+        years &= filters["years"]
+    if filters["from"]:
+        years = {y for y in years if y >= filters["from"][:4]}
+    if filters["to"]:
+        years = {y for y in years if y <= filters["to"][:4]}
+    return sorted(y for y in years if _YEAR_RE.match(y))
+
+
+def _iter_export_rows(filters):
+    """
+    Yield matching Observations one year at a time, in timestamp order, from
+    the cached index over each yearly summary and its pending log segments.
+    Dates and detections are looked up through the index; with both quadrat
+    and station filters each station's visits are read directly.
+    """
+    detected = {"yes": True, "no": False}.get(filters["detection"])
+    if filters["quadrats"] and filters["stations"]:
+        stations = [(q, s) for q in sorted(filters["quadrats"]) for s in sorted(filters["stations"])]
+    else:
+        stations = [(None, None)]
+    for year in _export_years(filters):
+        index = get_summary_index(_yearly_summary_name(year))
+        matches = [index.query(year=year, quadrat=quadrat, station=station, start=filters["from"] or None,
+                               end=filters["to"] or None, detected=detected)
+                   for quadrat, station in stations]
+        for obs in heapq.merge(*matches, key=lambda o: o.timestamp or ""):
+            if _export_matches(obs, filters):
+                yield obs
+
+
+def _stream_csv(observations, compress):
+    """Serialise Observations as CSV in EXPORT_CHUNK_SIZE pieces, optionally gzipped."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(FILE_FIELD_NAMES)
+
+    def take():
+        chunk = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+        return compressor.compress(chunk) if compressor else chunk
+
+    for obs in observations:
+        writer.writerow(obs.to_csv_values())
+        if buf.tell() >= EXPORT_CHUNK_SIZE:
+            chunk = take()
+            if chunk:
+                yield chunk
+    chunk = take()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+@app.route('/data/export')
+def export_data():
+    """
+    Stream the observations matching the query as CSV.  Filters (all optional,
+    combined with AND; list filters accept repeats or commas):
+    year=2024,2025  quadrat=G  station=5  detection=yes|no  from=YYYY-MM-DD  to=YYYY-MM-DD
+    """
+    filters, error = _parse_export_filters()
+    if error:
+        return Response(error, 400, mimetype="text/plain")
+
+    compress = bool(request.accept_encodings["gzip"])
+    headers = {
+        "Content-Disposition": 'attachment; filename="COHA-data-export.csv"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(_stream_csv(_iter_export_rows(filters), compress)),
+                    mimetype="text/csv", headers=headers)
 
 
 # ---------------------------------------------------------------------------
 # Admin
 # ---------------------------------------------------------------------------
 
-_YEAR_RE = re.compile(r"^\d{4}$")
-
-
 @app.route('/admin/')
 @requires_admin
 def admin_page():
@@ -522,21 +3023,26 @@ def admin_page():
     op_file  = request.args.get('file', '')
     op_count = request.args.get('count', '')
 
-    filenames = []
-    all_years = set()
+    # Year prefixes only, then one year's files
+    all_years = observation_years()
+    filenames = sorted((blob.name for blob in _iter_observation_blobs(selected_year)),
+                       key=_observation_basename)
 
-    for blob in _iter_observation_blobs():   # no year filter — collect all_years in one pass
-        file_year = _year_from_filename(blob.name)
-        all_years.add(file_year)
-        if file_year == selected_year:
-            filenames.append(blob.name)
-
-    filenames.sort()
+    # What the yearly summary holds, so drift from the files shows at a glance
+    summary_rows = summary_stations = None
+    if selected_year in all_years:
+        try:
+            index = get_summary_index(_yearly_summary_name(selected_year))
+            summary_rows, summary_stations = len(index), len(index.stations(selected_year))
+        except Exception as e:
+            print(f"Could not read the {selected_year} summary: {e}")
 
     return render_template('coha-admin.html',
                            year=selected_year,
-                           all_years=sorted(all_years),
+                           all_years=all_years,
                            filenames=filenames,
+                           summary_rows=summary_rows,
+                           summary_stations=summary_stations,
                            op=op,
                            op_file=op_file,
                            op_count=op_count)
@@ -547,10 +3053,10 @@ def admin_page():
 def admin_view():
     """Return the raw CSV content of a single observation file as plain text."""
     filename = request.args.get('filename', '')
-    if not _DATA_FILE_RE.match(filename):
+    if not _OBSERVATION_BLOB_RE.match(filename):
         return "Invalid filename", 400
     try:
-        content = get_bucket().blob(filename).download_as_text()
+        content = get_storage().read(filename)[0]
         return Response(content, mimetype='text/plain')
     except Exception as e:
         return f"Could not read {filename}: {e}", 500
@@ -561,40 +3067,93 @@ def admin_view():
 def admin_delete():
     """Delete an individual observation file and remove it from the summary files."""
     filename = request.form.get('filename', '')
-    if not _DATA_FILE_RE.match(filename):
+    if not _OBSERVATION_BLOB_RE.match(filename):
         return "Invalid filename", 400
 
     # Read the timestamp from the file before deleting so we know what to remove
     try:
-        content = get_bucket().blob(filename).download_as_text()
-        rows = list(csv.DictReader(io.StringIO(content)))
-        timestamp = rows[0].get("timestamp", "") if rows else ""
+        rows, _ = _read_csv(filename)
+        timestamp = rows[0].timestamp if rows else ""
     except Exception as e:
         return f"Could not read {filename}: {e}", 500
 
     try:
-        get_bucket().blob(filename).delete()
+        get_storage().delete(filename)
     except Exception as e:
         return f"Failed to delete {filename}: {e}", 500
 
     # Remove the deleted row from both summary files
     year = _year_from_filename(filename)
-    ok1, m1 = remove_from_summary_file(f"COHA-data-{year}.csv", timestamp)
+    ok1, m1 = remove_from_summary_file(_yearly_summary_name(year), timestamp)
     ok2, m2 = remove_from_summary_file(SUMMARY_FILE_NAME, timestamp)
-    if not ok1 or not ok2:
-        print(f"Summary update warning after delete — {m1}; {m2}")
+    ok3, m3 = remove_from_summary_log(year, timestamp)
+    invalidate_summary_cache()
+    refresh_summary_metadata(years={year})
+    if not ok1 or not ok2 or not ok3:
+        print(f"Summary update warning after delete — {m1}; {m2}; {m3}")
 
-    return redirect(f"/admin/?year={year}&op=deleted&file={filename}")
+    return redirect(f"/admin/?year={year}&op=deleted&file={_observation_basename(filename)}")
 
 
 @app.route('/admin/regen/', methods=['POST'])
 @requires_admin
 def admin_regen():
-    """Force a full regeneration of all summary files from individual observation files."""
-    data, _ = regenerate_data_summaries()
+    """
+    Regenerate all summary files from individual observation files.  Only new
+    or changed files are read unless the form asks for a full rebuild.
+    """
+    ran, msg, data = regenerate_single_flight(full=request.form.get('full') == '1')
+    if not ran:
+        return redirect("/admin/?op=regen-busy")
     return redirect(f"/admin/?op=regenerated&count={len(data)}")
 
 
+@app.route('/admin/metrics')
+@requires_admin
+def admin_metrics():
+    """
+    Latency histograms per endpoint and phase since this instance started.
+    Add ?format=json for the raw figures.  Each Cloud Run instance keeps its own.
+    """
+    snapshot = timing_snapshot()
+    snapshot["summary_queue"] = _summary_queue.snapshot()
+    snapshot["summary_commits"] = summary_commit_stats()
+    snapshot["conditional_updates"] = conditional_update_stats()
+    if request.args.get('format') == 'json':
+        return jsonify(snapshot)
+    return render_template('coha-admin-metrics.html', metrics=snapshot)
+
+
+@app.route('/admin/reconcile/', methods=['GET', 'POST'])
+@requires_admin
+def admin_reconcile():
+    """
+    POST: compare the summaries with the observation files and repair them
+    (check only if the form sends dry_run=1).  GET: the last report as JSON.
+    """
+    if request.method == 'GET':
+        report = last_reconcile_report()
+        if report is None:
+            return jsonify({"error": "summaries have not been reconciled yet"}), 404
+        return jsonify(report)
+    dry_run = request.form.get('dry_run') == '1'
+    ok, msg, report = reconcile_summaries(repair=not dry_run)
+    if not ok:
+        return f"Reconciliation failed: {msg}", 500
+    drift = sum(s["missing"] + s["extra"] + s["changed"] for s in report["summaries"].values())
+    return redirect(f"/admin/?op={'checked' if dry_run else 'reconciled'}&count={drift}")
+
+
+@app.route('/admin/compact/', methods=['POST'])
+@requires_admin
+def admin_compact():
+    """Fold pending summary log segments into the summary CSV files."""
+    ok, msg, count = compact_summary_log()
+    if not ok:
+        return f"Compaction failed: {msg}", 500
+    return redirect(f"/admin/?op=compacted&count={count}")
+
+
 # ---------------------------------------------------------------------------
 # Help
 # ---------------------------------------------------------------------------
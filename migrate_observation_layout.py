@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+migrate_observation_layout.py - move observation files into the obs/YYYY/ layout
+
+Observation files used to be stored at the top of the bucket
+(G.05.2023-04-27.20-49-50.csv).  The app now saves them as
+obs/2023/G.05.2023-04-27.20-49-50.csv so one year can be listed by prefix, and
+reads both layouts in the meantime.  This script moves every flat file:
+
+- copy it to its obs/YYYY/ name, only if that name does not exist yet
+- delete the flat file, only if it has not changed since it was copied
+- carry its entry in the summary manifest over to the new name, so the next
+  incremental regeneration does not download it again
+
+It is safe to interrupt and run again, and to run while the app is serving.
+A file whose new name already holds different content is reported and left
+in place.  Summaries are not affected: their rows do not record file names.
+
+Example:
+    python migrate_observation_layout.py --dry-run
+    python migrate_observation_layout.py --workers 16
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Move COHA observation files into obs/YYYY/ prefixes")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="list the files that would be moved without changing anything")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="files moved in parallel (default: 8)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="move at most this many files")
+    return parser.parse_args()
+
+
+def move_file(coha, blob):
+    """Move one flat observation file.  Returns (status, new StoredObject or None)."""
+    storage = coha.get_storage()
+    new_name = coha.observation_blob_name(blob.name)
+    try:
+        data, source = storage.read(blob.name)
+    except coha.NotFound:
+        return "gone", None
+    try:
+        written = storage.write(new_name, data, if_generation_match=0)
+    except coha.PreconditionFailed:
+        # Copied by an earlier, interrupted run, or saved again since
+        existing, written = storage.read(new_name)
+        if existing != data:
+            return "conflict", None
+    try:
+        storage.delete(blob.name, if_generation_match=source.generation)
+    except coha.PreconditionFailed:
+        return "changed", None
+    except coha.NotFound:
+        pass
+    return "moved", written
+
+
+def main():
+    args = parse_args()
+
+    # Import after parsing so --help works without the app's dependencies
+    import main as coha
+
+    flat = list(coha.flat_observation_blobs())
+    if args.limit is not None:
+        flat = flat[:args.limit]
+    print(f"{len(flat)} observation file(s) in the flat layout")
+    if args.dry_run:
+        for blob in flat:
+            print(f"{blob.name} -> {coha.observation_blob_name(blob.name)}")
+        return
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda blob: move_file(coha, blob), flat))
+
+    counts = {}
+    manifest = coha.read_summary_manifest()
+    for blob, (status, written) in zip(flat, results):
+        counts[status] = counts.get(status, 0) + 1
+        if status in ("conflict", "changed"):
+            print(f"Left {blob.name} in place: {status} since it was read")
+        if status == "moved":
+            entry = manifest.pop(blob.name, None)
+            if entry is not None and entry.get("generation") == blob.generation:
+                manifest[written.name] = dict(entry, generation=written.generation)
+    if counts.get("moved"):
+        coha.write_summary_manifest(manifest)
+
+    print(", ".join(f"{n} {status}" for status, n in sorted(counts.items())) or "Nothing to move")
+
+
+if __name__ == "__main__":
+    main()
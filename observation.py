@@ -0,0 +1,120 @@
+"""
+observation.py - the observation record shared by the web app and scripts
+
+Each observation file holds one CSV row with the FILE_FIELD_NAMES columns, and
+the summary CSVs are those rows concatenated.  Observation is the in-memory
+form of one row.
+"""
+
+import csv
+import io
+import sys
+
+FORM_FIELD_NAMES = [
+    "quadrat", "station",
+    "cloud", "wind", "noise", "latitude", "longitude",
+    "detection", "direction", "distance", "detection_type", "age_class",
+    "observers", "notes"
+]
+FILE_FIELD_NAMES = FORM_FIELD_NAMES.copy()
+FILE_FIELD_NAMES.append("timestamp")
+
+
+def _parse_int(text):
+    """int for canonical integers, None for blanks, the text itself otherwise ("3->1")."""
+    if not text:
+        return None
+    if text.isdigit() and (text == "0" or text[0] != "0"):
+        return int(text)
+    return sys.intern(text)
+
+
+def _parse_float(text):
+    """float when the text round-trips through one exactly, None for blanks, else the text."""
+    if not text:
+        return None
+    try:
+        value = float(text)
+    except ValueError:
+        return text
+    return value if repr(value) == text else text
+
+
+def _field_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class Observation:
+    """
+    One survey observation, as stored in the observation files and summaries.
+
+    Rows are held as slotted objects with typed fields instead of dicts of
+    strings: latitude/longitude are floats; station, cloud, wind, noise,
+    direction and distance are ints; repeated text (quadrat, observers, ...)
+    is interned.  Blank fields are None.  Values that do not fit their type
+    exactly, as in manually imported data ("3->1", "49.2400"), are kept as the
+    original text so that to_csv_values() reproduces the CSV unchanged.
+    """
+
+    __slots__ = tuple(FILE_FIELD_NAMES)
+
+    _PARSERS = {
+        "station": _parse_int, "cloud": _parse_int, "wind": _parse_int,
+        "noise": _parse_int, "direction": _parse_int, "distance": _parse_int,
+        "latitude": _parse_float, "longitude": _parse_float,
+        "quadrat": sys.intern, "detection": sys.intern, "detection_type": sys.intern,
+        "age_class": sys.intern, "observers": sys.intern,
+    }
+
+    @classmethod
+    def parse_field(cls, name, text):
+        """The value from_csv_row() stores for one field's CSV text."""
+        parser = cls._PARSERS.get(name)
+        return parser(text) if parser is not None and text else (text or None)
+
+    @classmethod
+    def from_csv_row(cls, row):
+        """Build from a dict of CSV strings keyed by FILE_FIELD_NAMES; missing fields are blank."""
+        obs = cls.__new__(cls)
+        for name in FILE_FIELD_NAMES:
+            setattr(obs, name, cls.parse_field(name, row.get(name) or ""))
+        return obs
+
+    @classmethod
+    def from_values(cls, values):
+        """Build from values already parsed with parse_field(), in FILE_FIELD_NAMES order."""
+        obs = cls.__new__(cls)
+        for name, value in zip(FILE_FIELD_NAMES, values):
+            setattr(obs, name, value)
+        return obs
+
+    def to_csv_values(self):
+        """Field values as CSV strings, in FILE_FIELD_NAMES order."""
+        return [_field_text(getattr(self, name)) for name in FILE_FIELD_NAMES]
+
+    def to_csv_row(self):
+        """Dict of CSV strings keyed by FILE_FIELD_NAMES, as csv.DictReader would return."""
+        return dict(zip(FILE_FIELD_NAMES, self.to_csv_values()))
+
+    @property
+    def year(self):
+        return self.timestamp[:4]
+
+    def __eq__(self, other):
+        if not isinstance(other, Observation):
+            return NotImplemented
+        return self.to_csv_values() == other.to_csv_values()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Observation({self.quadrat}.{self.station}.{self.timestamp})"
+
+
+def observations_from_csv(text):
+    """Parse CSV text with a header row into Observations."""
+    return [Observation.from_csv_row(row) for row in csv.DictReader(io.StringIO(text))]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+reconcile_summaries.py - check the summary CSVs against the observation files
+
+Runs the same reconciliation as the Reconcile Summaries admin button, for use
+as a Cloud Run job or a cron entry.  Reads the bucket named by
+COHA_BUCKET_NAME (or a local directory with COHA_STORAGE_BACKEND=local).
+
+Exit status is 0 when the summaries match (or were repaired), 1 when a
+repair failed, and 2 when --dry-run found differences.
+
+Example:
+    python reconcile_summaries.py --dry-run
+"""
+
+import argparse
+import json
+import sys
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare COHA summaries with the observation files and repair them")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="report differences without changing any summary")
+    parser.add_argument("--json", action="store_true",
+                        help="print the full report as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # Import after parsing so --help works without the app's dependencies
+    import main as coha
+    ok, message, report = coha.reconcile_summaries(repair=not args.dry_run)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for summary_file, result in report["summaries"].items():
+            if result["missing"] or result["extra"] or result["changed"]:
+                print(f"{summary_file}: {result['missing']} missing, {result['extra']} extra, "
+                      f"{result['changed']} changed")
+        print(message)
+
+    if not ok:
+        return 1
+    if args.dry_run and any(r["missing"] or r["extra"] or r["changed"] for r in report["summaries"].values()):
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,19 @@
-let yearly_data = {};
+let yearly_data = {};  // year -> observations, fetched the first time the year is shown
 let map;
 let markers = [];
 
+// Fetch one year's observations, reusing them if that year was shown before
+async function load_year(year) {
+  if (!(year in yearly_data)) {
+    const response = await fetch('/map/data/' + encodeURIComponent(year));
+    if (!response.ok) {
+      throw new Error('HTTP ' + response.status + ' loading ' + year);
+    }
+    yearly_data[year] = await response.json();
+  }
+  return yearly_data[year];
+}
+
 // Define initMap as async
 async function initMap() {
   try {
@@ -20,24 +32,10 @@ async function initMap() {
       ...(mapId ? { mapId: mapId } : {})  // Add mapId only if it exists
     });
 
-    // Load the data after map initialization
-    fetch('/map/data')
-      .then(response => response.json())
-      .then(data => {
-        yearly_data = data;
-        // Set default year if available
-        const years = Object.keys(yearly_data);
-        if (years.length > 0) {
-          const selectElement = document.getElementById("select_year");
-          if (selectElement) {
-            selectElement.value = years[0];
-            show_year();
-          }
-        }
-      })
-      .catch(error => {
-        console.error('Error loading map data:', error);
-      });
+    // Load the year the page selected; other years are fetched when picked
+    if (document.getElementById("select_year")) {
+      show_year();
+    }
 
   } catch (error) {
     console.error("Error initializing map:", error);
@@ -51,13 +49,18 @@ async function show_year() {
     let i = 0;
     year = document.getElementById("select_year").value;
 
-    // Check if data exists for the selected year
-    if (!yearly_data || !yearly_data[year]) {
-      console.error('No data available for year:', year);
+    let data;
+    try {
+      data = await load_year(year);
+    } catch (error) {
+      console.error('No data available for year:', year, error);
       return;
     }
 
-    let data = yearly_data[year];
+    // Another year may have been picked while this one was loading
+    if (document.getElementById("select_year").value !== year) {
+      return;
+    }
     clear_markers();
 
     // Import the marker and infowindow libraries
@@ -16,15 +16,72 @@ var surveyBounds = {
     east: -122.937837
 };
 
+// Nominal station locations, fetched once from the versioned stationCoordinatesUrl
+// set by the page.  The browser caches that URL until the coordinates change.
+var stationCoordinates = null;
+var stationCoordinatesLoaded = null;
+
+function loadStationCoordinates() {
+    if (stationCoordinatesLoaded === null) {
+        stationCoordinatesLoaded = fetch(stationCoordinatesUrl)
+            .then((response) => {
+                if (!response.ok) {
+                    throw new Error("HTTP " + response.status);
+                }
+                return response.json();
+            })
+            .then((coords) => {
+                stationCoordinates = coords;
+                return coords;
+            })
+            .catch((error) => {
+                stationCoordinatesLoaded = null;  // allow a retry
+                throw error;
+            });
+    }
+    return stationCoordinatesLoaded;
+}
+
 // We need to keep a record of google maps markers so we can erase them
 var mapMarkers = [];
 var positionMarker = null;
 var positionCircle = null; // Track the user's position circle
 
+// The form page is cached and the same for everyone, so the observer name(s)
+// and quadrat remembered in cookies are filled in here rather than by the server
+function readCookie(name) {
+    for (const part of document.cookie.split(";")) {
+        const [key, ...value] = part.trim().split("=");
+        if (key === name) {
+            return value.join("=");
+        }
+    }
+    return "";
+}
+
+function restoreFromCookies() {
+    document.getElementById("observers").value = sanitizeObservers(readCookie("observers"));
+    const quadrat = readCookie("quadrat");
+    if (isValidQuadrat(quadrat)) {
+        document.getElementById("quadrat").value = quadrat;
+        document.getElementById("station").disabled = false;
+    }
+}
+
+document.addEventListener("DOMContentLoaded", restoreFromCookies);
+
 // initialize the quadrat boundaries if quadrat is set by cookie
 window.onload = () => {
     observersChanged();
     quadratChanged();
+    initOutbox();
+    if ("serviceWorker" in navigator) {
+        // Keeps the form, scripts, call audio and station coordinates on the
+        // device so the form opens at a station without reception
+        navigator.serviceWorker.register("/sw.js").catch((error) => {
+            console.log("Service worker not registered:", error);
+        });
+    }
 }
 
 const protocol_msg =
@@ -65,7 +122,8 @@ function deg2rad(deg) {
 function initAudio() {
     // load the audio into cohaBuffer
     let request = new XMLHttpRequest();
-    request.open('GET', "/COHA.modified.mp3", true);
+    // the player's src is the fingerprinted URL the service worker caches
+    request.open('GET', document.getElementById("player").getAttribute("src"), true);
     request.responseType = 'arraybuffer';
 
     // Decode asynchronously
@@ -219,8 +277,14 @@ function fallbackToStandardMarker(position, title, label) {
 }
 
 // mark all stations of a quadrat on the map
-function mapStations(quadrat) {
-    let coords = stationCoordinates[quadrat];
+async function mapStations(quadrat) {
+    let coords;
+    try {
+        coords = (await loadStationCoordinates())[quadrat];
+    } catch (error) {
+        console.error("Error loading station coordinates:", error);
+        return;
+    }
     let station=1;
     for(; station < 17; ++station) {
         stationMarker(coords[station], station, quadrat);
@@ -378,7 +442,7 @@ function geolocationError(error) {
 }
 
 function updateLocation() {
-    navigator.geolocation.getCurrentPosition(function (position) {
+    navigator.geolocation.getCurrentPosition(async function (position) {
         console.log("Latitude is :", position.coords.latitude);
         console.log("Longitude is :", position.coords.longitude);
         console.log("accuracy is :", position.coords.accuracy);
@@ -397,7 +461,13 @@ function updateLocation() {
             let quadrat = document.getElementById("quadrat").value;
             let latField = document.getElementById("latitude");
             let longField = document.getElementById("longitude");
-            let nominalLocation = stationCoordinates[quadrat][station];
+            let nominalLocation;
+            try {
+                nominalLocation = (await loadStationCoordinates())[quadrat][station];
+            } catch (error) {
+                alert("Could not load the station locations.  Please check the latitude and longitude values");
+                return;
+            }
 
             if (position.coords.accuracy > 50) {
                 // warn user if position accuracy is worse than 50 metres
@@ -705,6 +775,248 @@ function startSurvey() {
 }
 
 
+///////////
+// Offline outbox
+///////////
+// Observations are stored in IndexedDB before they are sent, so a save made
+// with poor reception stays on the device.  Queued observations are uploaded
+// together through /save/batch when the connection comes back.  Ones the
+// server rejects stay on the device, marked rejected, and are not resent.
+const OUTBOX_DB = "coha-outbox";
+const OUTBOX_STORE = "observations";
+const OUTBOX_BATCH_SIZE = 50;   // the server accepts up to 100 per request
+var outboxFlush = null;         // the upload in progress
+var outboxNextFlush = null;     // one more upload, started when that one ends
+
+function outboxRequest(mode, makeRequest) {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(OUTBOX_DB, 1);
+        open.onupgradeneeded = () => {
+            open.result.createObjectStore(OUTBOX_STORE, {keyPath: "id"});
+        };
+        open.onerror = () => reject(open.error);
+        open.onsuccess = () => {
+            const db = open.result;
+            const tx = db.transaction(OUTBOX_STORE, mode);
+            const request = makeRequest(tx.objectStore(OUTBOX_STORE));
+            tx.oncomplete = () => {
+                db.close();
+                resolve(request.result);
+            };
+            tx.onerror = () => {
+                db.close();
+                reject(tx.error);
+            };
+        };
+    });
+}
+
+function outboxAll() {
+    return outboxRequest("readonly", (store) => store.getAll());
+}
+
+function outboxPut(observation) {
+    return outboxRequest("readwrite", (store) => store.put(observation));
+}
+
+function outboxDelete(id) {
+    return outboxRequest("readwrite", (store) => store.delete(id));
+}
+
+// Survey time as the server writes it: Canada/Pacific, YYYY-MM-DD.HH-MM-SS
+function surveyTimestamp(date) {
+    const parts = {};
+    new Intl.DateTimeFormat("en-CA", {
+        timeZone: "America/Vancouver", hourCycle: "h23",
+        year: "numeric", month: "2-digit", day: "2-digit",
+        hour: "2-digit", minute: "2-digit", second: "2-digit"
+    }).formatToParts(date).forEach((p) => { parts[p.type] = p.value; });
+    return parts.year + "-" + parts.month + "-" + parts.day + "." +
+           parts.hour + "-" + parts.minute + "-" + parts.second;
+}
+
+function observationFromForm(form) {
+    // FormData skips disabled fields, exactly like a normal form submission
+    const observation = Object.fromEntries(new FormData(form).entries());
+    observation.id = (window.crypto && crypto.randomUUID) ? crypto.randomUUID()
+                                                         : Date.now() + "-" + Math.random();
+    observation.timestamp = surveyTimestamp(new Date());
+    return observation;
+}
+
+async function uploadOutbox() {
+    const answered = {};
+    let queued = (await outboxAll()).filter((o) => !o.rejected);
+    while (queued.length > 0) {
+        const batch = queued.slice(0, OUTBOX_BATCH_SIZE);
+        const response = await fetch("/save/batch", {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify({observations: batch})
+        });
+        if (!response.ok) {
+            throw new Error("HTTP " + response.status);
+        }
+        const results = (await response.json()).results;
+        let retry = false;
+        for (const result of results) {
+            answered[result.id] = result;
+            const observation = batch.find((o) => o.id === result.id);
+            if (result.status === "error" || observation === undefined) {
+                retry = true;   // keep it queued for the next attempt
+            } else if (result.status === "invalid") {
+                // Keep what the observer entered; it is not sent again
+                observation.rejected = true;
+                observation.message = result.message;
+                await outboxPut(observation);
+            } else {
+                await outboxDelete(result.id);
+            }
+        }
+        if (retry) {
+            break;
+        }
+        queued = queued.slice(OUTBOX_BATCH_SIZE);
+    }
+    return answered;
+}
+
+// Send everything in the outbox.  Resolves to {id: result} for every observation
+// the server answered; rejects if the server could not be reached.  Uploads
+// never overlap: a call made during one waits for it and then starts another,
+// since the running upload may have read the outbox before the caller stored
+// its observation.
+function flushOutbox() {
+    if (outboxFlush === null) {
+        outboxFlush = uploadOutbox().finally(() => { outboxFlush = null; });
+        return outboxFlush;
+    }
+    if (outboxNextFlush === null) {
+        outboxNextFlush = outboxFlush.catch(() => {}).then(() => {
+            outboxNextFlush = null;
+            return flushOutbox();
+        });
+    }
+    return outboxNextFlush;
+}
+
+// Observations waiting to be uploaded, and ones the server rejected
+async function outboxCounts() {
+    try {
+        const all = await outboxAll();
+        const rejected = all.filter((o) => o.rejected).length;
+        return {waiting: all.length - rejected, rejected: rejected};
+    } catch (error) {
+        return {waiting: 0, rejected: 0};
+    }
+}
+
+function resetObservationFields() {
+    document.getElementById("cohaForm").reset();
+    stationSet = cloudSet = windSet = noiseSet = cohaDetected = false;
+    detectionChanged();
+    document.getElementById("submit").disabled = true;
+}
+
+async function submitObservation(event) {
+    event.preventDefault();
+    const form = event.target;
+    const messageField = document.getElementById("message");
+    const observation = observationFromForm(form);
+    try {
+        await outboxPut(observation);
+    } catch (error) {
+        console.error("Outbox unavailable, saving directly:", error);
+        await submitDirectly(form);
+        return;
+    }
+    document.getElementById("submit").disabled = true;
+
+    let result;
+    try {
+        result = (await flushOutbox())[observation.id];
+    } catch (error) {
+        console.log("Save deferred:", error);
+    }
+
+    if (result && (result.status === "saved" || result.status === "duplicate")) {
+        // Reload the form for the next station, as after a normal save
+        sessionStorage.setItem("cohaMessage", result.message);
+        window.location.assign("/");
+    } else if (result && result.status === "invalid") {
+        // The server rejected it.  The form still holds the values, so drop the
+        // stored copy and let the observer correct the form and try again.
+        await outboxDelete(observation.id).catch(() => {});
+        document.getElementById("submit").disabled = false;
+        messageField.textContent = result.message;
+    } else {
+        resetObservationFields();
+        messageField.textContent = "No connection: the observation is stored on this device and will be " +
+            "uploaded automatically (" + (await outboxCounts()).waiting + " waiting).";
+    }
+}
+
+// Without IndexedDB an observation can only be sent straight to /save/
+async function submitDirectly(form) {
+    const submitButton = document.getElementById("submit");
+    submitButton.disabled = true;
+    let result;
+    try {
+        const response = await fetch("/save/", {
+            method: "POST",
+            headers: {"Accept": "application/json"},
+            body: new URLSearchParams(new FormData(form))
+        });
+        result = await response.json();
+    } catch (error) {
+        result = {status: "error",
+                  message: "No connection: the observation was not saved.  Try again when you have reception."};
+    }
+    if (result.status === "saved") {
+        sessionStorage.setItem("cohaMessage", result.message);
+        window.location.assign("/");
+    } else {
+        submitButton.disabled = false;
+        document.getElementById("message").textContent = result.message;
+    }
+}
+
+async function flushOutboxQuietly() {
+    if ((await outboxCounts()).waiting === 0) {
+        return;
+    }
+    try {
+        const results = Object.values(await flushOutbox());
+        const saved = results.filter((r) => r.status === "saved").length;
+        const counts = await outboxCounts();
+        let message = "Uploaded " + saved + " stored observation(s).";
+        if (counts.waiting > 0) {
+            message += "  " + counts.waiting + " still waiting.";
+        }
+        if (counts.rejected > 0) {
+            message += "  " + counts.rejected + " rejected by the server are kept on this device.";
+        }
+        document.getElementById("message").textContent = message;
+    } catch (error) {
+        console.log("Outbox still offline:", error);
+    }
+}
+
+function initOutbox() {
+    const message = sessionStorage.getItem("cohaMessage");
+    if (message !== null) {
+        sessionStorage.removeItem("cohaMessage");
+        document.getElementById("message").textContent = message;
+    }
+    document.getElementById("cohaForm").addEventListener("submit", submitObservation);
+    if (!window.indexedDB) {
+        return;     // submitObservation saves straight to /save/
+    }
+    window.addEventListener("online", flushOutboxQuietly);
+    flushOutboxQuietly();
+}
+
+
 ///////////
 // Map
 ///////////
@@ -0,0 +1,290 @@
+"""
+storage_backend.py - object storage used by the COHA web app and scripts
+
+The app only needs a handful of operations on its bucket: list objects by
+prefix (optionally one "directory" level only, or just the sub-prefixes
+below a prefix), read an object (whole, or streamed through a file object), write an
+object (optionally only if its generation still matches), and delete an
+object.  This module provides them for two
+backends:
+
+- GcsStorage talks to a Google Cloud Storage bucket (production).
+- LocalStorage keeps objects as files under a local directory.  It emulates
+  GCS generation numbers and raises the same NotFound / PreconditionFailed
+  exceptions, so the summary update logic behaves as it does against GCS.
+  Use it to run the app, the scripts and load tests without a live bucket.
+
+get_storage() chooses the backend from the environment:
+
+    COHA_STORAGE_BACKEND   "gcs" (default) or "local"
+    COHA_BUCKET_NAME       GCS bucket name (default: coha-data)
+    COHA_GCP_PROJECT_ID    GCP project for the GCS client
+    COHA_LOCAL_STORAGE_DIR directory used by the local backend (default: ./local-bucket)
+
+LocalStorage serialises operations with a lock inside one process, which
+matches the Cloud Run deployment (one gunicorn worker, several threads).  Do
+not point several processes at the same directory.
+"""
+
+import base64
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+__all__ = [
+    "GcsStorage", "LocalStorage", "StoredObject", "get_storage",
+    "NotFound", "PreconditionFailed",
+]
+
+
+class StoredObject:
+    """Metadata for one stored object, as returned by list/stat/read/write."""
+
+    __slots__ = ("name", "generation", "md5_hash", "size", "updated", "metadata")
+
+    def __init__(self, name, generation, md5_hash=None, size=None, updated=None, metadata=None):
+        self.name = name
+        self.generation = generation
+        self.md5_hash = md5_hash
+        self.size = size
+        self.updated = updated
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"StoredObject({self.name!r}, generation={self.generation})"
+
+
+# ---------------------------------------------------------------------------
+# Google Cloud Storage
+# ---------------------------------------------------------------------------
+
+class GcsStorage:
+    """Objects in a Google Cloud Storage bucket."""
+
+    def __init__(self, bucket_name, project=None):
+        # Imported here so LocalStorage users don't need GCS credentials
+        from google.cloud import storage
+
+        self.bucket_name = bucket_name
+        try:
+            self.client = storage.Client(project=project) if project else storage.Client()
+        except Exception as e:
+            print(f"Error creating storage client: {e}")
+            self.client = storage.Client.create_anonymous_client()
+        self.bucket = self.client.bucket(bucket_name)
+
+    @staticmethod
+    def _object(blob):
+        return StoredObject(blob.name, blob.generation, blob.md5_hash, blob.size,
+                            blob.updated, blob.metadata)
+
+    def list(self, prefix=None, delimiter=None):
+        """
+        Yield StoredObjects whose names start with prefix, in name order.  With
+        a delimiter, names containing it after the prefix are left out.
+        """
+        for blob in self.client.list_blobs(self.bucket_name, prefix=prefix, delimiter=delimiter):
+            yield self._object(blob)
+
+    def list_prefixes(self, prefix=None, delimiter="/"):
+        """Sorted distinct prefixes one level below prefix, e.g. "obs/2025/" under "obs/"."""
+        blobs = self.client.list_blobs(self.bucket_name, prefix=prefix, delimiter=delimiter)
+        for _ in blobs:
+            pass    # prefixes are collected as the pages are fetched
+        return sorted(blobs.prefixes)
+
+    def stat(self, name):
+        """Return the StoredObject for name without downloading it."""
+        blob = self.bucket.blob(name)
+        blob.reload()
+        return self._object(blob)
+
+    def read(self, name):
+        """Return (bytes, StoredObject) for the generation that was read."""
+        blob = self.bucket.blob(name)
+        data = blob.download_as_bytes()
+        return data, self._object(blob)
+
+    def open(self, name):
+        """
+        Return a binary file object that streams name in chunks, pinned to the
+        generation current when it was opened.  Raises NotFound if absent.
+        """
+        blob = self.bucket.get_blob(name)
+        if blob is None:
+            raise NotFound(f"No such object: {self.bucket_name}/{name}")
+        return self.bucket.blob(name, generation=blob.generation).open("rb")
+
+    def write(self, name, data, content_type="text/csv", if_generation_match=None,
+              cache_control="max-age=0,no-store"):
+        """
+        Write name.  With if_generation_match the write only succeeds if the
+        object is still at that generation (0: only if it does not exist);
+        otherwise PreconditionFailed is raised.
+        """
+        blob = self.bucket.blob(name)
+        blob.cache_control = cache_control
+        blob.upload_from_string(data, content_type=content_type,
+                                if_generation_match=if_generation_match)
+        return self._object(blob)
+
+    def delete(self, name, if_generation_match=None):
+        self.bucket.blob(name).delete(if_generation_match=if_generation_match)
+
+
+# ---------------------------------------------------------------------------
+# Local directory
+# ---------------------------------------------------------------------------
+
+class LocalStorage:
+    """
+    Objects stored as files under root, with GCS-style generations.
+
+    Object data lives at root/<name>; a sidecar at root/.coha-meta/<name>.json
+    holds its generation and content type.  Generations increase strictly
+    across the whole store, as they do in GCS.
+    """
+
+    META_DIR = ".coha-meta"
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.bucket_name = os.path.basename(self.root)
+        self._lock = threading.Lock()
+        self._last_generation = 0
+        os.makedirs(os.path.join(self.root, self.META_DIR), exist_ok=True)
+
+    def _data_path(self, name):
+        return os.path.join(self.root, *name.split("/"))
+
+    def _meta_path(self, name):
+        return os.path.join(self.root, self.META_DIR, *name.split("/")) + ".json"
+
+    def _next_generation(self):
+        self._last_generation = max(time.time_ns() // 1000, self._last_generation + 1)
+        return self._last_generation
+
+    def _load(self, name):
+        """Return (StoredObject, data path) or raise NotFound.  Caller holds the lock."""
+        path = self._data_path(name)
+        try:
+            with open(self._meta_path(name), "r") as f:
+                meta = json.load(f)
+            st = os.stat(path)
+        except FileNotFoundError:
+            raise NotFound(f"No such object: {self.bucket_name}/{name}")
+        updated = datetime.datetime.fromtimestamp(st.st_mtime, tz=datetime.timezone.utc)
+        obj = StoredObject(name, meta["generation"], meta.get("md5_hash"), st.st_size,
+                           updated, meta.get("metadata"))
+        return obj, path
+
+    @staticmethod
+    def _replace(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def list(self, prefix=None, delimiter=None):
+        prefix = prefix or ""
+        with self._lock:
+            names = []
+            meta_root = os.path.join(self.root, self.META_DIR)
+            for dirpath, dirnames, filenames in os.walk(meta_root):
+                rel = os.path.relpath(dirpath, meta_root)
+                for filename in filenames:
+                    if not filename.endswith(".json"):
+                        continue
+                    name = filename[:-len(".json")]
+                    if rel != ".":
+                        name = "/".join(rel.split(os.sep) + [name])
+                    if name.startswith(prefix) and not (delimiter and delimiter in name[len(prefix):]):
+                        names.append(name)
+            objects = []
+            for name in sorted(names):
+                try:
+                    objects.append(self._load(name)[0])
+                except NotFound:
+                    pass
+        yield from objects
+
+    def list_prefixes(self, prefix=None, delimiter="/"):
+        prefix = prefix or ""
+        meta_root = os.path.join(self.root, self.META_DIR)
+        prefixes = set()
+        with self._lock:
+            for dirpath, dirnames, filenames in os.walk(meta_root):
+                rel = os.path.relpath(dirpath, meta_root)
+                for filename in filenames:
+                    if not filename.endswith(".json"):
+                        continue
+                    name = "/".join(([] if rel == "." else rel.split(os.sep)) + [filename[:-len(".json")]])
+                    rest = name[len(prefix):]
+                    if name.startswith(prefix) and delimiter in rest:
+                        prefixes.add(prefix + rest.split(delimiter, 1)[0] + delimiter)
+        return sorted(prefixes)
+
+    def stat(self, name):
+        with self._lock:
+            return self._load(name)[0]
+
+    def read(self, name):
+        with self._lock:
+            obj, path = self._load(name)
+            with open(path, "rb") as f:
+                return f.read(), obj
+
+    def open(self, name):
+        with self._lock:
+            # Writes replace the data file atomically, so an open handle keeps
+            # reading the generation it was opened at
+            return open(self._load(name)[1], "rb")
+
+    def write(self, name, data, content_type="text/csv", if_generation_match=None,
+              cache_control="max-age=0,no-store"):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._lock:
+            if if_generation_match is not None:
+                try:
+                    current = self._load(name)[0].generation
+                except NotFound:
+                    current = 0
+                if current != if_generation_match:
+                    raise PreconditionFailed(
+                        f"{self.bucket_name}/{name}: generation {current} != {if_generation_match}")
+            meta = {
+                "generation": self._next_generation(),
+                "md5_hash": base64.b64encode(hashlib.md5(data).digest()).decode("ascii"),
+                "content_type": content_type,
+                "cache_control": cache_control,
+            }
+            self._replace(self._data_path(name), data)
+            self._replace(self._meta_path(name), json.dumps(meta).encode("utf-8"))
+            return self._load(name)[0]
+
+    def delete(self, name, if_generation_match=None):
+        with self._lock:
+            obj, path = self._load(name)
+            if if_generation_match is not None and obj.generation != if_generation_match:
+                raise PreconditionFailed(
+                    f"{self.bucket_name}/{name}: generation {obj.generation} != {if_generation_match}")
+            os.remove(self._meta_path(name))
+            os.remove(path)
+
+
+def get_storage():
+    """Create the storage backend selected by COHA_STORAGE_BACKEND."""
+    backend = os.environ.get("COHA_STORAGE_BACKEND", "gcs").lower()
+    if backend == "local":
+        return LocalStorage(os.environ.get("COHA_LOCAL_STORAGE_DIR", "local-bucket"))
+    if backend == "gcs":
+        return GcsStorage(os.environ.get("COHA_BUCKET_NAME", "coha-data"),
+                          project=os.environ.get("COHA_GCP_PROJECT_ID"))
+    raise ValueError(f"Unknown COHA_STORAGE_BACKEND {backend!r}; expected 'gcs' or 'local'")
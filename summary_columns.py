@@ -0,0 +1,227 @@
+"""
+summary_columns.py - compact columnar companion for the summary CSVs
+
+The public summary CSVs stay the format researchers download.  Next to each
+one the app keeps a binary companion (COHA-data-YYYY.columns beside
+COHA-data-YYYY.csv) that server-side readers can load without running every
+row through csv.DictReader:
+
+- low-cardinality text fields (quadrat, station, cloud, wind, noise, detection,
+  direction, distance, detection_type, age_class, observers) are dictionary
+  encoded as uint8/uint16/uint32 codes plus a list of distinct values
+- latitude and longitude are float64; values whose text would not survive a
+  float round trip (blank, "49.2400", "bad value") are kept verbatim
+- free text (notes, timestamp) is one UTF-8 blob plus uint32 offsets, counted
+  in characters of the decoded text
+
+Layout (all numbers little-endian, every block 8-byte aligned):
+
+    b"COHACOL1" | uint32 header length | header JSON | padding | column blocks
+
+The header records the row count, the generation of the CSV the companion was
+built from, and for each column its kind and the offset/length of its blocks
+relative to the start of the block area.  Columns are read through
+memoryview.cast, so a buffer downloaded from GCS or a file opened with
+ColumnTable.open() (mmap) is used in place without copying.
+
+A companion is only current while source_generation equals the generation of
+its CSV; readers that find it stale (or missing) read the CSV instead.
+
+Example, for an analysis script:
+
+    from summary_columns import ColumnTable
+    table = ColumnTable.open("COHA-data-2025.columns")
+    latitudes = table.floats("latitude")           # memoryview of float64
+    detections = table.column("detection")         # list of str
+    quadrats = table.categories("quadrat")         # distinct values ...
+    codes = table.codes("quadrat")                 # ... and an index into them per row
+"""
+
+import array
+import json
+import math
+import mmap
+import struct
+import sys
+
+MAGIC = b"COHACOL1"
+FORMAT_VERSION = 1
+SUFFIX = ".columns"
+
+FLOAT_COLUMNS = ("latitude", "longitude")
+STRING_COLUMNS = ("notes", "timestamp")
+# Every other column is dictionary encoded
+
+
+def companion_name(summary_file):
+    """COHA-data-2025.csv -> COHA-data-2025.columns"""
+    return summary_file[:-len(".csv")] + SUFFIX
+
+
+def _pad(n):
+    return (8 - n % 8) % 8
+
+
+def _typecode_for(count):
+    """Smallest unsigned array typecode that can index count distinct values."""
+    if count <= 0xFF:
+        return "B"
+    if count <= 0xFFFF:
+        return "H"
+    return "I"
+
+
+def _to_little_endian(arr):
+    if sys.byteorder != "little":
+        arr = array.array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def encode(rows, columns, source_generation=None):
+    """
+    Encode rows (sequences of strings in the order of columns) and return the
+    companion file as bytes.  source_generation is the generation of the CSV the rows
+    were read from or written to, so readers can tell a stale companion.
+    """
+    blocks = []
+    offset = 0
+
+    def add_block(data):
+        nonlocal offset
+        start = offset
+        blocks.append(data)
+        blocks.append(b"\0" * _pad(len(data)))
+        offset += len(data) + _pad(len(data))
+        return start, len(data)
+
+    specs = []
+    for i, name in enumerate(columns):
+        values = [row[i] or "" for row in rows]
+        if name in FLOAT_COLUMNS:
+            floats = array.array("d")
+            exact = {}
+            for n, text in enumerate(values):
+                try:
+                    value = float(text)
+                except ValueError:
+                    value = math.nan
+                floats.append(value)
+                if repr(value) != text:
+                    exact[str(n)] = text
+            start, nbytes = add_block(_to_little_endian(floats))
+            specs.append({"name": name, "kind": "float64", "offset": start, "nbytes": nbytes,
+                          "exact": exact})
+        elif name in STRING_COLUMNS:
+            offsets = array.array("I", [0])
+            for v in values:
+                offsets.append(offsets[-1] + len(v))
+            off_start, off_nbytes = add_block(_to_little_endian(offsets))
+            data_start, data_nbytes = add_block("".join(values).encode("utf-8"))
+            specs.append({"name": name, "kind": "string",
+                          "offset": off_start, "nbytes": off_nbytes,
+                          "data_offset": data_start, "data_nbytes": data_nbytes})
+        else:
+            categories = {}
+            for v in values:
+                categories.setdefault(v, len(categories))
+            typecode = _typecode_for(len(categories))
+            codes = array.array(typecode, (categories[v] for v in values))
+            start, nbytes = add_block(_to_little_endian(codes))
+            specs.append({"name": name, "kind": "category", "typecode": typecode,
+                          "offset": start, "nbytes": nbytes, "values": list(categories)})
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "rows": len(rows),
+        "source_generation": source_generation,
+        "columns": specs,
+    }, separators=(",", ":")).encode("utf-8")
+    prefix = MAGIC + struct.pack("<I", len(header)) + header
+    return prefix + b"\0" * _pad(len(prefix)) + b"".join(blocks)
+
+
+class ColumnTable:
+    """Read-only view of an encoded companion file held in a bytes-like buffer."""
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a COHA columnar summary")
+        (header_len,) = struct.unpack_from("<I", view, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(view[start:start + header_len]))
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"unsupported columnar summary version {self.header.get('version')}")
+        body = start + header_len
+        self._blocks = view[body + _pad(body):]
+        self._specs = {spec["name"]: spec for spec in self.header["columns"]}
+        self.names = [spec["name"] for spec in self.header["columns"]]
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a companion file from disk."""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return self.header["rows"]
+
+    @property
+    def source_generation(self):
+        return self.header.get("source_generation")
+
+    def kind(self, name):
+        """"category", "float64" or "string"."""
+        return self._specs[name]["kind"]
+
+    def _block(self, offset, nbytes, typecode):
+        view = self._blocks[offset:offset + nbytes]
+        if sys.byteorder == "little":
+            return view.cast(typecode)
+        arr = array.array(typecode, view.tobytes())
+        arr.byteswap()
+        return memoryview(arr)
+
+    def _spec(self, name, kind):
+        spec = self._specs[name]
+        if spec["kind"] != kind:
+            raise TypeError(f"column {name} is {spec['kind']}, not {kind}")
+        return spec
+
+    def codes(self, name):
+        """Integer codes of a dictionary-encoded column (index into categories(name))."""
+        spec = self._spec(name, "category")
+        return self._block(spec["offset"], spec["nbytes"], spec["typecode"])
+
+    def categories(self, name):
+        return self._spec(name, "category")["values"]
+
+    def floats(self, name):
+        """float64 values of latitude/longitude; NaN where the text was not a number."""
+        spec = self._spec(name, "float64")
+        return self._block(spec["offset"], spec["nbytes"], "d")
+
+    def strings(self, name):
+        spec = self._spec(name, "string")
+        offsets = self._block(spec["offset"], spec["nbytes"], "I").tolist()
+        data = self._blocks[spec["data_offset"]:spec["data_offset"] + spec["data_nbytes"]]
+        text = str(data, "utf-8")
+        return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    def column(self, name):
+        """Decode one column back to the strings that were in the CSV."""
+        kind = self._specs[name]["kind"]
+        if kind == "category":
+            return list(map(self.categories(name).__getitem__, self.codes(name).tolist()))
+        if kind == "float64":
+            texts = list(map(repr, self.floats(name).tolist()))
+            for i, text in self._specs[name]["exact"].items():
+                texts[int(i)] = text
+            return texts
+        return self.strings(name)
+
+    def rows(self):
+        """Decode every row to a dict keyed by column name, in the encoded column order."""
+        columns = [self.column(name) for name in self.names]
+        return [dict(zip(self.names, values)) for values in zip(*columns)]
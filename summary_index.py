@@ -0,0 +1,131 @@
+"""
+summary_index.py - lookups over the survey summary by station and date
+
+SummaryIndex is built once over a list of Observations (e.g. the all-years
+summary) and answers the questions the app and the scripts keep asking
+without scanning every row:
+
+    index = SummaryIndex(observations)
+    index.visits("G", 5)                                 # every visit to G/5
+    index.visits("G", 5, year="2025")                    # ... in 2025
+    index.query(start="2025-04-01", end="2025-04-30", detected=True)
+    index.latest_visit("G", 5, year="2024")
+    index.years(), index.counts_by_year()
+
+Results are lists of the indexed Observations in timestamp order.  An index
+never changes after it is built; build a new one when the summary changes
+(main.py keeps one per cached summary generation).
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+def station_key(station):
+    """Normalise a station to an int where possible, so "05", "5" and 5 match."""
+    if isinstance(station, str) and station.isdigit():
+        return int(station)
+    return station
+
+
+def _station_order(pair):
+    """Sort (quadrat, station) pairs with numeric stations in numeric order."""
+    quadrat, station = pair
+    return str(quadrat), (0, station, "") if isinstance(station, int) else (1, 0, str(station))
+
+
+def is_detection(obs):
+    """True for "yes", and for the Y/y recorded by legacy imports."""
+    return str(obs.detection or "").lower() in ("yes", "y")
+
+
+class SummaryIndex:
+    """Read-only secondary indexes over a list of Observations."""
+
+    def __init__(self, observations):
+        # Everything below holds offsets into self.rows, sorted by timestamp
+        order = sorted(range(len(observations)), key=lambda i: observations[i].timestamp or "")
+        self.rows = [observations[i] for i in order]
+        self._timestamps = [obs.timestamp or "" for obs in self.rows]
+        self._by_station = {}       # (quadrat, station) -> offsets
+        self._by_year = {}          # year -> (first offset, end offset)
+        self._detections = []       # offsets of rows with a detection
+        for offset, obs in enumerate(self.rows):
+            self._by_station.setdefault((obs.quadrat, station_key(obs.station)), []).append(offset)
+            year = self._timestamps[offset][:4]
+            first, _ = self._by_year.get(year, (offset, offset))
+            self._by_year[year] = (first, offset + 1)
+            if is_detection(obs):
+                self._detections.append(offset)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def years(self):
+        return sorted(self._by_year)
+
+    def counts_by_year(self):
+        return {year: end - first for year, (first, end) in sorted(self._by_year.items())}
+
+    def stations(self, year=None):
+        """Sorted (quadrat, station) pairs with at least one visit (in year, if given)."""
+        if year is None:
+            return sorted(self._by_station, key=_station_order)
+        lo, hi = self._range(year, year)
+        return sorted({(self.rows[i].quadrat, station_key(self.rows[i].station)) for i in range(lo, hi)},
+                      key=_station_order)
+
+    def _range(self, start=None, end=None):
+        """
+        Offsets [lo, hi) whose timestamps fall between start and end inclusive.
+        Bounds are timestamp prefixes: "2025", "2025-04" or "2025-04-30".
+        """
+        lo = bisect_left(self._timestamps, start) if start else 0
+        # "\x7f" sorts after every character used in timestamps, so an end of
+        # "2025-04-30" includes every time on that day
+        hi = bisect_right(self._timestamps, end + "\x7f") if end else len(self.rows)
+        return lo, max(lo, hi)
+
+    def query(self, year=None, quadrat=None, station=None, start=None, end=None, detected=None):
+        """
+        Observations matching every given criterion, in timestamp order.
+        start/end are inclusive timestamp prefixes; detected=True/False filters
+        on detections.  The narrowest index available drives the lookup.
+        """
+        lo, hi = self._range(start, end)
+        if year is not None:
+            ylo, yhi = self._range(str(year), str(year))
+            lo, hi = max(lo, ylo), min(hi, yhi)
+        if hi <= lo:
+            return []
+
+        if quadrat is not None and station is not None:
+            offsets = self._by_station.get((quadrat, station_key(station)), [])
+            candidates = offsets[bisect_left(offsets, lo):bisect_left(offsets, hi)]
+        elif detected:
+            candidates = self._detections[bisect_left(self._detections, lo):bisect_left(self._detections, hi)]
+        else:
+            candidates = range(lo, hi)
+
+        result = []
+        for offset in candidates:
+            obs = self.rows[offset]
+            if quadrat is not None and obs.quadrat != quadrat:
+                continue
+            if station is not None and station_key(obs.station) != station_key(station):
+                continue
+            if detected is not None and is_detection(obs) != detected:
+                continue
+            result.append(obs)
+        return result
+
+    def visits(self, quadrat, station, year=None):
+        """Every observation at one station, oldest first."""
+        return self.query(year=year, quadrat=quadrat, station=station)
+
+    def latest_visit(self, quadrat, station, year=None):
+        """The most recent observation at one station, or None."""
+        visits = self.visits(quadrat, station, year)
+        return visits[-1] if visits else None
+
+    def detections(self, start=None, end=None):
+        return self.query(start=start, end=end, detected=True)
@@ -0,0 +1,77 @@
+// sw.js - keep the survey form working with poor or no reception
+//
+// Rendered by main.py.  VERSION changes whenever the form page or any file in
+// PRECACHE does, which makes the browser install this worker again and fetch
+// a fresh copy of everything.
+
+const VERSION = {{ version|tojson }};
+const CACHE = "coha-form-" + VERSION;
+const PRECACHE = {{ urls|tojson }};
+
+self.addEventListener("install", (event) => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(CACHE);
+        // "reload" skips the HTTP cache, so an old copy is never precached
+        await cache.addAll(PRECACHE.map((url) => new Request(url, {cache: "reload"})));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener("activate", (event) => {
+    event.waitUntil((async () => {
+        for (const name of await caches.keys()) {
+            if (name.startsWith("coha-form-") && name !== CACHE) {
+                await caches.delete(name);
+            }
+        }
+        await self.clients.claim();
+    })());
+});
+
+// <audio> asks for byte ranges; answer them from the cached file
+async function rangeResponse(range, response) {
+    const match = /^bytes=(\d*)-(\d*)$/.exec(range);
+    if (match === null || (match[1] === "" && match[2] === "")) {
+        return response;
+    }
+    const body = await response.arrayBuffer();
+    const size = body.byteLength;
+    let start, end;
+    if (match[1] === "") {
+        start = Math.max(0, size - Number(match[2]));
+        end = size - 1;
+    } else {
+        start = Number(match[1]);
+        end = match[2] === "" ? size - 1 : Math.min(Number(match[2]), size - 1);
+    }
+    if (start >= size || start > end) {
+        return new Response(null, {status: 416, headers: {"Content-Range": "bytes */" + size}});
+    }
+    return new Response(body.slice(start, end + 1), {
+        status: 206,
+        headers: {
+            "Content-Type": response.headers.get("Content-Type") || "application/octet-stream",
+            "Content-Range": "bytes " + start + "-" + end + "/" + size,
+            "Content-Length": String(end - start + 1)
+        }
+    });
+}
+
+async function fromCache(request) {
+    const cached = await caches.match(request, {cacheName: CACHE});
+    if (cached === undefined) {
+        return fetch(request);
+    }
+    const range = request.headers.get("Range");
+    return range ? rangeResponse(range, cached) : cached;
+}
+
+// Cache first for the precached files; everything else (saves, the map and
+// data pages, Google Maps) goes to the network as usual
+self.addEventListener("fetch", (event) => {
+    const url = new URL(event.request.url);
+    if (event.request.method === "GET" && url.origin === self.location.origin &&
+            PRECACHE.includes(url.pathname + url.search)) {
+        event.respondWith(fromCache(event.request));
+    }
+});
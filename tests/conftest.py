@@ -0,0 +1,65 @@
+"""
+Shared fixtures.  Every test runs the app against its own empty local bucket
+(storage_backend.LocalStorage), with a fresh summary queue and caches.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("COHA_STORAGE_BACKEND", "local")
+os.environ.setdefault("COHA_LOCAL_STORAGE_DIR", tempfile.mkdtemp(prefix="coha-test-"))
+os.environ.setdefault("COHA_ADMIN_PASSWORD", "test")
+os.environ.setdefault("COHA_TIMING_LOG", "0")
+
+import pytest
+
+import main
+import storage_backend
+from observation import Observation
+
+ADMIN_AUTH = {"Authorization": "Basic eDp0ZXN0"}     # any user, password "test"
+
+
+@pytest.fixture
+def coha(tmp_path, monkeypatch):
+    """The main module, pointed at an empty bucket under tmp_path."""
+    storage = main._TimedStorage(storage_backend.LocalStorage(str(tmp_path / "bucket")))
+    monkeypatch.setattr(main, "_storage", storage)
+    monkeypatch.setattr(main, "_summary_queue", main._SummaryQueue(main.SUMMARY_QUEUE_DEPTH, 0))
+    monkeypatch.setattr(main, "_metadata_cache", (None, None, 0.0))
+    main.invalidate_summary_cache()
+    yield main
+    main._summary_queue.stop(timeout=10)
+    main.invalidate_summary_cache()
+
+
+@pytest.fixture
+def client(coha):
+    return coha.app.test_client()
+
+
+def form(quadrat="G", station="5", detection="no", **fields):
+    """Survey form values as the browser posts them."""
+    values = {"quadrat": quadrat, "station": station, "cloud": "1", "wind": "1", "noise": "1",
+              "latitude": "49.24", "longitude": "-123.05", "detection": detection,
+              "direction": "90", "distance": "100", "detection_type": "A", "age_class": "adult",
+              "observers": "Tester", "notes": "test"}
+    values.update(fields)
+    return values
+
+
+def observation(quadrat="G", station="5", timestamp="2025-04-27.08-15-00", **fields):
+    return Observation.from_csv_row(dict(form(quadrat, station, **fields), timestamp=timestamp))
+
+
+def save_file(coha, obs):
+    """Write obs as its observation file, as /save/ does.  Returns the blob name."""
+    name = coha.observation_blob_name(coha._observation_filename(obs.to_csv_row()))
+    coha.get_storage().write(name, coha._csv_to_string([obs]))
+    return name
+
+
+def names(coha, prefix):
+    return [blob.name for blob in coha.get_storage().list(prefix)]
@@ -0,0 +1,78 @@
+"""Fingerprinted static files under /dist/ and asset_url()."""
+
+import gzip
+import shutil
+
+import brotli
+import pytest
+
+import build_assets
+from main import app
+
+STATIC_NAMES = ["coha.js", "coha.css", "COHA.modified.mp3"]
+
+
+@pytest.fixture
+def built(coha, tmp_path, monkeypatch):
+    """A static/dist/ built from copies of a few static files, installed in the app."""
+    static = tmp_path / "static"
+    static.mkdir()
+    for name in STATIC_NAMES:
+        shutil.copy(f"{app.static_folder}/{name}", static / name)
+    build_assets.build(str(static))
+    dist = static / "dist"
+    monkeypatch.setattr(coha, "ASSET_DIST_DIR", str(dist))
+    monkeypatch.setattr(coha, "ASSET_MANIFEST_FILE", str(dist / "manifest.json"))
+    manifest, files = coha._load_asset_manifest()
+    monkeypatch.setattr(coha, "_asset_manifest", manifest)
+    monkeypatch.setattr(coha, "_asset_files", files)
+    return static
+
+
+def test_asset_url_points_at_the_fingerprinted_copy(coha, built):
+    url = coha.asset_url("coha.js")
+    assert url.startswith("/dist/coha.") and url.endswith(".js") and url != "/dist/coha.js"
+    assert coha.asset_url("not-built.png") == "/not-built.png"
+
+
+@pytest.mark.parametrize("accept, coding", [("br, gzip", "br"), ("gzip", "gzip"), ("", None)])
+def test_dist_files_are_immutable_and_precompressed(coha, built, client, accept, coding):
+    response = client.get(coha.asset_url("coha.css"), headers={"Accept-Encoding": accept})
+    assert response.status_code == 200
+    assert response.mimetype == "text/css"
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers.get("Content-Encoding") == coding
+    body = response.get_data()
+    body = {"br": brotli.decompress, "gzip": gzip.decompress}.get(coding, bytes)(body)
+    url = coha.asset_url("coha.css")
+    assert body == (built / "dist" / url.rsplit("/", 1)[-1]).read_bytes()
+    response.close()
+
+
+def test_uncompressed_files_do_not_vary(coha, built, client):
+    response = client.get(coha.asset_url("COHA.modified.mp3"), headers={"Accept-Encoding": "br, gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert "Vary" not in response.headers
+    assert response.cache_control.immutable
+    response.close()
+
+
+def test_unknown_dist_file_is_404(coha, built, client):
+    assert client.get("/dist/coha.000000000000.js").status_code == 404
+    assert client.get("/dist/manifest.json").status_code == 404
+
+
+def test_missing_manifest_falls_back_to_plain_urls(coha, tmp_path, client, monkeypatch):
+    monkeypatch.setattr(coha, "ASSET_MANIFEST_FILE", str(tmp_path / "no-such" / "manifest.json"))
+    manifest, files = coha._load_asset_manifest()
+    assert (manifest, files) == ({}, {})
+    monkeypatch.setattr(coha, "_asset_manifest", manifest)
+    monkeypatch.setattr(coha, "_asset_files", files)
+    monkeypatch.setattr(coha, "_form_page", None)
+
+    assert coha.asset_url("coha.js") == "/coha.js"
+    page = client.get("/").get_data(as_text=True)
+    assert '"/coha.js"' in page and "/dist/" not in page
+    assert client.get("/coha.js").status_code == 200
@@ -0,0 +1,95 @@
+"""conditional_update(): generation-match retries with backoff."""
+
+import json
+
+import pytest
+
+from conftest import observation
+
+BLOB = "COHA-data-2025.csv"
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(coha, monkeypatch):
+    monkeypatch.setattr(coha, "UPDATE_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(coha, "UPDATE_BACKOFF_MAX", 0.01)
+    monkeypatch.setattr(coha, "_update_stats", {})
+
+
+def interfering(coha, times, row):
+    """A mutate that adds row, after another writer changes the blob the first times calls."""
+    calls = []
+
+    def mutate(rows, exists):
+        calls.append(len(rows))
+        if len(calls) <= times:
+            other = observation(timestamp=f"2025-04-27.07-00-{len(calls):02d}")
+            coha.get_storage().write(BLOB, coha._csv_to_string(rows + [other]))
+        return rows + [row], "added"
+    return mutate, calls
+
+
+def test_creates_absent_blob(coha):
+    row = observation()
+    ok, msg, written = coha.conditional_update(BLOB, lambda rows, exists: (rows + [row], "added"))
+    assert ok and written.generation
+    assert coha._read_csv(BLOB)[0] == [row]
+
+
+def test_nothing_to_change_writes_nothing(coha):
+    ok, msg, written = coha.conditional_update(BLOB, lambda rows, exists: (None, "unchanged"))
+    assert (ok, msg, written) == (True, "unchanged", None)
+    assert coha.conditional_update_stats()[BLOB]["writes"] == 0
+
+
+def test_conflict_is_retried_with_fresh_rows(coha):
+    row = observation()
+    mutate, calls = interfering(coha, 2, row)
+    ok, _, _ = coha.conditional_update(BLOB, mutate)
+    assert ok
+    assert calls == [0, 1, 2]     # each retry saw the other writer's rows
+    rows = coha._read_csv(BLOB)[0]
+    assert len(rows) == 3 and row in rows
+    stats = coha.conditional_update_stats()[BLOB]
+    assert (stats["attempts"], stats["conflicts"], stats["writes"], stats["gave_up"]) == (3, 2, 1, 0)
+    assert stats["backoff_ms"] > 0
+
+
+def test_gives_up_after_attempts(coha):
+    mutate, calls = interfering(coha, 100, observation())
+    ok, msg, written = coha.conditional_update(BLOB, mutate, attempts=4)
+    assert not ok and written is None and "deferred" in msg
+    assert len(calls) == 4
+    assert coha.conditional_update_stats()[BLOB]["gave_up"] == 1
+
+
+def test_gives_up_at_deadline(coha, monkeypatch):
+    monkeypatch.setattr(coha, "_backoff_delay", lambda attempt: 1.0)
+    mutate, calls = interfering(coha, 100, observation())
+    ok, _, _ = coha.conditional_update(BLOB, mutate, attempts=10, deadline=0)
+    assert not ok and len(calls) == 1
+
+
+def test_backoff_delay_is_capped(coha, monkeypatch):
+    monkeypatch.setattr(coha, "UPDATE_BACKOFF_BASE", 0.05)
+    monkeypatch.setattr(coha, "UPDATE_BACKOFF_MAX", 0.2)
+    for attempt in range(12):
+        assert 0 <= coha._backoff_delay(attempt) <= min(0.2, 0.05 * 2 ** attempt)
+
+
+def test_delete_if_empty(coha):
+    coha.get_storage().write(BLOB, coha._csv_to_string([observation()]))
+    ok, _, _ = coha.conditional_update(BLOB, lambda rows, exists: ([], "emptied"), delete_if_empty=True)
+    assert ok and BLOB not in [b.name for b in coha.get_storage().list(BLOB)]
+
+
+def test_document_update(coha):
+    name = "doc.json"
+
+    def bump(document, exists):
+        return dict(document, n=document.get("n", 0) + 1, existed=exists), "bumped"
+
+    assert coha.conditional_update_document(name, bump)[0]
+    assert coha.conditional_update_document(name, bump)[0]
+    data, obj = coha.get_storage().read(name)
+    assert json.loads(data) == {"n": 2, "existed": True}
@@ -0,0 +1,24 @@
+"""The /data/export extract."""
+
+import csv
+import io
+
+from conftest import observation
+
+
+def export(client, query):
+    response = client.get(f"/data/export?{query}")
+    assert response.status_code == 200
+    return list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+
+def test_station_filter_matches_padded_stations(coha, client):
+    rows = [observation(station="5", timestamp="2025-04-27.08-15-00"),
+            observation(station="05", timestamp="2025-04-27.09-15-00"),
+            observation(station="6", timestamp="2025-04-27.10-15-00")]
+    coha.get_storage().write(coha._yearly_summary_name("2025"), coha._csv_to_string(rows))
+
+    exported = export(client, "year=2025&station=5")
+    assert [r["timestamp"] for r in exported] == ["2025-04-27.08-15-00", "2025-04-27.09-15-00"]
+    assert export(client, "year=2025&station=6&quadrat=G")[0]["station"] == "6"
+    assert export(client, "year=2025&station=7") == []
@@ -0,0 +1,43 @@
+"""The survey form page and /save/."""
+
+from conftest import form, names
+
+HTML = {"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
+
+
+def test_form_page_is_cacheable(coha, client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert "max-age" in response.headers["Cache-Control"]
+    assert coha.FORM_PAGE_MESSAGE.encode() in response.data
+
+
+def test_save_answers_json(coha, client):
+    response = client.post("/save/", data=form(), headers={"Accept": "application/json"})
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "saved"
+    invalid = client.post("/save/", data=form(cloud="9"))
+    assert invalid.status_code == 400 and invalid.get_json()["status"] == "invalid"
+
+
+def test_save_without_javascript_redirects_to_the_form(coha, client):
+    response = client.post("/save/", data=form(), headers=HTML)
+    assert response.status_code == 303
+    assert response.location == "/?outcome=saved"
+    assert len(names(coha, coha.OBSERVATION_PREFIX)) == 1
+
+    page = client.get(response.location)
+    assert page.status_code == 200 and page.headers["Cache-Control"] == "no-store"
+    assert coha.SAVE_OUTCOME_MESSAGES["saved"].encode() in page.data
+    assert client.get("/").headers["Cache-Control"] != "no-store"
+
+    invalid = client.post("/save/", data=form(cloud="9"), headers=HTML)
+    assert invalid.status_code == 303 and invalid.location == "/?outcome=invalid"
+
+
+def test_only_known_outcomes_change_the_page(coha, client):
+    default = client.get("/").data
+    for query in ("outcome=<script>alert(1)</script>", "outcome=hacked", "message=Survey+cancelled"):
+        page = client.get(f"/?{query}")
+        assert page.data == default
+        assert page.headers["Cache-Control"] != "no-store"
@@ -0,0 +1,74 @@
+"""Group commit of concurrent changes to one summary CSV."""
+
+import threading
+import time
+
+import pytest
+
+from conftest import observation
+
+BLOB = "COHA-data-2025.csv"
+THREADS = 12
+
+
+@pytest.fixture
+def slow_writes(coha, monkeypatch):
+    """Make each write take a while, so changes arrive while one is in flight."""
+    inner = coha.get_storage().inner
+    write = inner.write
+
+    def slow(name, data, **kwargs):
+        time.sleep(0.05)
+        return write(name, data, **kwargs)
+    monkeypatch.setattr(inner, "write", slow)
+    monkeypatch.setattr(coha, "UPDATE_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(coha, "UPDATE_BACKOFF_MAX", 0.01)
+    monkeypatch.setattr(coha, "UPDATE_ATTEMPTS", 50)
+    monkeypatch.setattr(coha, "_update_stats", {})
+
+
+def append_concurrently(coha):
+    rows = [observation(timestamp=f"2025-04-27.08-00-{i:02d}") for i in range(THREADS)]
+    results = [None] * THREADS
+    start = threading.Barrier(THREADS)
+
+    def append(i):
+        start.wait()
+        results[i] = coha.append_to_summary_file(BLOB, [rows[i]])
+
+    threads = [threading.Thread(target=append, args=(i,)) for i in range(THREADS)]
+    before = coha.summary_commit_stats()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    after = coha.summary_commit_stats()
+    return rows, results, {k: after[k] - before[k] for k in after}
+
+
+def test_concurrent_changes_share_writes(coha, slow_writes):
+    rows, results, commits = append_concurrently(coha)
+    assert all(ok for ok, _ in results)
+    assert sorted(r.timestamp for r in coha._read_csv(BLOB)[0]) == [r.timestamp for r in rows]
+    assert commits["changes"] == THREADS
+    assert commits["commits"] < THREADS
+    stats = coha.conditional_update_stats()[BLOB]
+    assert stats["conflicts"] == 0
+    assert stats["writes"] == commits["commits"]
+
+
+def test_without_group_commit_conflicts_are_retried(coha, slow_writes, monkeypatch):
+    monkeypatch.setattr(coha, "SUMMARY_GROUP_COMMIT", False)
+    rows, results, commits = append_concurrently(coha)
+    assert all(ok for ok, _ in results)
+    assert sorted(r.timestamp for r in coha._read_csv(BLOB)[0]) == [r.timestamp for r in rows]
+    assert commits["commits"] == THREADS
+    assert coha.conditional_update_stats()[BLOB]["conflicts"] > 0
+
+
+def test_remove_reports_rows_removed(coha, slow_writes):
+    coha.get_storage().write(BLOB, coha._csv_to_string([observation()]))
+    ok, msg = coha.remove_from_summary_file(BLOB, observation().timestamp)
+    assert ok and "Removed 1 row(s)" in msg
+    ok, msg = coha.remove_from_summary_file(BLOB, observation().timestamp)
+    assert ok and "Removed 0 row(s)" in msg
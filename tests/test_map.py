@@ -0,0 +1,58 @@
+"""The map endpoints."""
+
+from conftest import observation, save_file
+
+
+def seed(coha, *timestamps):
+    rows = [observation(timestamp=ts) for ts in timestamps]
+    for row in rows:
+        save_file(coha, row)
+    coha.regenerate_data_summaries(full=True)
+    return rows
+
+
+def test_year_data(coha, client):
+    seed(coha, "2024-04-27.08-15-00", "2025-04-27.08-15-00")
+    response = client.get("/map/data/2025")
+    assert response.status_code == 200
+    assert [r["timestamp"] for r in response.get_json()] == ["2025-04-27.08-15-00"]
+
+
+def test_unknown_year_is_not_cached(coha, client):
+    seed(coha, "2025-04-27.08-15-00")
+    for year in ("1999", "2000", "2001"):
+        assert client.get(f"/map/data/{year}").status_code == 404
+    assert client.get("/map/data/19x9").status_code == 400
+    for year in ("1999", "2000", "2001"):
+        assert coha._yearly_summary_name(year) not in coha._summary_cache
+        assert year not in coha._year_payloads
+
+
+def test_years(coha, client):
+    seed(coha, "2024-04-27.08-15-00", "2025-04-27.08-15-00", "2025-04-28.08-15-00")
+    body = client.get("/map/years").get_json()
+    assert body == {"years": ["2024", "2025"], "counts": {"2024": 1, "2025": 2}}
+
+
+def break_storage(coha, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("storage unavailable")
+    inner = coha.get_storage().inner
+    for method in ("stat", "read", "list", "write"):
+        monkeypatch.setattr(inner, method, fail)
+
+
+def test_pages_render_without_storage(coha, client, monkeypatch):
+    break_storage(coha, monkeypatch)
+    assert client.get("/map/").status_code == 200
+    assert client.get("/map/years").get_json() == {"years": [], "counts": {}}
+    assert not coha._regen_running.locked()     # no rebuild against failing storage
+
+
+def test_storage_errors_serve_the_last_metadata(coha, client, monkeypatch):
+    seed(coha, "2025-04-27.08-15-00")
+    assert client.get("/map/years").get_json()["years"] == ["2025"]
+    monkeypatch.setattr(coha, "SUMMARY_CACHE_TTL", 0)
+    break_storage(coha, monkeypatch)
+    assert client.get("/map/years").get_json()["years"] == ["2025"]
+    assert client.get("/map/").status_code == 200
@@ -0,0 +1,58 @@
+"""Observation parsing and its round trip back to CSV text."""
+
+import pytest
+
+from observation import FILE_FIELD_NAMES, Observation, observations_from_csv
+
+SUMMARY_CSV = (
+    ",".join(FILE_FIELD_NAMES) + "\r\n"
+    "G,5,3,1,2,49.24,-123.05,yes,90,100,A,adult,Tester,,2025-04-27.08-15-00\r\n"
+    "G,05,3,3->1,02,49.2400,-123.0500,Y,,,,,Legacy Import,\"calls, then quiet\",2023-04-02.10-56-00\r\n"
+    "E,9,,,,,,N,,,,,A B,,2022-04-02.10-56-00\r\n"
+    "E,10,4,1,2,not recorded,0,no,270,>400,V,,A B,é,2022-04-02.11-07-00\r\n"
+)
+
+
+@pytest.mark.parametrize("field, text, value", [
+    ("station", "5", 5),
+    ("station", "05", "05"),
+    ("wind", "3->1", "3->1"),
+    ("noise", "02", "02"),
+    ("distance", ">400", ">400"),
+    ("cloud", "0", 0),
+    ("latitude", "49.24", 49.24),
+    ("latitude", "49.2400", "49.2400"),
+    ("longitude", "-123.0500", "-123.0500"),
+    ("latitude", "not recorded", "not recorded"),
+    ("latitude", "", None),
+    ("quadrat", "", None),
+    ("notes", "", None),
+])
+def test_values_that_do_not_parse_keep_their_text(field, text, value):
+    obs = Observation.from_csv_row({field: text})
+    assert getattr(obs, field) == value and type(getattr(obs, field)) is type(value)
+    assert obs.to_csv_row()[field] == text
+
+
+def test_repeated_text_is_interned():
+    a, b = observations_from_csv(SUMMARY_CSV)[2:4]
+    assert a.observers is b.observers and a.quadrat is b.quadrat
+
+
+@pytest.mark.parametrize("latitude", ["49.2400", "", "not a number", "49.24", "-0.0"])
+def test_to_csv_row_round_trips_latitude(latitude):
+    row = dict.fromkeys(FILE_FIELD_NAMES, "")
+    row.update(latitude=latitude, longitude=latitude, timestamp="2025-04-27.08-15-00")
+    assert Observation.from_csv_row(row).to_csv_row() == row
+
+
+def test_missing_fields_are_blank():
+    row = Observation.from_csv_row({"quadrat": "G"}).to_csv_row()
+    assert list(row) == FILE_FIELD_NAMES
+    assert row["quadrat"] == "G" and row["station"] == "" and row["timestamp"] == ""
+
+
+def test_summary_csv_round_trips_byte_for_byte(coha):
+    rows = observations_from_csv(SUMMARY_CSV)
+    assert coha._csv_to_string(rows) == SUMMARY_CSV
+    assert rows == observations_from_csv(coha._csv_to_string(rows))
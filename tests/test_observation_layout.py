@@ -0,0 +1,73 @@
+"""Observation files under obs/YYYY/ and the prefix-scoped listings."""
+
+import pytest
+
+import main
+from conftest import form, observation, save_file
+
+
+@pytest.fixture
+def listings(coha, monkeypatch):
+    """(prefix, delimiter) of every listing made, files and prefixes alike."""
+    inner = coha.get_storage().inner
+    calls = []
+    for method in ("list", "list_prefixes"):
+        original = getattr(inner, method)
+
+        def recording(prefix=None, delimiter=None, _original=original):
+            calls.append((prefix, delimiter))
+            return _original(prefix, delimiter=delimiter)
+        monkeypatch.setattr(inner, method, recording)
+    return calls
+
+
+def save_flat(coha, obs):
+    """Write obs at the top of the bucket, as before the obs/YYYY/ layout."""
+    name = coha._observation_filename(obs.to_csv_row())
+    coha.get_storage().write(name, coha._csv_to_string([obs]))
+    return name
+
+
+def test_observation_blob_name():
+    assert main.observation_blob_name("G.05.2025-04-27.08-15-00.csv") == "obs/2025/G.05.2025-04-27.08-15-00.csv"
+    assert main.observation_blob_name("obs/2025/G.05.2025-04-27.08-15-00.csv") == \
+        "obs/2025/G.05.2025-04-27.08-15-00.csv"
+
+
+def test_observation_years_lists_prefixes_not_files(coha, listings):
+    save_file(coha, observation(timestamp="2024-04-27.08-15-00"))
+    save_file(coha, observation(timestamp="2025-04-27.08-15-00"))
+    save_file(coha, observation(timestamp="2025-04-28.08-15-00"))
+    save_flat(coha, observation(timestamp="2022-04-02.10-56-00"))
+    coha.get_storage().write("COHA-data-2019.csv", "")      # not an observation file
+    listings.clear()
+    assert coha.observation_years() == ["2022", "2024", "2025"]
+    assert sorted(listings, key=str) == sorted([("obs/", "/"), (None, "/")], key=str)
+
+
+def test_year_listing_is_scoped_to_its_prefix(coha, listings):
+    new = save_file(coha, observation(timestamp="2025-04-27.08-15-00"))
+    save_file(coha, observation(timestamp="2024-04-27.08-15-00"))
+    flat = save_flat(coha, observation(timestamp="2025-04-28.08-15-00"))
+    save_flat(coha, observation(timestamp="2024-04-28.08-15-00"))
+    listings.clear()
+    assert sorted(b.name for b in coha._iter_observation_blobs("2025")) == sorted([flat, new])
+    assert ("obs/2025/", None) in listings
+    assert all(prefix in ("obs/2025/", None) for prefix, _ in listings)
+    assert all(delimiter == "/" for prefix, delimiter in listings if prefix is None)
+
+
+def test_file_in_both_layouts_is_listed_once(coha):
+    obs = observation()
+    flat = save_flat(coha, obs)
+    new = save_file(coha, obs)
+    assert [b.name for b in coha._iter_observation_blobs("2025")] == [new]
+    assert [b.name for b in coha._iter_observation_blobs()] == [new]
+    assert [b.name for b in coha.flat_observation_blobs(2025)] == [flat]
+
+
+def test_save_writes_under_the_year_prefix(coha, client):
+    response = client.post("/save/", data=form(), headers={"Accept": "application/json"})
+    assert response.status_code == 200
+    assert [b.name for b in coha._iter_observation_blobs()][0].startswith("obs/20")
+    assert list(coha.flat_observation_blobs()) == []
@@ -0,0 +1,77 @@
+"""Precompressed payloads: content negotiation, ETags and 304s."""
+
+import gzip
+
+import brotli
+import pytest
+
+from conftest import observation, save_file
+
+
+@pytest.fixture
+def year_data(coha):
+    save_file(coha, observation())
+    coha.regenerate_data_summaries(full=True)
+    return "/map/data/2025"
+
+
+@pytest.mark.parametrize("accept, coding", [
+    ("br, gzip", "br"),
+    ("gzip", "gzip"),
+    ("", None),
+    ("identity", None),
+])
+def test_encoding_follows_accept_encoding(client, year_data, accept, coding):
+    response = client.get(year_data, headers={"Accept-Encoding": accept})
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == coding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["Cache-Control"] == "no-cache"
+    body = response.get_data()
+    if coding == "br":
+        body = brotli.decompress(body)
+    elif coding == "gzip":
+        body = gzip.decompress(body)
+    assert b'"timestamp":"2025-04-27.08-15-00"' in body
+
+
+def test_each_coding_has_its_own_etag(client, year_data):
+    etags = {client.get(year_data, headers={"Accept-Encoding": accept}).headers["ETag"]
+             for accept in ("br", "gzip", "")}
+    assert len(etags) == 3
+
+
+@pytest.mark.parametrize("accept", ["br", "gzip", ""])
+def test_matching_if_none_match_returns_304(client, year_data, accept):
+    etag = client.get(year_data, headers={"Accept-Encoding": accept}).headers["ETag"]
+    response = client.get(year_data, headers={"Accept-Encoding": accept, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == etag
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+def test_etag_of_another_coding_still_matches(client, year_data):
+    # A cache may revalidate with the validator it stored for a different coding
+    gzip_etag = client.get(year_data, headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    response = client.get(year_data, headers={"Accept-Encoding": "br", "If-None-Match": gzip_etag})
+    assert response.status_code == 304
+
+
+def test_changed_data_gets_a_new_etag(coha, client, year_data):
+    etag = client.get(year_data).headers["ETag"]
+    save_file(coha, observation(timestamp="2025-04-28.08-15-00"))
+    coha.regenerate_data_summaries()
+    response = client.get(year_data, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_without_brotli_gzip_is_served(coha, monkeypatch):
+    monkeypatch.setattr(coha, "brotli", None)
+    payload = coha._Payload(b'{"a":1}')
+    with coha.app.test_request_context(headers={"Accept-Encoding": "br, gzip"}):
+        response = coha._send_payload(payload, cache_control="public, max-age=60")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == "public, max-age=60"
+    assert gzip.decompress(response.get_data()) == b'{"a":1}'
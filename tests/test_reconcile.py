@@ -0,0 +1,63 @@
+"""reconcile_summaries(): repair drift between the summaries and the observation files."""
+
+from conftest import observation, save_file
+
+
+def summary_timestamps(coha, summary_file):
+    coha.invalidate_summary_cache()
+    return sorted(r.timestamp for r in coha._load_summary(summary_file).rows)
+
+
+def test_matching_summaries_are_left_alone(coha):
+    save_file(coha, observation())
+    coha.regenerate_data_summaries(full=True)
+    ok, msg, report = coha.reconcile_summaries()
+    assert ok and msg == "Summaries match 1 observation file(s)"
+    assert report["downloaded"] == 0
+
+
+def test_missing_and_extra_rows_are_repaired(coha):
+    kept = observation(timestamp="2025-04-27.08-15-00")
+    deleted = observation(timestamp="2025-04-27.09-15-00")
+    save_file(coha, kept)
+    deleted_name = save_file(coha, deleted)
+    coha.regenerate_data_summaries(full=True)
+    coha.get_storage().delete(deleted_name)
+    added = observation(timestamp="2025-04-28.08-15-00")
+    save_file(coha, added)
+
+    ok, _, report = coha.reconcile_summaries()
+    assert ok
+    result = report["summaries"]["COHA-data-2025.csv"]
+    assert (result["missing"], result["extra"], result["repaired"]) == (1, 1, True)
+    assert summary_timestamps(coha, "COHA-data-2025.csv") == [kept.timestamp, added.timestamp]
+    assert summary_timestamps(coha, coha.SUMMARY_FILE_NAME) == [kept.timestamp, added.timestamp]
+
+
+def test_report_only(coha):
+    save_file(coha, observation())
+    ok, msg, report = coha.reconcile_summaries(repair=False)
+    assert "differ" in msg
+    assert summary_timestamps(coha, "COHA-data-2025.csv") == []
+
+
+def test_save_after_listing_is_not_dropped(coha, monkeypatch):
+    """An observation saved between the file listing and the summary read is kept."""
+    save_file(coha, observation(timestamp="2025-04-27.08-15-00"))
+    coha.regenerate_data_summaries(full=True)
+    late = observation(timestamp="2025-04-27.10-15-00")
+    list_files = coha._iter_observation_blobs
+
+    def list_then_save(year=None):
+        yield from list(list_files(year))
+        # /save/: the file, then its summary log segment
+        filename = save_file(coha, late)
+        assert coha.append_to_summary_log([late], filename.rsplit("/", 1)[1])[0]
+    monkeypatch.setattr(coha, "_iter_observation_blobs", list_then_save)
+
+    ok, _, report = coha.reconcile_summaries()
+    assert ok
+    assert all(s["extra"] == 0 for s in report["summaries"].values())
+    assert late.timestamp in summary_timestamps(coha, "COHA-data-2025.csv")
+    assert late.timestamp in summary_timestamps(coha, coha.SUMMARY_FILE_NAME)
+    assert any(True for _ in coha.get_storage().list(f"{coha.SUMMARY_LOG_PREFIX}2025/"))
@@ -0,0 +1,145 @@
+"""Single-flight regeneration and the bucket-wide summary-regen.lock."""
+
+import json
+import threading
+import time
+
+import pytest
+
+from conftest import ADMIN_AUTH, form, names, observation, save_file
+
+
+@pytest.fixture
+def short_lease(coha, monkeypatch):
+    monkeypatch.setattr(coha, "REGEN_LOCK_LEASE", 0.3)
+
+
+def write_lock(coha, expires, instance="other"):
+    coha.get_storage().write(coha.REGEN_LOCK_NAME, json.dumps({"instance": instance, "expires": expires}))
+
+
+def test_rebuild_releases_the_lock(coha):
+    save_file(coha, observation())
+    ran, msg, data = coha.regenerate_single_flight()
+    assert ran and len(data) == 1
+    assert names(coha, coha.REGEN_LOCK_NAME) == []
+    assert "COHA-data-2025.csv" in names(coha, "COHA-data-")
+
+
+def test_one_rebuild_per_instance(coha):
+    with coha._regen_running:
+        ran, msg, _ = coha.regenerate_single_flight()
+    assert not ran and msg == "A regeneration is already running"
+
+
+def test_live_lock_on_another_instance(coha):
+    write_lock(coha, time.time() + 60)
+    ran, msg, _ = coha.regenerate_single_flight()
+    assert not ran and "another instance" in msg
+    assert coha.regeneration_in_progress()
+
+
+def test_expired_lock_is_taken_over(coha):
+    save_file(coha, observation())
+    write_lock(coha, time.time() - 1)
+    assert not coha.regeneration_in_progress()
+    ran, _, _ = coha.regenerate_single_flight()
+    assert ran
+    assert names(coha, coha.REGEN_LOCK_NAME) == []
+
+
+def test_lease_is_renewed_during_a_long_rebuild(coha, short_lease, monkeypatch):
+    save_file(coha, observation())
+    scan = coha._scan_observations
+    expiries = []
+
+    def slow_scan(*args, **kwargs):
+        for _ in range(4):
+            time.sleep(0.1)
+            expiries.append(coha._read_regen_lock()[0])
+        return scan(*args, **kwargs)
+    monkeypatch.setattr(coha, "_scan_observations", slow_scan)
+
+    ran, _, _ = coha.regenerate_single_flight()
+    assert ran
+    assert expiries[-1] > expiries[0]
+
+
+def test_lost_lock_abandons_the_rebuild(coha, short_lease, monkeypatch):
+    save_file(coha, observation())
+    scan = coha._scan_observations
+
+    def taken_over(*args, **kwargs):
+        # Another instance takes the lock over while the files are being read
+        write_lock(coha, time.time() + 60)
+        time.sleep(0.3)
+        return scan(*args, **kwargs)
+    monkeypatch.setattr(coha, "_scan_observations", taken_over)
+
+    ran, msg, data = coha.regenerate_single_flight()
+    assert not ran and data is None and "abandoned" in msg
+    assert names(coha, "COHA-data-") == []
+    assert json.loads(coha.get_storage().read(coha.REGEN_LOCK_NAME)[0])["instance"] == "other"
+
+
+def test_overdue_renewal_abandons_the_rebuild(coha, short_lease, monkeypatch):
+    save_file(coha, observation())
+    monkeypatch.setattr(coha, "_hold_regen_lock", lambda lease, stop: None)    # starved renewer
+    scan = coha._scan_observations
+
+    def slow_scan(*args, **kwargs):
+        time.sleep(0.4)
+        return scan(*args, **kwargs)
+    monkeypatch.setattr(coha, "_scan_observations", slow_scan)
+
+    ran, _, _ = coha.regenerate_single_flight()
+    assert not ran
+    assert names(coha, "COHA-data-") == []
+
+
+def test_page_starts_a_background_rebuild(coha, client, monkeypatch):
+    save_file(coha, observation())
+    answered = threading.Event()
+    scan = coha._scan_observations
+
+    def scan_after_response(*args, **kwargs):
+        answered.wait(10)
+        return scan(*args, **kwargs)
+    monkeypatch.setattr(coha, "_scan_observations", scan_after_response)
+
+    assert b"being rebuilt" in client.get("/map/").data
+    answered.set()
+    for thread in threading.enumerate():
+        if thread.name == "summary-regen":
+            thread.join(timeout=10)
+    assert client.get("/map/years").get_json()["years"] == ["2025"]
+
+
+def test_admin_regen_runs_in_the_request(coha, client):
+    save_file(coha, observation())
+    response = client.post("/admin/regen/", headers=ADMIN_AUTH)
+    assert response.status_code == 302 and "op=regenerated" in response.location
+    assert "COHA-data-2025.csv" in names(coha, "COHA-data-")
+
+
+def test_empty_bucket_is_rebuilt_once(coha, client, monkeypatch):
+    started = []
+    start = coha.start_background_regeneration
+    monkeypatch.setattr(coha, "start_background_regeneration", lambda **kw: started.append(1) or start(**kw))
+
+    client.get("/map/")
+    for thread in threading.enumerate():
+        if thread.name == "summary-regen":
+            thread.join(timeout=10)
+    assert started == [1]
+    assert coha.get_summary_metadata().get("rebuilt_at")
+
+    for page in ("/map/", "/data/", "/map/"):
+        assert b"being rebuilt" not in client.get(page).data
+    assert started == [1]
+
+    assert client.post("/save/", data=form()).get_json()["status"] == "saved"
+    coha._summary_queue.drain(timeout=10)
+    coha._metadata_cache = (None, None, 0.0)
+    assert client.get("/map/years").get_json()["years"] != []
+    assert started == [1]
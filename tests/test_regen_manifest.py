@@ -0,0 +1,112 @@
+"""Incremental regeneration from summary-manifest.json."""
+
+import pytest
+
+from conftest import observation, save_file
+
+
+@pytest.fixture
+def downloads(coha, monkeypatch):
+    """Observation files downloaded by regeneration, by name."""
+    calls = []
+    download = coha._download_observation
+
+    def counting_download(blob, *args, **kwargs):
+        calls.append(blob.name)
+        return download(blob, *args, **kwargs)
+    monkeypatch.setattr(coha, "_download_observation", counting_download)
+    return calls
+
+
+def summary_stamps(coha, summary_file="COHA-data-2025.csv"):
+    rows, _ = coha._read_csv(summary_file)
+    return sorted(r.timestamp for r in rows)
+
+
+def test_manifest_records_each_file(coha):
+    name = save_file(coha, observation())
+    coha.regenerate_data_summaries()
+    manifest = coha.read_summary_manifest()
+    blob = coha.get_storage().stat(name)
+    assert manifest == {name: {"generation": blob.generation, "md5": blob.md5_hash, "rows": [observation()]}}
+
+
+def test_unchanged_files_are_not_downloaded(coha, downloads):
+    save_file(coha, observation())
+    coha.regenerate_data_summaries()
+    downloads.clear()
+    coha.regenerate_data_summaries()
+    assert downloads == []
+    assert summary_stamps(coha) == ["2025-04-27.08-15-00"]
+
+
+def test_new_file_is_downloaded(coha, downloads):
+    save_file(coha, observation())
+    coha.regenerate_data_summaries()
+    downloads.clear()
+    new = save_file(coha, observation(timestamp="2025-04-28.08-15-00"))
+    coha.regenerate_data_summaries()
+    assert downloads == [new]
+    assert summary_stamps(coha) == ["2025-04-27.08-15-00", "2025-04-28.08-15-00"]
+
+
+def test_changed_file_is_downloaded(coha, downloads):
+    name = save_file(coha, observation())
+    save_file(coha, observation(station="6"))
+    coha.regenerate_data_summaries()
+    downloads.clear()
+    save_file(coha, observation(notes="corrected"))     # same name, new generation
+    coha.regenerate_data_summaries()
+    assert downloads == [name]
+    rows, _ = coha._read_csv("COHA-data-2025.csv")
+    assert sorted(r.notes for r in rows) == ["corrected", "test"]
+
+
+def test_deleted_file_drops_out(coha, downloads):
+    gone = save_file(coha, observation())
+    save_file(coha, observation(timestamp="2024-04-27.08-15-00"))
+    coha.regenerate_data_summaries()
+    downloads.clear()
+    coha.get_storage().delete(gone)
+    coha.regenerate_data_summaries()
+    assert downloads == []
+    assert gone not in coha.read_summary_manifest()
+    assert summary_stamps(coha, coha.SUMMARY_FILE_NAME) == ["2024-04-27.08-15-00"]
+
+
+def test_full_regeneration_ignores_the_manifest(coha, downloads):
+    name = save_file(coha, observation())
+    coha.regenerate_data_summaries()
+    downloads.clear()
+    coha.regenerate_data_summaries(full=True)
+    assert downloads == [name]
+
+
+def test_unreadable_manifest_means_a_full_scan(coha, downloads):
+    name = save_file(coha, observation())
+    coha.regenerate_data_summaries()
+    coha.get_storage().write(coha.SUMMARY_MANIFEST_NAME, "{not json")
+    downloads.clear()
+    coha.regenerate_data_summaries()
+    assert downloads == [name]
+
+
+def test_failed_download_is_retried_next_time(coha, monkeypatch, downloads):
+    name = save_file(coha, observation())
+    monkeypatch.setattr(coha.random, "uniform", lambda a, b: 0)
+    inner = coha.get_storage().inner
+    read = inner.read
+
+    def failing_read(blob_name, *args, **kwargs):
+        if blob_name == name:
+            raise ConnectionError("transient")
+        return read(blob_name, *args, **kwargs)
+    monkeypatch.setattr(inner, "read", failing_read)
+    coha.regenerate_data_summaries()
+    assert coha.read_summary_manifest()[name]["generation"] is None
+
+    monkeypatch.setattr(inner, "read", read)
+    downloads.clear()
+    coha.regenerate_data_summaries()
+    assert downloads == [name]
+    assert summary_stamps(coha) == ["2025-04-27.08-15-00"]
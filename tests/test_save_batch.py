@@ -0,0 +1,60 @@
+"""/save/batch, which uploads observations stored on a device while offline."""
+
+import datetime
+
+import pytz
+
+from conftest import form, names
+
+
+def pacific(delta=datetime.timedelta()):
+    now = datetime.datetime.now(tz=pytz.timezone("Canada/Pacific")) + delta
+    return now.strftime("%Y-%m-%d.%H-%M-%S")
+
+
+def upload(client, *observations):
+    response = client.post("/save/batch", json={"observations": list(observations)})
+    assert response.status_code == 200
+    return {r["id"]: r for r in response.get_json()["results"]}
+
+
+def test_saves_with_device_time(coha, client):
+    timestamp = pacific(-datetime.timedelta(hours=2))
+    results = upload(client, dict(form(), id="a", timestamp=timestamp))
+    assert results["a"]["status"] == "saved"
+    assert "note" not in results["a"]
+    assert results["a"]["filename"].endswith(f"G.05.{timestamp}.csv")
+
+
+def test_resend_is_a_duplicate(coha, client):
+    item = dict(form(), id="a", timestamp=pacific())
+    assert upload(client, item)["a"]["status"] == "saved"
+    assert upload(client, item)["a"]["status"] == "duplicate"
+    assert len(names(coha, coha.OBSERVATION_PREFIX)) == 1
+
+
+def test_skewed_clock_falls_back_to_receipt_time(coha, client):
+    results = upload(client,
+                     dict(form(), id="future", timestamp=pacific(datetime.timedelta(days=2))),
+                     dict(form(), id="old", timestamp="2001-01-01.00-00-00"),
+                     dict(form(), id="garbled", timestamp="yesterday"),
+                     dict(form(), id="missing"))
+    assert {r["status"] for r in results.values()} == {"saved"}
+    assert all("received" in r["note"] and r["note"] in r["message"] for r in results.values())
+    # Same station, same batch: each still gets its own file
+    assert len({r["filename"] for r in results.values()}) == 4
+    assert len(names(coha, coha.OBSERVATION_PREFIX)) == 4
+
+
+def test_small_clock_skew_keeps_device_time(coha, client):
+    timestamp = pacific(datetime.timedelta(minutes=10))
+    result = upload(client, dict(form(), id="a", timestamp=timestamp))["a"]
+    assert result["status"] == "saved" and timestamp in result["filename"]
+
+
+def test_invalid_fields_are_reported_per_item(coha, client):
+    results = upload(client,
+                     dict(form(), id="good", timestamp=pacific()),
+                     dict(form(cloud="9"), id="bad", timestamp=pacific()))
+    assert results["good"]["status"] == "saved"
+    assert results["bad"]["status"] == "invalid"
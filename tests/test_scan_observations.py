@@ -0,0 +1,83 @@
+"""Reading the observation files for regeneration."""
+
+import threading
+import time
+
+import pytest
+
+from conftest import observation, save_file
+
+
+@pytest.fixture
+def no_backoff(coha, monkeypatch):
+    monkeypatch.setattr(coha.random, "uniform", lambda a, b: 0)
+
+
+def flaky_reads(coha, monkeypatch, failures):
+    """Make the first failures[name] reads of each named blob raise."""
+    inner = coha.get_storage().inner
+    read = inner.read
+    attempts = {}
+
+    def failing_read(name, *args, **kwargs):
+        attempts[name] = attempts.get(name, 0) + 1
+        if attempts[name] <= failures.get(name, 0):
+            raise ConnectionError("transient")
+        return read(name, *args, **kwargs)
+    monkeypatch.setattr(inner, "read", failing_read)
+    return attempts
+
+
+def test_transient_failures_are_retried(coha, monkeypatch, no_backoff):
+    name = save_file(coha, observation())
+    attempts = flaky_reads(coha, monkeypatch, {name: coha.REGEN_DOWNLOAD_ATTEMPTS - 1})
+    blob = coha.get_storage().stat(name)
+    assert coha._download_observation(blob) == [observation()]
+    assert attempts[name] == coha.REGEN_DOWNLOAD_ATTEMPTS
+
+
+def test_persistent_failure_skips_the_file(coha, monkeypatch, no_backoff):
+    name = save_file(coha, observation())
+    attempts = flaky_reads(coha, monkeypatch, {name: coha.REGEN_DOWNLOAD_ATTEMPTS})
+    assert coha._download_observation(coha.get_storage().stat(name)) is None
+    assert attempts[name] == coha.REGEN_DOWNLOAD_ATTEMPTS
+
+
+def test_file_deleted_after_listing_is_not_retried(coha, monkeypatch):
+    name = save_file(coha, observation())
+    blob = coha.get_storage().stat(name)
+    coha.get_storage().delete(name)
+    monkeypatch.setattr(coha.time, "sleep", lambda s: pytest.fail("retried a deleted file"))
+    assert coha._download_observation(blob) == []
+
+
+def test_downloads_run_concurrently_and_keep_listing_order(coha, monkeypatch):
+    names = [save_file(coha, observation(station=str(s))) for s in range(1, 9)]
+    inner = coha.get_storage().inner
+    read = inner.read
+    lock = threading.Lock()
+    running = [0, 0]    # now, peak
+
+    def slow_read(name, *args, **kwargs):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        # Later files finish first
+        time.sleep(0.01 * (9 - int(name.split(".")[1])))
+        with lock:
+            running[0] -= 1
+        return read(name, *args, **kwargs)
+    monkeypatch.setattr(inner, "read", slow_read)
+
+    files = coha._scan_observations({}, concurrency=4)
+    assert list(files) == sorted(names)
+    assert [f["rows"][0].station for f in files.values()] == list(range(1, 9))
+    assert 1 < running[1] <= 4
+
+
+def test_regeneration_survives_a_failed_download(coha, monkeypatch, no_backoff):
+    save_file(coha, observation(station="5"))
+    bad = save_file(coha, observation(station="6"))
+    flaky_reads(coha, monkeypatch, {bad: coha.REGEN_DOWNLOAD_ATTEMPTS})
+    data, _ = coha.regenerate_data_summaries(full=True)
+    assert [r.station for r in data] == [5]
@@ -0,0 +1,56 @@
+"""The form's service worker, /sw.js."""
+
+import json
+import os
+import re
+
+import pytest
+
+
+def precache(response):
+    return json.loads(re.search(r"^const PRECACHE = (.*);$", response.get_data(as_text=True), re.M).group(1))
+
+
+def version(response):
+    return json.loads(re.search(r"^const VERSION = (.*);$", response.get_data(as_text=True), re.M).group(1))
+
+
+@pytest.fixture
+def coords_file(coha, tmp_path, monkeypatch):
+    path = tmp_path / "coords.csv"
+    path.write_text("Quadrat,Station,latitude,longitude,year taken\nG,5,49.24,-123.05,2021\n")
+    monkeypatch.setattr(coha, "STATION_COORDS_FILE", str(path))
+    for cached in ("_station_coords", "_form_page", "_service_worker"):
+        monkeypatch.setattr(coha, cached, None)
+    return path
+
+
+def test_served_as_javascript_and_always_revalidated(client):
+    response = client.get("/sw.js", headers={"Accept-Encoding": ""})
+    assert response.status_code == 200
+    assert response.mimetype == "text/javascript"
+    assert response.headers["Cache-Control"] == "no-cache"
+    again = client.get("/sw.js", headers={"Accept-Encoding": "", "If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_precaches_the_form_and_what_it_loads(coha, client):
+    urls = precache(client.get("/sw.js", headers={"Accept-Encoding": ""}))
+    assert urls[:2] == ["/", coha.station_coords_url()]
+    assert urls[2:] == [coha.asset_url(name) for name in coha.OFFLINE_ASSETS]
+    for url in urls[2:]:
+        assert client.get(url).status_code == 200
+
+
+def test_version_follows_the_form_page(coha, coords_file, client):
+    before = client.get("/sw.js", headers={"Accept-Encoding": ""})
+    assert client.get("/sw.js", headers={"Accept-Encoding": ""}).get_data() == before.get_data()
+
+    # New coordinates change the form page and its stations URL
+    mtime = os.stat(coords_file).st_mtime_ns + 1_000_000_000
+    coords_file.write_text("Quadrat,Station,latitude,longitude,year taken\nG,5,49.25,-123.06,2025\n")
+    os.utime(coords_file, ns=(mtime, mtime))
+    after = client.get("/sw.js", headers={"Accept-Encoding": ""})
+    assert version(after) != version(before)
+    assert coha.station_coords_url() in precache(after)
+    assert coha.station_coords_url() not in precache(before)
@@ -0,0 +1,55 @@
+"""The cached station coordinates and /stations.json."""
+
+import os
+
+import pytest
+
+HEADER = "Quadrat,Station,latitude,longitude,year taken\n"
+
+
+@pytest.fixture
+def coords_file(coha, tmp_path, monkeypatch):
+    path = tmp_path / "coords.csv"
+    path.write_text(HEADER + "G,5,49.24,-123.05,2021\n")
+    monkeypatch.setattr(coha, "STATION_COORDS_FILE", str(path))
+    monkeypatch.setattr(coha, "_station_coords", None)
+    return path
+
+
+def rewrite(path, text):
+    """Replace the file, making sure its mtime moves on even on coarse clocks."""
+    before = os.stat(path).st_mtime_ns
+    path.write_text(text)
+    os.utime(path, ns=(before + 1_000_000_000, before + 1_000_000_000))
+
+
+def test_coords_are_read_once(coha, coords_file, monkeypatch):
+    coords = coha.load_station_coords()
+    assert coords["G"]["5"] == {"latitude": "49.24", "longitude": "-123.05", "year": "2021"}
+    monkeypatch.setattr(coha, "_read_station_coords", None)     # any re-read would fail
+    assert coha.load_station_coords() is coords
+    with pytest.raises(TypeError):
+        coords["G"]["5"]["latitude"] = "0"                      # shared, so read-only
+
+
+def test_changed_file_is_reloaded_with_a_new_url(coha, coords_file, client):
+    url = coha.station_coords_url()
+    rewrite(coords_file, HEADER + "G,5,49.25,-123.06,2025\nH,1,49.3,-123.1,2025\n")
+    assert coha.load_station_coords()["G"]["5"]["year"] == "2025"
+    assert sorted(coha.load_station_coords()) == ["G", "H"]
+    assert coha.station_coords_url() != url
+    assert client.get(coha.station_coords_url()).get_json()["H"]["1"]["latitude"] == "49.3"
+
+
+def test_versioned_url_is_cached_for_a_year(coha, coords_file, client):
+    response = client.get(coha.station_coords_url())
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response.get_json()["G"]["5"]["longitude"] == "-123.05"
+
+
+def test_stale_version_is_revalidated(coha, coords_file, client):
+    old_url = coha.station_coords_url()
+    rewrite(coords_file, HEADER + "G,5,49.25,-123.06,2025\n")
+    response = client.get(old_url)
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.get_json()["G"]["5"]["latitude"] == "49.25"
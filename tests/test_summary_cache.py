@@ -0,0 +1,93 @@
+"""The per-instance summary cache: TTL and revalidation by generation."""
+
+import pytest
+
+from conftest import observation
+
+SUMMARY = "COHA-data-2025.csv"
+
+
+@pytest.fixture
+def reads(coha, monkeypatch):
+    """Names of the blobs downloaded, in order."""
+    inner = coha.get_storage().inner
+    read = inner.read
+    calls = []
+
+    def counting_read(name, *args, **kwargs):
+        calls.append(name)
+        return read(name, *args, **kwargs)
+    monkeypatch.setattr(inner, "read", counting_read)
+    return calls
+
+
+def write_summary(coha, *rows):
+    coha.get_storage().write(SUMMARY, coha._csv_to_string(rows))
+
+
+def stamps(entry):
+    return [r.timestamp for r in entry.rows]
+
+
+def test_entry_is_served_from_memory_within_the_ttl(coha, monkeypatch, reads):
+    monkeypatch.setattr(coha, "SUMMARY_CACHE_TTL", 60)
+    write_summary(coha, observation())
+    entry = coha._get_summary_entry(SUMMARY)
+    write_summary(coha, observation(), observation(timestamp="2025-04-28.08-15-00"))
+    reads.clear()
+    assert coha._get_summary_entry(SUMMARY) is entry
+    assert reads == []
+
+
+def test_unchanged_generation_is_not_downloaded_again(coha, monkeypatch, reads):
+    monkeypatch.setattr(coha, "SUMMARY_CACHE_TTL", 0)
+    write_summary(coha, observation())
+    entry = coha._get_summary_entry(SUMMARY)
+    reads.clear()
+    again = coha._get_summary_entry(SUMMARY)
+    assert again is entry and reads == []
+
+
+def test_new_generation_is_downloaded_after_the_ttl(coha, monkeypatch, reads):
+    monkeypatch.setattr(coha, "SUMMARY_CACHE_TTL", 0)
+    write_summary(coha, observation())
+    entry = coha._get_summary_entry(SUMMARY)
+    write_summary(coha, observation(), observation(timestamp="2025-04-28.08-15-00"))
+    reads.clear()
+    fresh = coha._get_summary_entry(SUMMARY)
+    assert fresh is not entry and fresh.generation != entry.generation
+    assert stamps(fresh) == ["2025-04-27.08-15-00", "2025-04-28.08-15-00"]
+    assert SUMMARY in reads
+
+
+def test_only_changed_segments_are_downloaded(coha, monkeypatch, reads):
+    monkeypatch.setattr(coha, "SUMMARY_CACHE_TTL", 0)
+    write_summary(coha, observation())
+    storage = coha.get_storage()
+    storage.write(coha.SUMMARY_LOG_PREFIX + "2025/a.csv",
+                  coha._csv_to_string([observation(timestamp="2025-04-28.08-15-00")]))
+    coha._get_summary_entry(SUMMARY)
+    storage.write(coha.SUMMARY_LOG_PREFIX + "2025/b.csv",
+                  coha._csv_to_string([observation(timestamp="2025-04-29.08-15-00")]))
+    reads.clear()
+    entry = coha._get_summary_entry(SUMMARY)
+    assert reads == [coha.SUMMARY_LOG_PREFIX + "2025/b.csv"]
+    assert stamps(entry) == ["2025-04-27.08-15-00", "2025-04-28.08-15-00", "2025-04-29.08-15-00"]
+
+
+def test_deleted_summary_empties_the_entry(coha, monkeypatch):
+    monkeypatch.setattr(coha, "SUMMARY_CACHE_TTL", 0)
+    write_summary(coha, observation())
+    assert stamps(coha._get_summary_entry(SUMMARY)) == ["2025-04-27.08-15-00"]
+    coha.get_storage().delete(SUMMARY)
+    entry = coha._get_summary_entry(SUMMARY)
+    assert entry.generation is None and entry.rows == []
+
+
+def test_invalidation_forces_a_reload(coha, monkeypatch):
+    monkeypatch.setattr(coha, "SUMMARY_CACHE_TTL", 60)
+    write_summary(coha, observation())
+    coha._get_summary_entry(SUMMARY)
+    write_summary(coha, observation(station="6"))
+    coha.invalidate_summary_cache(SUMMARY)
+    assert [r.station for r in coha._get_summary_entry(SUMMARY).rows] == [6]
@@ -0,0 +1,110 @@
+"""The columnar summary companion and the readers that use its columns."""
+
+import json
+import math
+
+import pytest
+
+import summary_columns
+import update_station_coordinates
+from conftest import observation, save_file
+from observation import FILE_FIELD_NAMES, Observation
+
+
+def rows_with_odd_values():
+    return [
+        observation(station="05", latitude="49.2400", longitude="", timestamp="2025-04-27.08-15-00"),
+        observation(station="6", latitude="bad value", wind="3->1", notes="é, \"quoted\"",
+                    timestamp="2025-04-28.08-15-00"),
+        observation(quadrat="H", station="6", timestamp="2025-04-29.08-15-00"),
+    ]
+
+
+def test_encode_round_trips_the_csv_text():
+    rows = [r.to_csv_values() for r in rows_with_odd_values()]
+    table = summary_columns.ColumnTable(summary_columns.encode(rows, FILE_FIELD_NAMES, source_generation=7))
+    assert table.source_generation == 7 and len(table) == 3
+    assert [list(r.values()) for r in table.rows()] == rows
+    assert table.kind("quadrat") == "category" and table.categories("quadrat") == ["G", "H"]
+    assert table.codes("quadrat").tolist() == [0, 0, 1]
+    latitudes = table.floats("latitude").tolist()
+    assert latitudes[0] == 49.24 and math.isnan(latitudes[1])
+
+
+def test_regeneration_writes_current_companions(coha):
+    for row in rows_with_odd_values():
+        save_file(coha, row)
+    coha.regenerate_data_summaries(full=True)
+    for summary_file in (coha.SUMMARY_FILE_NAME, "COHA-data-2025.csv"):
+        table = coha.read_summary_columns(summary_file)
+        assert table is not None and len(table) == 3
+
+
+def test_summary_rewrite_refreshes_the_companion(coha):
+    save_file(coha, observation())
+    coha.regenerate_data_summaries(full=True)
+    coha.append_to_summary_file("COHA-data-2025.csv", [observation(timestamp="2025-05-01.08-15-00")])
+    table = coha.read_summary_columns("COHA-data-2025.csv")
+    assert table is not None and len(table) == 2
+
+
+def test_stale_companion_is_ignored(coha):
+    save_file(coha, observation())
+    coha.regenerate_data_summaries(full=True)
+    coha.get_storage().write("COHA-data-2025.csv", coha._csv_to_string([observation(station="7")]))
+    assert coha.read_summary_columns("COHA-data-2025.csv") is None
+    entry = coha._load_summary("COHA-data-2025.csv")
+    assert entry.table is None and [r.station for r in entry.rows] == [7]
+
+
+def test_cache_decodes_rows_from_the_columns_only_when_asked(coha):
+    rows = rows_with_odd_values()
+    for row in rows:
+        save_file(coha, row)
+    coha.regenerate_data_summaries(full=True)
+    entry = coha._load_summary("COHA-data-2025.csv")
+    assert entry.table is not None and entry._base_rows is None
+    assert entry.rows == rows
+    assert [r.to_csv_values() for r in entry.rows] == [r.to_csv_values() for r in rows]
+
+
+def test_year_data_is_served_from_the_columns(coha, client, monkeypatch):
+    rows = rows_with_odd_values()
+    for row in rows:
+        save_file(coha, row)
+    coha.regenerate_data_summaries(full=True)
+    pending = observation(quadrat="X", timestamp="2025-05-01.08-15-00")
+    coha.append_to_summary_log([pending], "X.05.2025-05-01.08-15-00.csv")
+    coha.append_to_summary_log([rows[0]], "duplicate.csv")
+
+    def no_rows(table):
+        raise AssertionError("decoded Observations to serve map data")
+    monkeypatch.setattr(coha, "_observations_from_columns", no_rows)
+
+    response = client.get("/map/data/2025")
+    assert response.status_code == 200
+    expected = json.dumps([r.to_csv_row() for r in rows + [pending]], separators=(",", ":"))
+    assert response.get_data(as_text=True) == expected
+
+
+def test_coordinates_script_reads_the_columns(coha, monkeypatch):
+    for row in (observation(latitude="49.1", longitude="-123.1", timestamp="2025-04-27.08-15-00"),
+                observation(latitude="49.2", longitude="-123.2", timestamp="2025-04-28.08-15-00"),
+                observation(latitude="0", longitude="0", timestamp="2025-04-29.08-15-00"),
+                observation(station="06", latitude="", longitude="", timestamp="2025-04-27.09-15-00"),
+                observation(station="7", latitude="49.2400", longitude="-123.3", timestamp="2025-04-27.10-15-00")):
+        save_file(coha, row)
+    coha.regenerate_data_summaries(full=True)
+    monkeypatch.setattr(update_station_coordinates, "YEAR", "2025")
+    monkeypatch.setattr(update_station_coordinates, "get_storage", coha.get_storage)
+    monkeypatch.setattr(update_station_coordinates, "observations_from_csv", None)     # CSV path not taken
+
+    coordinates = update_station_coordinates.coordinates_from_summary()
+    assert coordinates == {("G", "5"): ("49.2", "-123.2"), ("G", "7"): ("49.2400", "-123.3")}
+
+
+@pytest.mark.parametrize("text", ["49.24", "49.2400", "", "bad value", "-0.0", "1e-05"])
+def test_float_column_keeps_the_exact_text(text):
+    table = summary_columns.ColumnTable(summary_columns.encode([[text]], ["latitude"]))
+    assert table.column("latitude") == [text]
+    assert Observation.parse_field("latitude", text) == Observation.from_csv_row({"latitude": text}).latitude
@@ -0,0 +1,115 @@
+"""SummaryIndex lookups and the endpoints that read rows through get_summary_index()."""
+
+import csv
+import io
+
+import pytest
+
+from conftest import ADMIN_AUTH, observation, save_file
+from summary_index import SummaryIndex
+
+ROWS = [
+    observation(station="5", detection="yes", timestamp="2025-04-30.23-59-59"),
+    observation(station="05", timestamp="2024-06-01.08-00-00"),
+    observation(station="6", detection="Y", timestamp="2025-04-01.00-00-00"),
+    observation(quadrat="H", station="5", timestamp="2025-05-01.00-00-00"),
+    observation(station="5", timestamp="2025-03-31.23-59-59"),
+    observation(station="3->1", timestamp="2025-04-15.12-00-00"),
+]
+
+
+@pytest.fixture
+def index():
+    return SummaryIndex(ROWS)
+
+
+def stamps(rows):
+    return [r.timestamp for r in rows]
+
+
+def test_rows_are_held_in_timestamp_order(index):
+    assert stamps(index.rows) == sorted(r.timestamp for r in ROWS)
+    assert index.years() == ["2024", "2025"]
+    assert index.counts_by_year() == {"2024": 1, "2025": 5}
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (None, None, 6),
+    ("2025", "2025", 5),
+    ("2025-04", "2025-04", 3),                  # month prefix covers the 1st to the 30th
+    ("2025-04-30", "2025-04-30", 1),            # a day includes its last second
+    ("2025-04-01", "2025-04-15", 2),
+    ("2025-03-31.23-59-59", "2025-04-01", 2),   # exact timestamps as bounds
+    ("2025-05-02", None, 0),
+    (None, "2024-12-31", 1),
+    ("2025-05", "2025-04", 0),                  # reversed bounds give an empty range
+])
+def test_range_bisects_on_timestamp_prefixes(index, start, end, expected):
+    lo, hi = index._range(start, end)
+    assert hi - lo == expected
+    assert all((not start or t >= start) and (not end or t[:len(end)] <= end)
+               for t in index._timestamps[lo:hi])
+
+
+def test_query_by_station_normalises_padded_stations(index):
+    assert stamps(index.query(quadrat="G", station=5)) == [
+        "2024-06-01.08-00-00", "2025-03-31.23-59-59", "2025-04-30.23-59-59"]
+    assert stamps(index.query(quadrat="G", station="05", year="2025")) == [
+        "2025-03-31.23-59-59", "2025-04-30.23-59-59"]
+    assert stamps(index.query(quadrat="G", station="3->1")) == ["2025-04-15.12-00-00"]
+    assert index.query(quadrat="X", station=1) == []
+
+
+def test_query_combines_criteria(index):
+    assert stamps(index.query(detected=True)) == ["2025-04-01.00-00-00", "2025-04-30.23-59-59"]
+    assert stamps(index.query(start="2025-04", end="2025-04", detected=False)) == ["2025-04-15.12-00-00"]
+    assert stamps(index.query(station=5, year=2025)) == [
+        "2025-03-31.23-59-59", "2025-04-30.23-59-59", "2025-05-01.00-00-00"]
+    assert stamps(index.query(quadrat="H")) == ["2025-05-01.00-00-00"]
+    assert index.query(year="2023") == []
+
+
+def test_visits_and_latest_visit(index):
+    assert index.latest_visit("G", 5).timestamp == "2025-04-30.23-59-59"
+    assert index.latest_visit("G", 5, year="2024").timestamp == "2024-06-01.08-00-00"
+    assert index.latest_visit("H", 6) is None
+    assert index.stations("2025") == [("G", 5), ("G", 6), ("G", "3->1"), ("H", 5)]
+
+
+def test_summary_index_includes_pending_segments(coha):
+    save_file(coha, ROWS[0])
+    coha.regenerate_data_summaries(full=True)
+    coha.append_to_summary_log([ROWS[2]], "pending.csv")
+    index = coha.get_summary_index(coha._yearly_summary_name("2025"))
+    assert stamps(index.rows) == ["2025-04-01.00-00-00", "2025-04-30.23-59-59"]
+    assert coha.get_summary_index(coha._yearly_summary_name("2025")) is index
+
+
+def test_export_reads_through_the_index(coha, client):
+    for year in ("2024", "2025"):
+        coha.write_summary_file(coha._yearly_summary_name(year), [r for r in ROWS if r.year == year])
+
+    def export(query):
+        response = client.get(f"/data/export?{query}")
+        return [r["timestamp"] for r in csv.DictReader(io.StringIO(response.get_data(as_text=True)))]
+
+    assert export("quadrat=G&station=5,6&year=2025") == [
+        "2025-03-31.23-59-59", "2025-04-01.00-00-00", "2025-04-30.23-59-59"]
+    assert export("from=2025-04-01&to=2025-04-30&detection=no") == ["2025-04-15.12-00-00"]
+    assert export("station=5") == ["2024-06-01.08-00-00", "2025-03-31.23-59-59",
+                                   "2025-04-30.23-59-59", "2025-05-01.00-00-00"]
+    assert export("year=1999") == []
+    assert coha._yearly_summary_name("1999") not in coha._summary_cache
+
+
+def test_admin_page_compares_the_summary_with_the_files(coha, client):
+    for row in ROWS[:3]:
+        save_file(coha, row)
+    coha.regenerate_data_summaries(full=True)
+    page = client.get("/admin/?year=2025", headers=ADMIN_AUTH).get_data(as_text=True)
+    assert "The 2025 summary holds 2 observation(s) from 2 station(s)." in page
+    assert "Reconcile the summaries" not in page
+
+    coha.get_storage().delete(save_file(coha, ROWS[0]))
+    page = client.get("/admin/?year=2025", headers=ADMIN_AUTH).get_data(as_text=True)
+    assert "Reconcile the summaries to repair the difference." in page
@@ -0,0 +1,60 @@
+"""Summary log segments and their compaction into the summary CSVs."""
+
+import os
+import time
+
+from conftest import names, observation, save_file
+
+
+def age_segments(coha, seconds):
+    """Backdate every summary log segment by seconds."""
+    storage = coha.get_storage().inner
+    for name in names(coha, coha.SUMMARY_LOG_PREFIX):
+        path = storage._data_path(name)
+        then = time.time() - seconds
+        os.utime(path, (then, then))
+
+
+def test_compaction_folds_segments(coha):
+    rows = [observation(timestamp="2024-04-27.08-15-00"), observation(timestamp="2025-04-27.08-15-00")]
+    coha._log_rows(rows, "test.csv")
+
+    ok, _, folded = coha.compact_summary_log()
+    assert ok and folded == 2
+    assert names(coha, coha.SUMMARY_LOG_PREFIX) == []
+    assert len(coha._read_csv(coha.SUMMARY_FILE_NAME)[0]) == 2
+    assert len(coha._read_csv("COHA-data-2025.csv")[0]) == 1
+
+
+def test_old_segment_is_compacted_without_reads(coha, monkeypatch):
+    monkeypatch.setattr(coha, "SUMMARY_LOG_COMPACT_AGE", 600)
+    obs = observation()
+    save_file(coha, obs)
+    coha._log_rows([obs], "test.csv")
+    q = coha._summary_queue
+
+    q._maintain()
+    assert len(names(coha, coha.SUMMARY_LOG_PREFIX)) == 1    # too young
+
+    age_segments(coha, 601)
+    q._last_log_check = 0.0
+    q._maintain()
+    assert names(coha, coha.SUMMARY_LOG_PREFIX) == []
+    assert [r.timestamp for r in coha._read_csv(coha.SUMMARY_FILE_NAME)[0]] == [obs.timestamp]
+
+
+def test_segment_count_triggers_compaction(coha, monkeypatch):
+    monkeypatch.setattr(coha, "SUMMARY_LOG_COMPACT_AGE", 0)
+    monkeypatch.setattr(coha, "SUMMARY_LOG_COMPACT_THRESHOLD", 3)
+    for s in range(1, 3):
+        coha._log_rows([observation(station=str(s))], f"test{s}.csv")
+    assert not coha.summary_log_due()
+    coha._log_rows([observation(station="3")], "test3.csv")
+    assert coha.summary_log_due()
+
+
+def test_merge_treats_padded_stations_as_the_same_row(coha):
+    legacy = observation(station="05")
+    assert legacy.station == "05"
+    merged = coha._merge_rows([legacy], [observation(station="5"), observation(station="6")])
+    assert [r.station for r in merged] == ["05", 6]
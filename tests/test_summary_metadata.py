@@ -0,0 +1,66 @@
+"""summary-index.json: counted incrementally on save, recomputed on rebuilds."""
+
+import json
+
+import pytest
+
+from conftest import ADMIN_AUTH, form, observation, save_file
+
+
+def metadata(coha):
+    return json.loads(coha.get_storage().read(coha.SUMMARY_METADATA_NAME)[0])
+
+
+@pytest.fixture
+def seeded(coha):
+    for ts in ("2024-04-27.08-15-00", "2025-04-27.08-15-00"):
+        save_file(coha, observation(timestamp=ts))
+    coha.regenerate_data_summaries(full=True)
+    return metadata(coha)
+
+
+def test_regeneration_counts_everything(coha, seeded):
+    assert seeded["rows"] == 2
+    assert {y: v["rows"] for y, v in seeded["years"].items()} == {"2024": 1, "2025": 1}
+
+
+@pytest.mark.parametrize("queued", [True, False])
+def test_save_counts_rows_without_reading_the_summary(coha, client, seeded, monkeypatch, queued):
+    monkeypatch.setattr(coha, "SUMMARY_QUEUE", queued)
+
+    def no_summary_reads(*args, **kwargs):
+        raise AssertionError("metadata recomputed from the summary on save")
+    monkeypatch.setattr(coha, "_refresh_summary_entry", no_summary_reads)
+    monkeypatch.setattr(coha, "_load_summary", no_summary_reads)
+
+    assert client.post("/save/", data=form(quadrat="H")).get_json()["status"] == "saved"
+    coha._summary_queue.drain(timeout=10)
+    after = metadata(coha)
+    year = max(after["years"])
+    assert after["rows"] == 3
+    assert after["years"][year]["quadrats"]["H"] == 1
+    assert after["years"][year]["latest_observation"] > seeded["years"].get(year, {}).get("latest_observation", "")
+
+
+def test_admin_delete_recomputes_only_its_year(coha, client, seeded, monkeypatch):
+    name = save_file(coha, observation(timestamp="2025-05-01.08-15-00"))
+    coha.add_to_summary_metadata([observation(timestamp="2025-05-01.08-15-00")])
+    assert metadata(coha)["years"]["2025"]["rows"] == 2
+
+    read = []
+    refresh = coha._refresh_summary_entry
+    monkeypatch.setattr(coha, "_refresh_summary_entry", lambda name=coha.SUMMARY_FILE_NAME: read.append(name) or refresh(name))
+    client.post("/admin/delete/", data={"filename": name}, headers=ADMIN_AUTH)
+    after = metadata(coha)
+    assert read == ["COHA-data-2025.csv"]
+    assert after["rows"] == 2
+    assert after["years"]["2025"]["rows"] == 1
+    assert after["years"]["2025"]["latest_observation"] == "2025-04-27.08-15-00"
+    assert after["years"]["2024"] == seeded["years"]["2024"]
+
+
+def test_reconcile_corrects_double_counts(coha, seeded):
+    coha.add_to_summary_metadata([observation(timestamp="2025-04-27.08-15-00")])
+    assert metadata(coha)["rows"] == 3
+    coha.reconcile_summaries()
+    assert metadata(coha)["rows"] == 2
@@ -0,0 +1,94 @@
+"""The background summary queue: durable markers, draining and recovery."""
+
+import time
+
+import pytest
+
+from conftest import form, names, observation, save_file
+
+
+@pytest.fixture
+def make_queue(coha):
+    """Build _SummaryQueues that are stopped when the test ends, even if it fails."""
+    queues = []
+
+    def make(depth=10, delay=0.0):
+        queues.append(coha._SummaryQueue(depth, delay))
+        return queues[-1]
+    yield make
+    for q in queues:
+        q.stop(timeout=10)
+
+
+def logged_timestamps(coha):
+    return sorted(row.timestamp for _, rows in coha._read_summary_log() for row in rows)
+
+
+def test_marker_is_written_before_submit_returns(coha, make_queue):
+    q = make_queue(depth=10, delay=0.5)
+    obs = observation()
+    save_file(coha, obs)
+
+    ok, _ = q.submit([obs], "test")
+    assert ok
+    # The worker is still waiting for a burst, so only the marker records the row
+    assert len(names(coha, coha.SUMMARY_PENDING_PREFIX)) == 1
+    assert logged_timestamps(coha) == []
+
+    assert q.stop(timeout=10)
+    assert logged_timestamps(coha) == [obs.timestamp]
+    assert names(coha, coha.SUMMARY_PENDING_PREFIX) == []
+
+
+def test_stop_waits_for_rows_in_flight(coha, make_queue, monkeypatch):
+    log_rows = coha._log_rows
+
+    def slow_log_rows(rows, segment_name):
+        time.sleep(0.5)
+        return log_rows(rows, segment_name)
+    monkeypatch.setattr(coha, "_log_rows", slow_log_rows)
+
+    q = make_queue(delay=0.05)
+    rows = [observation(station=str(s), timestamp=f"2025-04-27.08-15-{s:02d}") for s in range(1, 6)]
+    for row in rows:
+        q.submit([row], "test")
+    time.sleep(0.2)     # the worker has taken every row and is writing them
+    assert q.depth() == 0
+    assert q.snapshot()["in_progress"] == len(rows)
+
+    assert q.stop(timeout=10)
+    assert logged_timestamps(coha) == sorted(r.timestamp for r in rows)
+    assert q._thread is None
+
+
+def test_full_queue_logs_inline(coha, make_queue, monkeypatch):
+    monkeypatch.setattr(coha, "SUMMARY_QUEUE_BLOCK", 0.01)
+    q = make_queue(depth=1, delay=0.5)
+    rows = [observation(station=str(s), timestamp=f"2025-04-27.08-15-{s:02d}") for s in range(1, 4)]
+
+    ok, _ = q.submit(rows, "batch")
+    assert ok
+    assert q.snapshot()["inline"] >= 1
+    assert q.stop(timeout=10)
+    assert logged_timestamps(coha) == sorted(r.timestamp for r in rows)
+    assert names(coha, coha.SUMMARY_PENDING_PREFIX) == []
+
+
+def test_stale_marker_is_recovered(coha):
+    # An instance that saved a row and stopped before logging it leaves its marker
+    obs = observation()
+    save_file(coha, obs)
+    marker = coha._write_pending_marker([obs])
+
+    assert coha.recover_pending_summary_work(stale_after=3600) == 0
+    assert coha.recover_pending_summary_work(stale_after=0) == 1
+    assert logged_timestamps(coha) == [obs.timestamp]
+    assert marker not in names(coha, coha.SUMMARY_PENDING_PREFIX)
+
+
+def test_save_is_logged_through_the_queue(coha, client):
+    response = client.post("/save/", data=form())
+    assert response.status_code == 200
+    assert coha._summary_queue.stop(timeout=10)
+    assert len(logged_timestamps(coha)) == 1
+    assert names(coha, coha.SUMMARY_PENDING_PREFIX) == []
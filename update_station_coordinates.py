@@ -1,16 +1,24 @@
 #!/usr/bin/env python3
 import csv
 import os
-import subprocess
 import tempfile
 import glob
 import argparse
+import math
+import re
 from collections import defaultdict
 
+from observation import observations_from_csv
+from storage_backend import NotFound, get_storage
+from summary_columns import ColumnTable, companion_name
+from summary_index import SummaryIndex, station_key
+
 # Configuration
-BUCKET_NAME = "coha-data"  # Update this to your bucket name
+BUCKET_NAME = os.environ.get("COHA_BUCKET_NAME", "coha-data")  # or set COHA_STORAGE_BACKEND=local
 COORDINATES_FILE = "static/COHA-Station-Coordinates-v1.csv"  # Now in static/ subdirectory
 YEAR = "2023"  # Default year - now set to 2023
+OBSERVATION_PREFIX = "obs/"
+OBSERVATION_FILE_RE = re.compile(r"^[A-X]\.[0-9]{2}\.[0-9]{4}-.*\.csv$")
 
 
 def parse_args():
@@ -24,23 +32,23 @@ def parse_args():
                         help=f'Year to process (default: {YEAR})')
     parser.add_argument('--list-years', action='store_true',
                         help='List available years in the bucket and exit')
+    parser.add_argument('--from-summary', action='store_true',
+                        help='Read the yearly summary file instead of downloading every observation file '
+                             '(compact the summary log first so recent saves are included)')
     return parser.parse_args()
 
 
 def list_available_years():
     """List available years in the observation filenames"""
     try:
-        cmd = f"gsutil ls gs://{BUCKET_NAME}/*.csv"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"Error: Unable to list bucket contents. Check bucket name: {BUCKET_NAME}")
-            print(result.stderr)
-            return []
-
-        years = set()
-        for line in result.stdout.splitlines():
+        storage = get_storage()
+        # Files are stored as obs/YYYY/...; older ones may still be at the top of the bucket
+        years = {prefix.split('/')[1] for prefix in storage.list_prefixes(OBSERVATION_PREFIX)}
+        for obj in storage.list(delimiter='/'):
             # Extract year from filename like C.01.2023-04-27.20-49-50.csv
-            filename = os.path.basename(line.strip())
+            filename = os.path.basename(obj.name)
+            if not OBSERVATION_FILE_RE.match(filename):
+                continue
             parts = filename.split('.')
             if len(parts) >= 3:
                 date_part = parts[2]
@@ -69,15 +77,18 @@ def download_observations(data_dir=None):
         os.makedirs(temp_dir, exist_ok=True)
 
         # Download all observation files for the specified year
-        # Using pattern matching for filenames containing the year
-        cmd = f"gsutil -m cp 'gs://{BUCKET_NAME}/*{YEAR}*.csv' {temp_dir}/"
-        print(f"Downloading {YEAR} observations to {temp_dir}")
-        print(f"Running: {cmd}")
-
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"Download failed: {result.stderr}")
-            raise Exception(f"gsutil command failed: {result.stderr}")
+        print(f"Downloading {YEAR} observations from {BUCKET_NAME} to {temp_dir}")
+        try:
+            storage = get_storage()
+            objects = list(storage.list(f"{OBSERVATION_PREFIX}{YEAR}/")) + list(storage.list(delimiter='/'))
+            for obj in objects:
+                filename = os.path.basename(obj.name)
+                if OBSERVATION_FILE_RE.match(filename) and filename[5:9] == YEAR:
+                    with open(os.path.join(temp_dir, filename), "wb") as f:
+                        f.write(storage.read(obj.name)[0])
+        except Exception as e:
+            print(f"Download failed: {e}")
+            raise
         else:
             file_count = len(glob.glob(f"{temp_dir}/*.csv"))
             if file_count == 0:
@@ -193,6 +204,80 @@ def extract_coordinates(temp_dir):
     return coordinates
 
 
+def coordinates_from_columns(table):
+    """
+    Latest valid coordinates for each quadrat/station, read from the columns of
+    a summary's columnar companion without building a record per row
+    """
+    quadrats, quadrat_codes = table.categories("quadrat"), table.codes("quadrat")
+    stations, station_codes = table.categories("station"), table.codes("station")
+    latitudes, longitudes = table.floats("latitude"), table.floats("longitude")
+    latitude_text, longitude_text = table.column("latitude"), table.column("longitude")
+    timestamps = table.strings("timestamp")
+
+    coordinates = {}
+    # Oldest first, so each station ends up with its most recent usable position
+    for i in sorted(range(len(table)), key=timestamps.__getitem__):
+        if not timestamps[i].startswith(YEAR):
+            continue
+        if math.isnan(latitudes[i]) or math.isnan(longitudes[i]):
+            continue
+        if latitude_text[i] == "0" or longitude_text[i] == "0":
+            continue
+        station = str(station_key(stations[station_codes[i]]))
+        coordinates[(quadrats[quadrat_codes[i]], station)] = (latitude_text[i], longitude_text[i])
+    return coordinates
+
+
+def coordinates_from_summary():
+    """Latest valid coordinates for each quadrat/station, looked up in the yearly summary file"""
+    summary_file = f"COHA-data-{YEAR}.csv"
+    print(f"Reading {summary_file} from {BUCKET_NAME}")
+    table = read_current_columns(summary_file)
+    if table is not None:
+        coordinates = coordinates_from_columns(table)
+        print(f"Extracted coordinates for {len(coordinates)} quadrat/station locations "
+              f"from the {YEAR} summary columns")
+        return coordinates
+
+    try:
+        data, _ = get_storage().read(summary_file)
+    except NotFound:
+        raise ValueError(f"No summary file found for year {YEAR}")
+    index = SummaryIndex(observations_from_csv(data.decode("utf-8")))
+
+    coordinates = {}
+    for quadrat, station in index.stations(YEAR):
+        # Most recent visit first; fall back to earlier visits if its position is unusable
+        for obs in reversed(index.visits(quadrat, station, YEAR)):
+            row = obs.to_csv_row()
+            latitude, longitude = row["latitude"], row["longitude"]
+            if not latitude or not longitude or latitude == "0" or longitude == "0":
+                continue
+            try:
+                float(latitude)
+                float(longitude)
+            except ValueError:
+                continue
+            coordinates[(quadrat, str(station))] = (latitude, longitude)
+            break
+
+    print(f"Extracted coordinates for {len(coordinates)} quadrat/station locations from {YEAR} summary")
+    return coordinates
+
+
+def read_current_columns(summary_file):
+    """The summary's columnar companion, or None if it is missing or older than the CSV"""
+    storage = get_storage()
+    try:
+        generation = storage.stat(summary_file).generation
+        data, _ = storage.read(companion_name(summary_file))
+    except NotFound:
+        return None
+    table = ColumnTable(data)
+    return table if table.source_generation == generation else None
+
+
 def update_coordinates_file(coordinates):
     """Update the coordinates CSV file with year data"""
     if not os.path.exists(COORDINATES_FILE):
@@ -328,6 +413,11 @@ def main():
                 print(f"No observation data found in bucket {BUCKET_NAME}")
             return
 
+        if args.from_summary:
+            update_coordinates_file(coordinates_from_summary())
+            print("Coordinate update completed successfully")
+            return
+
         # Step 1: Get observation files (download or use existing)
         if args.skip_download:
             if not args.data_dir: